@@ -1,15 +1,18 @@
 from __future__ import annotations
 
 import os
+import time
 
-import bcrypt
-import jwt
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from fastapi import HTTPException, status, Request, Depends
+from fastapi import HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from . import database
+from .executor import run_db, run_crypto
+from .metrics import observe_crypto
+from .cache import settings_cache, token_cache
+from .ratelimit import PinAttemptLimiter
 
 # Configuration
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-change-this-in-production")
@@ -18,19 +21,33 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES",
 MAX_PIN_ATTEMPTS = 5
 LOCKOUT_MINUTES = 5
 
+pin_limiter = PinAttemptLimiter(MAX_PIN_ATTEMPTS, LOCKOUT_MINUTES * 60)
+
+# bcrypt and jwt are imported where they are used: jwt alone adds tens of
+# milliseconds to a cold start, and public reads never need either.
+
 
 def hash_pin(pin: str) -> str:
     """Hash a PIN using bcrypt."""
-    return bcrypt.hashpw(pin.encode(), bcrypt.gensalt(rounds=12)).decode()
+    import bcrypt
+    started = time.perf_counter()
+    pin_hash = bcrypt.hashpw(pin.encode(), bcrypt.gensalt(rounds=12)).decode()
+    observe_crypto("hash", time.perf_counter() - started)
+    return pin_hash
 
 
 def verify_pin(pin: str, pin_hash: str) -> bool:
     """Verify a PIN against its hash."""
-    return bcrypt.checkpw(pin.encode(), pin_hash.encode())
+    import bcrypt
+    started = time.perf_counter()
+    valid = bcrypt.checkpw(pin.encode(), pin_hash.encode())
+    observe_crypto("verify", time.perf_counter() - started)
+    return valid
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
+    import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -44,12 +61,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token."""
+    import jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except jwt.ExpiredSignatureError:
         return None
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         return None
 
 
@@ -72,7 +90,11 @@ async def get_current_auth(request: Request) -> dict:
         )
     
     token = credentials.credentials
-    payload = verify_token(token)
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = verify_token(token)
+        if payload is not None:
+            token_cache.put(token, payload)
     
     if payload is None:
         raise HTTPException(
@@ -81,6 +103,26 @@ async def get_current_auth(request: Request) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Tokens are only valid for the tenant that issued them
+    if payload.get("tenant") != database.current_tenant():
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Tokens issued before the last PIN change are revoked. A recent
+    # check still stands while this tenant's settings are unchanged.
+    settings = settings_cache.current()
+    if not token_cache.epoch_fresh(token, settings.cached_version()):
+        if payload.get("epoch", 0) != await run_db(settings.get_token_epoch):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        token_cache.epoch_checked(token, settings.cached_version())
+    
     return payload
 
 
@@ -90,20 +132,16 @@ pin_auth = get_current_auth
 
 def check_rate_limit(ip_address: str) -> bool:
     """Check if IP is rate limited due to failed attempts."""
-    # Clear old attempts first
-    database.clear_old_attempts()
-    
-    # Count recent failed attempts
-    failed_attempts = database.get_recent_failed_attempts(ip_address, LOCKOUT_MINUTES)
-    return failed_attempts >= MAX_PIN_ATTEMPTS
+    return pin_limiter.is_limited(ip_address)
 
 
-def authenticate_pin(pin: str, ip_address: str) -> Optional[str]:
+async def authenticate_pin(pin: str, ip_address: str) -> Optional[str]:
     """
     Authenticate a PIN and return a token if valid.
     Implements rate limiting.
     """
     # Check rate limit
+    await pin_limiter.ensure_loaded()
     if check_rate_limit(ip_address):
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -111,52 +149,60 @@ def authenticate_pin(pin: str, ip_address: str) -> Optional[str]:
         )
     
     # Get stored PIN hash
-    pin_hash = database.get_pin_hash()
+    pin_hash = await run_db(settings_cache.get_pin_hash)
     
     if not pin_hash:
         # No PIN set - authentication not possible
-        database.record_pin_attempt(ip_address, success=False)
+        pin_limiter.record(ip_address, success=False)
         return None
     
     # Verify PIN
-    if verify_pin(pin, pin_hash):
-        database.record_pin_attempt(ip_address, success=True)
+    if await run_crypto(verify_pin, pin, pin_hash):
+        pin_limiter.record(ip_address, success=True)
         # Create and return token
-        token = create_access_token({"authenticated": True})
+        epoch = await run_db(settings_cache.get_token_epoch)
+        claims = {"authenticated": True, "epoch": epoch}
+        tenant = database.current_tenant()
+        if tenant is not None:
+            claims["tenant"] = tenant
+        token = create_access_token(claims)
         return token
     else:
-        database.record_pin_attempt(ip_address, success=False)
+        pin_limiter.record(ip_address, success=False)
         return None
 
 
-def setup_pin(pin: str) -> bool:
+async def setup_pin(pin: str) -> bool:
     """Set up initial PIN. Returns False if PIN already set."""
-    existing_hash = database.get_pin_hash()
+    existing_hash = await run_db(settings_cache.get_pin_hash)
     if existing_hash:
         return False
     
-    pin_hash = hash_pin(pin)
-    database.set_pin_hash(pin_hash)
+    pin_hash = await run_crypto(hash_pin, pin)
+    await run_db(database.set_pin_hash, pin_hash)
     return True
 
 
-def change_pin(old_pin: str, new_pin: str) -> bool:
+async def change_pin(old_pin: str, new_pin: str) -> bool:
     """Change existing PIN. Returns False if old PIN is incorrect."""
-    existing_hash = database.get_pin_hash()
+    existing_hash = await run_db(settings_cache.get_pin_hash)
     if not existing_hash:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No PIN is currently set"
         )
     
-    if not verify_pin(old_pin, existing_hash):
+    if not await run_crypto(verify_pin, old_pin, existing_hash):
         return False
     
-    new_hash = hash_pin(new_pin)
-    database.set_pin_hash(new_hash)
+    new_hash = await run_crypto(hash_pin, new_pin)
+    await run_db(database.set_pin_hash, new_hash)
+    # The epoch bump revokes this tenant's outstanding tokens; drop them
+    # locally too. Other tenants' tokens are unaffected.
+    token_cache.evict_tenant(database.current_tenant())
     return True
 
 
-def is_pin_set() -> bool:
+async def is_pin_set() -> bool:
     """Check if a PIN has been set up."""
-    return database.get_pin_hash() is not None
+    return await run_db(settings_cache.get_pin_hash) is not None
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from . import database
+from .models import Settings
+from .records import EventRecord, encode_events
+from .tenancy import PerTenant
+
+_settings_adapter = TypeAdapter(Settings)
+
+
+def _sort_key(event: EventRecord):
+    return (event.start, event.id)
+
+
+class EventCache:
+    """
+    Process-level cache of the decoded, sorted event list.
+
+    Freshness is checked against the 'events' data version kept in the
+    database, which is bumped by triggers on every write. Writes made by
+    this process are applied incrementally through the database change
+    listener; writes made by other workers show up as a version mismatch
+    and trigger a reload.
+
+    The cached list is never mutated in place, so callers may hold on to
+    a returned list while the cache moves on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._events: List[EventRecord] = []
+        self._body_version: Optional[int] = None
+        self._body = b""
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    def get_events(self) -> List[EventRecord]:
+        """Get all events, sorted by start time."""
+        return self.get_events_with_version()[1]
+
+    def get_events_with_version(self) -> Tuple[int, List[EventRecord]]:
+        """Get all events and the data version they correspond to."""
+        current = database.get_data_version("events")
+        with self._lock:
+            if self._version == current:
+                self.hits += 1
+                return self._version, self._events
+            self.misses += 1
+
+        version, events = database.get_all_events_with_version()
+        with self._lock:
+            self._version = version
+            self._events = events
+        return version, events
+
+    def get_body(self) -> Tuple[int, bytes]:
+        """Get the JSON-encoded event list, serialized once per data version."""
+        version, events = self.get_events_with_version()
+        with self._lock:
+            if self._body_version == version:
+                return version, self._body
+
+        body = encode_events(events)
+        with self._lock:
+            self._body_version = version
+            self._body = body
+        return version, body
+
+    def invalidate(self):
+        """Drop the cached list; the next read reloads it."""
+        with self._lock:
+            self._version = None
+            self._events = []
+            self._body_version = None
+            self._body = b""
+
+    def on_changes(self, changes: List[database.Change]):
+        """Database change listener: apply committed writes to the cache."""
+        with self._lock:
+            if self._version is None:
+                return
+            expected = self._version
+            for _, _, _, version in changes:
+                expected += 1
+                if version != expected:
+                    # Missed a write (e.g. from another worker): reload on next read
+                    self._version = None
+                    self._events = []
+                    return
+
+            by_id = {e.id: e for e in self._events}
+            for _, event_id, event, _ in changes:
+                if event is None:
+                    by_id.pop(event_id, None)
+                else:
+                    by_id[event_id] = event
+            self._events = sorted(by_id.values(), key=_sort_key)
+            self._version = expected
+
+
+class SettingsCache:
+    """
+    Cache of the settings response and private auth state (PIN hash and
+    token epoch), keyed on the 'settings' data version. The private state
+    is never part of the public settings.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._settings: dict = {}
+        self._private: dict = {"pin_hash": None, "token_epoch": 0}
+        self._body = b""
+
+    def get_settings(self) -> dict:
+        """Get application settings."""
+        return self._get()[1]
+
+    def get_pin_hash(self) -> Optional[str]:
+        """Get the current PIN hash."""
+        return self._get()[2]["pin_hash"]
+
+    def get_token_epoch(self) -> int:
+        """Get the current token epoch; tokens from older epochs are revoked."""
+        return self._get()[2]["token_epoch"]
+
+    def cached_version(self) -> Optional[int]:
+        """The data version of the cached settings, without checking the database."""
+        return self._version
+
+    def get_body(self) -> Tuple[int, bytes]:
+        """Get the JSON-encoded settings, serialized once per data version."""
+        version, _, _, body = self._get()
+        return version, body
+
+    def _get(self) -> Tuple[int, dict, dict, bytes]:
+        current = database.get_data_version("settings")
+        with self._lock:
+            if self._version == current:
+                return self._version, self._settings, self._private, self._body
+
+        version, settings, private = database.get_settings_state()
+        body = _settings_adapter.dump_json(_settings_adapter.validate_python(settings))
+        with self._lock:
+            self._version = version
+            self._settings = settings
+            self._private = private
+            self._body = body
+        return version, settings, private, body
+
+    def invalidate(self):
+        """Drop the cached settings; the next read reloads them."""
+        with self._lock:
+            self._version = None
+
+
+class _CachedToken:
+    __slots__ = ("payload", "settings_version", "checked")
+
+    def __init__(self, payload: dict):
+        self.payload = payload
+        # When the token's epoch was last confirmed, and against which
+        # cached settings version; None until the first check
+        self.settings_version: Optional[int] = None
+        self.checked = 0.0
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified JWT payloads, keyed by a digest of the token.
+    Entries expire at the token's own exp claim.
+
+    Each entry also remembers when its revocation epoch was last checked.
+    The check is skipped while the tenant's cached settings version is
+    unchanged and the check is younger than epoch_ttl seconds; the TTL
+    bounds how long a PIN change made by another process goes unnoticed.
+    """
+
+    def __init__(self, max_size: int = 1024, epoch_ttl: float = 5.0):
+        self.max_size = max_size
+        self.epoch_ttl = epoch_ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, _CachedToken]" = OrderedDict()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Get the cached payload for a token, or None on a miss."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.payload.get("exp", 0) > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.payload
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, payload: dict):
+        """Cache a verified payload."""
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = _CachedToken(payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def epoch_fresh(self, token: str, settings_version: Optional[int]) -> bool:
+        """Whether the token's epoch was confirmed recently at this settings version."""
+        if settings_version is None:
+            return False
+        with self._lock:
+            entry = self._entries.get(self._key(token))
+            return (
+                entry is not None
+                and entry.settings_version == settings_version
+                and time.monotonic() - entry.checked < self.epoch_ttl
+            )
+
+    def epoch_checked(self, token: str, settings_version: Optional[int]):
+        """Record that the token's epoch was just confirmed."""
+        with self._lock:
+            entry = self._entries.get(self._key(token))
+            if entry is not None:
+                entry.settings_version = settings_version
+                entry.checked = time.monotonic()
+
+    def evict_tenant(self, tenant: Optional[str]):
+        """Drop the tokens issued for one tenant (None = the default database)."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.payload.get("tenant") == tenant]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# One event/settings cache per tenant database; tokens carry their tenant
+events_cache = PerTenant(EventCache)
+settings_cache = PerTenant(SettingsCache)
+token_cache = TokenCache(
+    int(os.environ.get("TOKEN_CACHE_SIZE", "1024")),
+    float(os.environ.get("TOKEN_EPOCH_TTL_SECONDS", "5")),
+)
+
+
+def _on_changes(changes: List[database.Change]):
+    cache = events_cache.peek()
+    if cache is not None:
+        cache.on_changes(changes)
+
+
+database.add_change_listener(_on_changes)
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional, Set, Tuple
+
+from . import database
+from .executor import run_db
+from .tenancy import PerTenant
+
+# Change feed configuration
+STREAM_HISTORY = int(os.environ.get("STREAM_HISTORY", "1000"))
+STREAM_QUEUE_SIZE = int(os.environ.get("STREAM_QUEUE_SIZE", "64"))
+STREAM_MAX_CLIENTS = int(os.environ.get("STREAM_MAX_CLIENTS", "5000"))
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get("STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_POLL_SECONDS = float(os.environ.get("STREAM_POLL_SECONDS", "2"))
+
+_KEEPALIVE = b": keepalive\n\n"
+
+
+def _format(seq: int, action: str, payload: dict, event_json: Optional[str] = None) -> bytes:
+    data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    if event_json is not None:
+        # The event is already encoded; splice it in as the last key
+        data = f'{data[:-1]},"event":{event_json}}}'
+    return f"id: {seq}\nevent: {action}\ndata: {data}\n\n".encode()
+
+
+class _Subscriber:
+    __slots__ = ("queue",)
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+
+    def offer(self, message: bytes, reset: bytes):
+        """Queue a message; a consumer that has fallen behind gets a reset instead."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(reset)
+
+
+class StreamLimit:
+    """Open streams counted against STREAM_MAX_CLIENTS, shared by feeds."""
+
+    __slots__ = ("max_clients", "clients")
+
+    def __init__(self, max_clients: int = STREAM_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self.clients = 0
+
+    def is_full(self) -> bool:
+        return self.clients >= self.max_clients
+
+
+class ChangeFeed:
+    """
+    Fan-out of event changes to Server-Sent Events subscribers.
+
+    Messages are numbered with the 'events' data version, so a client that
+    reconnects with Last-Event-ID is replayed exactly what it missed from a
+    bounded history. When that is impossible (history too short, a write
+    by another worker, or the client fell behind its bounded queue) the
+    client receives a 'reset' message and should re-fetch /api/events.
+    """
+
+    def __init__(
+        self,
+        history: int = STREAM_HISTORY,
+        queue_size: int = STREAM_QUEUE_SIZE,
+        limit: Optional[StreamLimit] = None,
+    ):
+        self.queue_size = queue_size
+        self.limit = limit or StreamLimit()
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=history)
+        self._subscribers: Set[_Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seq = 0
+
+    @property
+    def bound(self) -> bool:
+        return self._loop is not None
+
+    @property
+    def client_count(self) -> int:
+        return len(self._subscribers)
+
+    def is_full(self) -> bool:
+        return self.limit.is_full()
+
+    def bind(self, loop: asyncio.AbstractEventLoop, seq: int):
+        """Attach to the event loop, numbering from the current data version."""
+        self._seq = seq
+        self._history.clear()
+        self._loop = loop
+
+    def unbind(self):
+        self._loop = None
+
+    def publish(self, changes: List[database.Change]):
+        """Queue committed changes for subscribers; may be called from any thread."""
+        loop = self._loop
+        if loop is None:
+            return
+        if len(changes) > self.queue_size:
+            # Too large to stream as deltas; clients re-fetch instead
+            loop.call_soon_threadsafe(self._dispatch_reset, changes[-1][3])
+            return
+        messages = []
+        for action, event_id, event, version in changes:
+            payload = {"action": action, "id": event_id, "version": version}
+            event_json = event.to_json() if event is not None else None
+            messages.append((version, _format(version, action, payload, event_json)))
+        loop.call_soon_threadsafe(self._dispatch, messages)
+
+    def _reset_message(self) -> bytes:
+        return _format(self._seq, "reset", {"action": "reset", "version": self._seq})
+
+    def _dispatch_reset(self, seq: int):
+        self._seq = max(seq, self._seq)
+        self._history.clear()
+        self._broadcast(self._reset_message())
+
+    def _dispatch(self, messages: List[Tuple[int, bytes]]):
+        for seq, message in messages:
+            if seq != self._seq + 1:
+                # Out of order or something was missed: start a new epoch
+                self._dispatch_reset(messages[-1][0])
+                return
+            self._seq = seq
+            self._history.append((seq, message))
+            self._broadcast(message)
+
+    def _broadcast(self, message: bytes):
+        if not self._subscribers:
+            return
+        reset = self._reset_message()
+        for subscriber in self._subscribers:
+            subscriber.offer(message, reset)
+
+    def check_version(self, version: int):
+        """Reset clients if the database moved past what was published."""
+        if version > self._seq:
+            self._dispatch_reset(version)
+
+    def _backlog(self, last_id: Optional[int]) -> list:
+        if last_id is None or last_id == self._seq:
+            return []
+        if last_id > self._seq or not self._history or self._history[0][0] > last_id + 1:
+            return [self._reset_message()]
+        return [message for seq, message in self._history if seq > last_id]
+
+    async def subscribe(self, last_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yield SSE-encoded messages, starting after last_id if given."""
+        subscriber = _Subscriber(self.queue_size)
+        backlog = self._backlog(last_id)
+        self._subscribers.add(subscriber)
+        self.limit.clients += 1
+        try:
+            yield b"retry: 3000\n\n"
+            for message in backlog:
+                yield message
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscriber.queue.get(), STREAM_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    message = _KEEPALIVE
+                yield message
+        finally:
+            self._subscribers.discard(subscriber)
+            self.limit.clients -= 1
+
+
+class ChangeFeeds:
+    """
+    One ChangeFeed per tenant database, sharing a single change listener,
+    version poller and STREAM_MAX_CLIENTS limit on open streams. Feeds are
+    created when the first client of a tenant subscribes; writes to a
+    tenant nobody is watching are dropped.
+    """
+
+    def __init__(self):
+        self.limit = StreamLimit()
+        self._feeds = PerTenant(lambda: ChangeFeed(limit=self.limit))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Bind to the running loop and start watching for foreign writes."""
+        self._loop = asyncio.get_running_loop()
+        database.add_change_listener(self.publish)
+        self._poller = asyncio.create_task(self._poll_versions())
+        # The default database always has a feed
+        await self.current()
+
+    async def stop(self):
+        database.remove_change_listener(self.publish)
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        for _, feed in self._feeds.items():
+            feed.unbind()
+        self._loop = None
+
+    async def current(self) -> ChangeFeed:
+        """Get the current tenant's feed, binding it on first use."""
+        feed = self._feeds.current()
+        if not feed.bound and self._loop is not None:
+            seq = await run_db(database.get_data_version, "events")
+            if not feed.bound:
+                feed.bind(self._loop, seq)
+        return feed
+
+    def publish(self, changes: List[database.Change]):
+        """Database change listener; routes to the writing tenant's feed."""
+        feed = self._feeds.peek()
+        if feed is not None:
+            feed.publish(changes)
+
+    async def _poll_versions(self):
+        # Writes made by other workers never reach publish(); notice them
+        # through the shared data version and tell clients to resync.
+        while True:
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+            for tenant, feed in self._feeds.items():
+                if not feed.client_count:
+                    continue
+                try:
+                    with database.use_tenant(tenant):
+                        version = await run_db(database.get_data_version, "events")
+                except Exception:
+                    continue
+                feed.check_version(version)
+
+
+change_feed = ChangeFeeds()
@@ -0,0 +1,100 @@
+"""
+Command-line import/export of the timetable, and tenant provisioning.
+
+    python -m app.cli export --format ics > timetable.ics
+    python -m app.cli import backup.ndjson
+    python -m app.cli tenant create smiths
+"""
+from __future__ import annotations
+
+import argparse
+import getpass
+import sys
+
+from pydantic import ValidationError
+
+from . import database, transfer
+from .models import PINSetup
+
+
+def _tenant_command(args) -> int:
+    if args.tenant_command == "list":
+        for name in database.list_tenants():
+            print(name)
+        return 0
+
+    if not database.is_valid_tenant(args.name):
+        print(f"Invalid tenant name: {args.name!r}", file=sys.stderr)
+        return 1
+    pin_hash = None
+    if not args.no_pin:
+        pin = getpass.getpass(f"PIN for {args.name}: ") if sys.stdin.isatty() else sys.stdin.readline().strip()
+        try:
+            PINSetup(pin=pin)
+        except ValidationError:
+            print("The PIN must be 4 to 6 digits", file=sys.stderr)
+            return 1
+        # Imported here: bcrypt is only needed for this command
+        from .auth import hash_pin
+        pin_hash = hash_pin(pin)
+    if not database.create_tenant(args.name, pin_hash):
+        print(f"Tenant {args.name} already exists", file=sys.stderr)
+        return 1
+    print(f"Created tenant {args.name}", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Timetable import/export")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write all events to a file or stdout")
+    export.add_argument("--format", choices=transfer.FORMATS, default="ndjson")
+    export.add_argument("-o", "--output", help="Output file (default: stdout)")
+
+    imp = commands.add_parser("import", help="Add events from an NDJSON or ICS file")
+    imp.add_argument("file", help="Input file, or - for stdin")
+    imp.add_argument("--format", choices=transfer.FORMATS,
+                     help="Input format (default: from the file extension)")
+
+    tenant = commands.add_parser("tenant", help="Provision or list tenants (households)")
+    tenant_commands = tenant.add_subparsers(dest="tenant_command", required=True)
+    create = tenant_commands.add_parser("create", help="Create a tenant's database and set its PIN")
+    create.add_argument("name", help="Tenant name: lowercase letters, digits, - and _")
+    create.add_argument("--no-pin", action="store_true",
+                        help="Leave the PIN unset; the first /auth/setup call sets it")
+    tenant_commands.add_parser("list", help="List provisioned tenants")
+
+    args = parser.parse_args(argv)
+    if args.command == "tenant":
+        return _tenant_command(args)
+    database.init_db()
+    try:
+        if args.command == "export":
+            tz = database.get_settings()["timezone"]
+            out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+            try:
+                for text in transfer.export_lines(args.format, tz):
+                    out.write(text)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        else:
+            fmt = args.format or ("ics" if args.file.lower().endswith(".ics") else "ndjson")
+            source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+            try:
+                result = transfer.import_lines(source, fmt, tz=database.get_settings()["timezone"])
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+            print(f"Imported {result['imported']} event(s), {result['failed']} failed", file=sys.stderr)
+            for error in result["errors"]:
+                print(f"  item {error['index']}: {error['error']}", file=sys.stderr)
+            return 1 if result["failed"] else 0
+    finally:
+        database.close_db()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
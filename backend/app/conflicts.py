@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import database
+from .cache import events_cache
+from .records import EventRecord
+from .tenancy import PerTenant
+
+DAY_MINUTES = 24 * 60
+
+
+def event_interval(event) -> Tuple[int, int]:
+    """
+    An event's [start, end) in minutes of day, for a stored record or a
+    proposed event dict; same rule as the event_days index.
+    """
+    if isinstance(event, EventRecord):
+        start, end = event.start, event.end
+    else:
+        start = database.to_minutes(event["start_time"])
+        end = database.to_minutes(event["end_time"]) if event.get("end_time") else None
+    if end is None:
+        return start, start + 1
+    return start, max(end, start + 1)
+
+
+def _hhmm(minute: int) -> str:
+    minute = min(minute, DAY_MINUTES)
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def _conflict(day: int, a: int, b: int, start: int, end: int) -> dict:
+    first, second = (a, b) if a < b else (b, a)
+    return {
+        "day": day,
+        "event_id": first,
+        "other_id": second,
+        "start_time": _hhmm(start),
+        "end_time": _hhmm(end),
+    }
+
+
+class EventConflict(Exception):
+    """Raised by reject_conflicts() with the overlaps an event would have."""
+
+    def __init__(self, conflicts: List[dict]):
+        super().__init__(f"event overlaps {len(conflicts)} others")
+        self.conflicts = conflicts
+
+
+class _DayIndex:
+    """
+    Intervals of one weekday, bucketed by start minute (each bucket sorted
+    by end) under a segment tree holding the latest end in every range of
+    starts. A lookup only descends into ranges that still reach past the
+    query window's start, so it costs O(log n + k) for k overlaps however
+    long the longest interval is.
+    """
+
+    __slots__ = ("buckets", "max_end")
+
+    # Leaves of the tree: one per start minute, 00:00 to 24:00
+    SIZE = 2048
+
+    def __init__(self):
+        self.buckets: Dict[int, List[Tuple[int, int]]] = {}  # start -> [(end, id)]
+        self.max_end: List[int] = [0] * (2 * self.SIZE)
+
+    def _update(self, start: int):
+        bucket = self.buckets.get(start)
+        node = self.SIZE + start
+        self.max_end[node] = bucket[-1][0] if bucket else 0
+        node //= 2
+        while node:
+            self.max_end[node] = max(self.max_end[2 * node], self.max_end[2 * node + 1])
+            node //= 2
+
+    def add(self, event_id: int, start: int, end: int):
+        insort(self.buckets.setdefault(start, []), (end, event_id))
+        self._update(start)
+
+    def remove(self, event_id: int, start: int, end: int):
+        bucket = self.buckets.get(start)
+        if not bucket:
+            return
+        pos = bisect_left(bucket, (end, event_id))
+        if pos < len(bucket) and bucket[pos] == (end, event_id):
+            del bucket[pos]
+            if not bucket:
+                del self.buckets[start]
+            self._update(start)
+
+    def overlapping(self, start: int, end: int) -> Iterable[Tuple[int, int, int]]:
+        """Yield (id, start, end) of intervals overlapping [start, end), by start."""
+        stack = [(1, 0, self.SIZE)]
+        while stack:
+            node, lo, hi = stack.pop()
+            # Starts in [lo, hi) that begin before end and reach past start
+            if lo >= end or self.max_end[node] <= start:
+                continue
+            if node >= self.SIZE:
+                for other_end, other_id in reversed(self.buckets[lo]):
+                    if other_end <= start:
+                        break
+                    yield other_id, lo, other_end
+            else:
+                mid = (lo + hi) // 2
+                stack.append((2 * node + 1, mid, hi))
+                stack.append((2 * node, lo, mid))
+
+    def pairs(self) -> Iterable[Tuple[int, int, int, int]]:
+        """Yield every overlapping (id, other_id, start, end) with a sweep."""
+        active: List[Tuple[int, int, int]] = []  # heap of (end, start, id)
+        for start in sorted(self.buckets):
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for end, event_id in sorted(self.buckets[start], key=lambda entry: entry[1]):
+                for other_end, _, other_id in active:
+                    yield other_id, event_id, start, min(end, other_end)
+                heapq.heappush(active, (end, start, event_id))
+
+
+class ConflictIndex:
+    """
+    Per-weekday interval index over minute-of-day ranges.
+
+    Built from the cached event list and kept current from the database
+    change listener, like EventCache: committed writes are applied
+    incrementally, and a version gap (e.g. a write by another worker)
+    makes the next read rebuild it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._days: List[_DayIndex] = [_DayIndex() for _ in range(7)]
+        self._intervals: Dict[int, Tuple[Tuple[int, ...], int, int]] = {}
+        self._pairs_version: Optional[int] = None
+        self._pairs: List[dict] = []
+
+    def _ensure_current(self):
+        current = database.get_data_version("events")
+        with self._lock:
+            if self._version == current:
+                return
+        version, events = events_cache.get_events_with_version()
+        with self._lock:
+            self._days = [_DayIndex() for _ in range(7)]
+            self._intervals = {}
+            for event in events:
+                self._add(event.id, event)
+            self._version = version
+
+    def _add(self, event_id: int, event: EventRecord):
+        start, end = event_interval(event)
+        days = event.weekdays
+        for day in days:
+            self._days[day].add(event_id, start, end)
+        self._intervals[event_id] = (days, start, end)
+
+    def _remove(self, event_id: int):
+        entry = self._intervals.pop(event_id, None)
+        if entry is not None:
+            days, start, end = entry
+            for day in days:
+                self._days[day].remove(event_id, start, end)
+
+    def on_changes(self, changes: List[database.Change]):
+        """Database change listener: apply committed writes to the index."""
+        with self._lock:
+            if self._version is None:
+                return
+            expected = self._version
+            for _, _, _, version in changes:
+                expected += 1
+                if version != expected:
+                    self._version = None
+                    return
+            for _, event_id, event, _ in changes:
+                self._remove(event_id)
+                if event is not None:
+                    self._add(event_id, event)
+            self._version = expected
+
+    def find(self, event: dict, exclude_id: Optional[int] = None) -> List[dict]:
+        """Conflicts a (proposed) event would have with the stored ones."""
+        self._ensure_current()
+        start, end = event_interval(event)
+        found = []
+        with self._lock:
+            for day in sorted(set(event["days"])):
+                for other_id, other_start, other_end in self._days[day].overlapping(start, end):
+                    if other_id == exclude_id:
+                        continue
+                    found.append({
+                        "day": day,
+                        "event_id": exclude_id,
+                        "other_id": other_id,
+                        "start_time": _hhmm(max(start, other_start)),
+                        "end_time": _hhmm(min(end, other_end)),
+                    })
+        return found
+
+    def all_conflicts(self, day: Optional[int] = None) -> List[dict]:
+        """Every overlapping pair, by day then start; computed once per version."""
+        self._ensure_current()
+        with self._lock:
+            if self._pairs_version != self._version:
+                self._pairs = [
+                    _conflict(d, a, b, start, end)
+                    for d in range(7)
+                    for a, b, start, end in self._days[d].pairs()
+                ]
+                self._pairs_version = self._version
+            pairs = self._pairs
+        if day is None:
+            return pairs
+        return [c for c in pairs if c["day"] == day]
+
+
+conflict_index = PerTenant(ConflictIndex)
+
+
+def reject_conflicts(event: dict, exclude_id: Optional[int] = None):
+    """
+    Raise EventConflict if event would overlap stored events. Called from
+    a mutation run with writer.run_isolated_write(), so the index is
+    current and nothing is written between the check and the write.
+    """
+    conflicts = conflict_index.find(event, exclude_id)
+    if conflicts:
+        raise EventConflict(conflicts)
+
+
+def _on_changes(changes: List[database.Change]):
+    index = conflict_index.peek()
+    if index is not None:
+        index.on_changes(changes)
+
+
+database.add_change_listener(_on_changes)
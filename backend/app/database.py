@@ -1,227 +1,1481 @@
 from __future__ import annotations
 
+import html
 import sqlite3
 import json
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from contextlib import contextmanager
+from collections import OrderedDict
+from contextvars import ContextVar
 import os
+import re
+import secrets
+import threading
+import time
+
+from .pool import ConnectionPool
+from .records import EVENT_COLUMNS, EventRecord, to_minutes
 
 DATABASE_PATH = os.environ.get("DATABASE_PATH", "timetable.db")
 
+# Connection pool configuration
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHED_STATEMENTS = int(os.environ.get("DB_CACHED_STATEMENTS", "256"))
+
+# Multi-tenant configuration: each tenant gets its own SQLite file
+TENANT_DIR = os.environ.get("TENANT_DIR", "tenants")
+TENANT_POOL_SIZE = int(os.environ.get("TENANT_POOL_SIZE", "2"))
+# Each open connection holds up to three files (database, -wal, -shm), so
+# open tenants cost up to MAX_OPEN_TENANTS * TENANT_POOL_SIZE * 3 file
+# descriptors: 768 at the defaults, inside the usual 1024 ulimit
+MAX_OPEN_TENANTS = int(os.environ.get("MAX_OPEN_TENANTS", "128"))
+TENANT_NAME_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+_pool: Optional[ConnectionPool] = None
+_tenant_pools: "OrderedDict[str, ConnectionPool]" = OrderedDict()
+_pool_lock = threading.Lock()
+
+# Tenant for the current request/task; None means the default database
+_current_tenant: ContextVar[Optional[str]] = ContextVar("tenant", default=None)
+
+# Callbacks notified after event mutations commit. A change is
+# (action, event_id, event, version); see add_change_listener().
+Change = Tuple[str, int, Optional[EventRecord], int]
+_change_listeners: List[Callable[[List[Change]], None]] = []
+
+# Callbacks timing database work, called as observer(kind, sql, seconds);
+# see add_query_observer(). Connections are only wrapped while one is set.
+QueryObserver = Callable[[str, Optional[str], float], None]
+_query_observers: List[QueryObserver] = []
+
 
 def get_db_path() -> str:
-    """Get the database file path."""
-    return DATABASE_PATH
+    """Get the database file path for the current tenant."""
+    tenant = _current_tenant.get()
+    return DATABASE_PATH if tenant is None else tenant_db_path(tenant)
+
+
+# ============== Tenants ==============
+
+def is_valid_tenant(tenant: str) -> bool:
+    """Check a tenant name is safe to use as a file name."""
+    return bool(TENANT_NAME_PATTERN.match(tenant))
+
+
+def tenant_db_path(tenant: str) -> str:
+    """Get the SQLite file for a tenant."""
+    if not is_valid_tenant(tenant):
+        raise ValueError(f"Invalid tenant name: {tenant!r}")
+    return os.path.join(TENANT_DIR, f"{tenant}.db")
+
+
+def current_tenant() -> Optional[str]:
+    """Get the tenant the current context is scoped to (None = default)."""
+    return _current_tenant.get()
+
+
+def set_tenant(tenant: Optional[str]):
+    """Scope the current context to a tenant. Returns a token for reset_tenant()."""
+    if tenant is not None and not is_valid_tenant(tenant):
+        raise ValueError(f"Invalid tenant name: {tenant!r}")
+    return _current_tenant.set(tenant)
+
+
+def reset_tenant(token):
+    _current_tenant.reset(token)
 
 
 @contextmanager
-def get_db():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+def use_tenant(tenant: Optional[str]):
+    """Context manager scoping database calls to a tenant."""
+    token = set_tenant(tenant)
     try:
-        yield conn
+        yield
     finally:
+        reset_tenant(token)
+
+
+class UnknownTenantError(LookupError):
+    """Raised for a tenant that was never provisioned with create_tenant()."""
+
+
+def tenant_exists(tenant: str) -> bool:
+    """Check a tenant has been provisioned (its database file exists)."""
+    if not is_valid_tenant(tenant):
+        return False
+    with _pool_lock:
+        if tenant in _tenant_pools:
+            return True
+    return os.path.exists(tenant_db_path(tenant))
+
+
+def create_tenant(tenant: str, pin_hash: Optional[str] = None) -> bool:
+    """
+    Provision a tenant: create and migrate its database, with its PIN
+    already set when pin_hash is given. Returns False if the tenant
+    exists. Requests never create tenants; only this does.
+
+    The database is built under a temporary name and linked into place,
+    so a request never sees a tenant half made or before its PIN is set.
+    """
+    path = tenant_db_path(tenant)
+    os.makedirs(TENANT_DIR, exist_ok=True)
+    if os.path.exists(path):
+        return False
+    staging = f"{path}.{secrets.token_hex(4)}.new"
+    conn = sqlite3.connect(staging)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        _init_schema(conn)
+        if pin_hash is not None:
+            conn.execute(
+                "UPDATE settings SET pin_hash = ?, token_epoch = COALESCE(token_epoch, 0) + 1 WHERE id = 1",
+                (pin_hash,)
+            )
+            conn.commit()
+    finally:
+        # The last connection closing checkpoints and removes the -wal file
         conn.close()
+    try:
+        os.link(staging, path)
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(staging)
+    return True
+
+
+def list_tenants() -> List[str]:
+    """Every provisioned tenant, by name."""
+    if not os.path.isdir(TENANT_DIR):
+        return []
+    names = (name[:-3] for name in os.listdir(TENANT_DIR) if name.endswith(".db"))
+    return sorted(name for name in names if is_valid_tenant(name))
+
+
+def open_tenants() -> List[str]:
+    """Tenants with an open connection pool, least recently used first."""
+    with _pool_lock:
+        return list(_tenant_pools)
+
+
+def _get_tenant_pool(tenant: str) -> ConnectionPool:
+    with _pool_lock:
+        pool = _tenant_pools.get(tenant)
+        if pool is not None:
+            _tenant_pools.move_to_end(tenant)
+            return pool
+
+    # Opened and migrated outside the lock, so one tenant's migration does
+    # not hold up requests for the others
+    path = tenant_db_path(tenant)
+    if not os.path.exists(path):
+        raise UnknownTenantError(tenant)
+    pool = ConnectionPool(
+        path,
+        max_size=TENANT_POOL_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+        cached_statements=DB_CACHED_STATEMENTS,
+        create=False,
+    )
+    try:
+        # Brings a shard up to date after an upgrade; one pragma read otherwise
+        with pool.connection() as conn:
+            _init_schema(conn)
+    except BaseException:
+        pool.close()
+        raise
+
+    unused: List[ConnectionPool] = []
+    with _pool_lock:
+        existing = _tenant_pools.get(tenant)
+        if existing is not None:
+            # Another thread opened it meanwhile
+            _tenant_pools.move_to_end(tenant)
+            unused.append(pool)
+            pool = existing
+        else:
+            _tenant_pools[tenant] = pool
+            # Evict the least recently used idle pools to bound open files
+            for name, candidate in list(_tenant_pools.items()):
+                if len(_tenant_pools) <= MAX_OPEN_TENANTS:
+                    break
+                if name != tenant and candidate.in_use == 0:
+                    del _tenant_pools[name]
+                    unused.append(candidate)
+    for candidate in unused:
+        candidate.close()
+    return pool
+
+
+def get_pool() -> ConnectionPool:
+    """Get the connection pool for the current tenant, creating it on first use."""
+    tenant = _current_tenant.get()
+    if tenant is not None:
+        return _get_tenant_pool(tenant)
+
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DATABASE_PATH,
+                    max_size=DB_POOL_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+                    cached_statements=DB_CACHED_STATEMENTS,
+                )
+    return _pool
+
+
+@contextmanager
+def get_db():
+    """Context manager for database connections (pooled, re-entrant per thread)."""
+    pool = get_pool()
+    if pool.closed:
+        # Evicted between lookup and use; reopen
+        pool = get_pool()
+    if not _query_observers:
+        with pool.connection() as conn:
+            yield conn
+        return
+
+    nested = pool.holds_connection()
+    started = time.perf_counter()
+    with pool.connection() as conn:
+        if not nested:
+            _observe("acquire", None, time.perf_counter() - started)
+        yield _ObservedConnection(conn)
+
+
+# ============== Query Timing ==============
+
+def add_query_observer(observer: QueryObserver):
+    """
+    Register a callback timing work done through get_db().
+
+    Called as observer(kind, sql, seconds) where kind is 'acquire' (waiting
+    for a pooled connection; sql is None), 'query' (executing a statement),
+    'fetch' (reading its rows) or 'commit' (sql is None). Observers run on
+    the calling thread and must be cheap.
+    """
+    if observer not in _query_observers:
+        _query_observers.append(observer)
+
+
+def remove_query_observer(observer: QueryObserver):
+    """Unregister a query observer."""
+    if observer in _query_observers:
+        _query_observers.remove(observer)
+
+
+def _observe(kind: str, sql: Optional[str], seconds: float):
+    for observer in list(_query_observers):
+        try:
+            observer(kind, sql, seconds)
+        except Exception:
+            pass
+
+
+class _ObservedCursor:
+    """Cursor wrapper reporting statement and fetch times to the observers."""
+
+    __slots__ = ("_cursor", "_sql")
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+        self._sql: Optional[str] = None
+
+    def execute(self, sql: str, parameters=()):
+        self._sql = sql
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(sql, parameters)
+        finally:
+            _observe("query", sql, time.perf_counter() - started)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters):
+        self._sql = sql
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(sql, seq_of_parameters)
+        finally:
+            _observe("query", sql, time.perf_counter() - started)
+        return self
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            _observe("fetch", self._sql, time.perf_counter() - started)
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class _ObservedConnection:
+    """Connection wrapper handing out observed cursors and timing commits."""
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def cursor(self) -> _ObservedCursor:
+        return _ObservedCursor(self._conn.cursor())
+
+    def execute(self, sql: str, parameters=()) -> _ObservedCursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters) -> _ObservedCursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            _observe("commit", None, time.perf_counter() - started)
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+
+def pool_stats() -> dict:
+    """Get connection pool statistics for the current tenant."""
+    stats = get_pool().stats()
+    stats["open_tenants"] = len(_tenant_pools)
+    return stats
+
+
+def close_db():
+    """Close all connection pools. A later get_db() call opens fresh ones."""
+    global _pool
+    with _pool_lock:
+        pools = list(_tenant_pools.values())
+        _tenant_pools.clear()
+        if _pool is not None:
+            pools.append(_pool)
+        _pool = None
+    for pool in pools:
+        pool.close()
 
 
 def init_db():
-    """Initialize the database with tables."""
+    """Create or migrate the default database's schema."""
     with get_db() as conn:
+        _init_schema(conn)
+
+
+# ============== Schema Migrations ==============
+
+def _init_schema(conn: sqlite3.Connection):
+    """
+    Bring a connection's database up to SCHEMA_VERSION. The applied
+    version is kept in PRAGMA user_version, so an up-to-date database costs
+    one pragma read; pending migrations run in a single transaction.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have migrated while this one waited for the lock
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
         cursor = conn.cursor()
-        
-        # Events table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                start_time TEXT NOT NULL,
-                end_time TEXT,
-                days TEXT NOT NULL,
-                color TEXT DEFAULT '#3B82F6',
-                icon TEXT DEFAULT '📅',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+        for migrate in MIGRATIONS[version:]:
+            migrate(cursor)
+        if version < SCHEMA_VERSION:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def _migrate_baseline(cursor: sqlite3.Cursor):
+    """
+    Version 1: the schema as it stood before versioning. Every statement
+    is idempotent, so it also upgrades databases created by older code.
+    """
+    # Events table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            start_time TEXT NOT NULL,
+            end_time TEXT,
+            days TEXT NOT NULL,
+            color TEXT DEFAULT '#3B82F6',
+            icon TEXT DEFAULT '📅',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Settings table (single row with id=1)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            pin_hash TEXT,
+            timezone TEXT DEFAULT 'Pacific/Auckland',
+            notifications_enabled INTEGER DEFAULT 0,
+            theme TEXT DEFAULT 'default',
+            title TEXT DEFAULT 'My Timetable',
+            token_epoch INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Migration: add title column if missing (for existing DBs)
+    try:
+        cursor.execute("SELECT title FROM settings LIMIT 1")
+    except sqlite3.OperationalError:
+        cursor.execute("ALTER TABLE settings ADD COLUMN title TEXT DEFAULT 'My Timetable'")
+
+    # Migration: add token_epoch column if missing (bumped to revoke all tokens)
+    try:
+        cursor.execute("SELECT token_epoch FROM settings LIMIT 1")
+    except sqlite3.OperationalError:
+        cursor.execute("ALTER TABLE settings ADD COLUMN token_epoch INTEGER DEFAULT 0")
+    
+    # PIN attempts tracking for rate limiting
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pin_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ip_address TEXT,
+            attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            success INTEGER DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_pin_attempts_ip_time
+        ON pin_attempts (ip_address, attempt_time)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_pin_attempts_time
+        ON pin_attempts (attempt_time)
+    """)
+    
+    # Data versions: bumped by triggers on every change so that caches
+    # (in this or any other process) can cheaply detect stale data
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute(
+        "INSERT OR IGNORE INTO data_versions (name) VALUES ('events'), ('settings'), ('exceptions')"
+    )
+    for op in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS events_version_{op.lower()}
+            AFTER {op} ON events
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = 'events';
+            END
         """)
-        
-        # Settings table (single row with id=1)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                id INTEGER PRIMARY KEY CHECK (id = 1),
-                pin_hash TEXT,
-                timezone TEXT DEFAULT 'Pacific/Auckland',
-                notifications_enabled INTEGER DEFAULT 0,
-                theme TEXT DEFAULT 'default',
-                title TEXT DEFAULT 'My Timetable',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+    # Day/time index: one row per (event, day) with integer minute-of-day
+    # bounds, maintained by triggers from the events table. An event
+    # without an end time occupies just its start minute.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS event_days (
+            event_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            start_minute INTEGER NOT NULL,
+            end_minute INTEGER NOT NULL,
+            PRIMARY KEY (event_id, day)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_event_days_day_start
+        ON event_days (day, start_minute, end_minute, event_id)
+    """)
+    populate = f"""
+        INSERT OR REPLACE INTO event_days (event_id, day, start_minute, end_minute)
+        SELECT NEW.id, value, {_minutes_sql("NEW.start_time")}, {_end_minutes_sql("NEW")}
+        FROM json_each(NEW.days)
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS event_days_insert
+        AFTER INSERT ON events
+        BEGIN
+            {populate};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS event_days_update
+        AFTER UPDATE OF start_time, end_time, days ON events
+        BEGIN
+            DELETE FROM event_days WHERE event_id = NEW.id;
+            {populate};
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS event_days_delete
+        AFTER DELETE ON events
+        BEGIN
+            DELETE FROM event_days WHERE event_id = OLD.id;
+        END
+    """)
+
+    # Migration: index events created before event_days existed
+    cursor.execute(f"""
+        INSERT INTO event_days (event_id, day, start_minute, end_minute)
+        SELECT NEW.id, value, {_minutes_sql("NEW.start_time")}, {_end_minutes_sql("NEW")}
+        FROM events AS NEW, json_each(NEW.days)
+        WHERE NOT EXISTS (SELECT 1 FROM event_days d WHERE d.event_id = NEW.id)
+    """)
+
+    # Exceptions to the weekly rules on one local date: 'skip' drops the
+    # occurrence, 'modify' overrides its times/title. A NULL event_id
+    # applies to every event (e.g. a public holiday).
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS event_exceptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER REFERENCES events(id) ON DELETE CASCADE,
+            date TEXT NOT NULL,
+            kind TEXT NOT NULL DEFAULT 'skip',
+            start_time TEXT,
+            end_time TEXT,
+            title TEXT,
+            note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_event_exceptions_event_date
+        ON event_exceptions (COALESCE(event_id, 0), date)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_event_exceptions_date
+        ON event_exceptions (date)
+    """)
+    for op in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS exceptions_version_{op.lower()}
+            AFTER {op} ON event_exceptions
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = 'exceptions';
+            END
         """)
 
-        # Migration: add title column if missing (for existing DBs)
-        try:
-            cursor.execute("SELECT title FROM settings LIMIT 1")
-        except sqlite3.OperationalError:
-            cursor.execute("ALTER TABLE settings ADD COLUMN title TEXT DEFAULT 'My Timetable'")
-        
-        # PIN attempts tracking for rate limiting
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS pin_attempts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ip_address TEXT,
-                attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                success INTEGER DEFAULT 0
-            )
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS settings_version_update
+        AFTER UPDATE ON settings
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'settings';
+        END
+    """)
+
+    # Default settings row
+    cursor.execute("INSERT OR IGNORE INTO settings (id) VALUES (1)")
+
+
+def _migrate_events_start_index(cursor: sqlite3.Cursor):
+    """Version 2: index the (start_time, id) listing order for keyset pages."""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_start_id
+        ON events (start_time, id)
+    """)
+
+
+def _migrate_event_versions(cursor: sqlite3.Cursor):
+    """Version 3: a per-event version, bumped by every update (If-Match)."""
+    cursor.execute("ALTER TABLE events ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def _migrate_event_changes(cursor: sqlite3.Cursor):
+    """
+    Version 4: the sync change log. One row per event, replaced by a
+    trigger on every write, so its seq (AUTOINCREMENT, never reused) is
+    the event's latest change; deleting an event leaves a tombstone row.
+    Tombstones are compacted after a retention period; the 'sync_floor'
+    data version records the highest seq compacted away.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS event_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL UNIQUE,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_event_changes_tombstones
+        ON event_changes (changed_at) WHERE deleted = 1
+    """)
+    cursor.execute("INSERT OR IGNORE INTO data_versions (name) VALUES ('sync_floor')")
+    for op, row, deleted in (("INSERT", "NEW", 0), ("UPDATE", "NEW", 0), ("DELETE", "OLD", 1)):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS event_changes_{op.lower()}
+            AFTER {op} ON events
+            BEGIN
+                INSERT OR REPLACE INTO event_changes (event_id, deleted) VALUES ({row}.id, {deleted});
+            END
         """)
-        
-        conn.commit()
-        
-        # Insert default settings row if not exists
-        cursor.execute("SELECT id FROM settings WHERE id = 1")
-        if not cursor.fetchone():
-            cursor.execute("INSERT INTO settings (id) VALUES (1)")
+    # Existing events, so a first sync from nothing sees all of them
+    cursor.execute("""
+        INSERT OR IGNORE INTO event_changes (event_id)
+        SELECT id FROM events ORDER BY id
+    """)
+
+
+def _migrate_event_search(cursor: sqlite3.Cursor):
+    """
+    Version 5: full-text search over titles and descriptions. An FTS5
+    index over the events table itself (external content), kept in step
+    by triggers, with prefix indexes for type-ahead and title matches
+    ranked above description ones.
+    """
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+            title, description,
+            content = 'events', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4 5 6'
+        )
+    """)
+    cursor.execute("INSERT INTO events_fts (events_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    add = "INSERT INTO events_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description)"
+    remove = """
+        INSERT INTO events_fts (events_fts, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description)
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS events_fts_insert
+        AFTER INSERT ON events
+        BEGIN
+            {add};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS events_fts_update
+        AFTER UPDATE OF title, description ON events
+        BEGIN
+            {remove};
+            {add};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS events_fts_delete
+        AFTER DELETE ON events
+        BEGIN
+            {remove};
+        END
+    """)
+    cursor.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+
+
+def _migrate_database_id(cursor: sqlite3.Cursor):
+    """
+    Version 6: a random id for the database, kept as the 'database_id'
+    data version and never changed. Sync tokens carry it, so a token
+    handed out by another database is recognised as such.
+    """
+    cursor.execute(
+        "INSERT OR IGNORE INTO data_versions (name, version) VALUES ('database_id', ?)",
+        (secrets.randbits(62) + 1,)
+    )
+
+
+# Applied in order; a database at PRAGMA user_version N has run the first
+# N. Append new migrations, never edit or reorder applied ones.
+MIGRATIONS: Tuple[Callable[[sqlite3.Cursor], None], ...] = (
+    _migrate_baseline,
+    _migrate_events_start_index,
+    _migrate_event_versions,
+    _migrate_event_changes,
+    _migrate_event_search,
+    _migrate_database_id,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _minutes_sql(column: str) -> str:
+    """SQL expression converting an HH:MM column to minute of day."""
+    return f"(CAST(substr({column}, 1, 2) AS INTEGER) * 60 + CAST(substr({column}, 4, 2) AS INTEGER))"
+
+
+def _end_minutes_sql(row: str) -> str:
+    """SQL expression for an event's exclusive end minute (at least start + 1)."""
+    start = _minutes_sql(f"{row}.start_time")
+    end = _minutes_sql(f"{row}.end_time")
+    return f"(CASE WHEN {row}.end_time IS NULL THEN {start} + 1 ELSE max({end}, {start} + 1) END)"
+
+
+# ============== Data Versions & Change Listeners ==============
+
+def get_data_version(name: str = "events") -> int:
+    """
+    Get the current data version for 'events', 'settings', 'exceptions' or
+    'sync_floor', or the constant 'database_id'.
+    """
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT version FROM data_versions WHERE name = ?", (name,)
+        ).fetchone()
+        return row["version"] if row else 0
+
+
+def add_change_listener(listener: Callable[[List[Change]], None]):
+    """
+    Register a callback run after event mutations commit.
+
+    Called as listener(changes) with one (action, event_id, event, version)
+    tuple per changed row, in version order. action is 'create', 'update'
+    or 'delete', event is the new row (None on delete) and version is the
+    events data version after that change.
+    """
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def remove_change_listener(listener: Callable[[List[Change]], None]):
+    """Unregister a change listener."""
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+
+def _notify_changes(changes: List[Change]):
+    if not changes:
+        return
+    for listener in list(_change_listeners):
+        listener(changes)
+
+
+# ============== Group Commit ==============
+
+# Set on a thread while it runs a write batch: mutations on that batch's
+# pool leave committing and notifying to the batch
+_batch_state = threading.local()
+
+
+def _commit(conn: sqlite3.Connection, changes: Optional[List[Change]] = None):
+    """
+    Commit a mutation and notify change listeners of it, or, inside a
+    write_batch() on the same database, defer both to the batch.
+    """
+    pool = getattr(_batch_state, "pool", None)
+    if pool is not None and pool is get_pool():
+        _batch_state.changes.extend(changes or ())
+        return
+    conn.commit()
+    _notify_changes(changes or [])
+
+
+class BatchAborted(Exception):
+    """
+    Raised by WriteBatch.run() when a failing mutation took the whole
+    transaction down with it (SQLite rolls back on e.g. SQLITE_FULL or an
+    I/O error), so nothing run in the batch so far will be committed.
+    """
+
+
+class WriteBatch:
+    """
+    Mutations sharing one transaction. Each runs in its own savepoint, so
+    a failing one is rolled back alone and its error goes to its caller,
+    unless the transaction itself was lost (BatchAborted).
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self._changes: List[List[Change]] = []
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """Run one mutation (a function committing through _commit())."""
+        self._conn.execute("SAVEPOINT batch_write")
+        _batch_state.changes = []
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            if not self._conn.in_transaction:
+                raise BatchAborted("the write batch's transaction was rolled back") from exc
+            try:
+                self._conn.execute("ROLLBACK TO batch_write")
+                self._conn.execute("RELEASE batch_write")
+            except sqlite3.Error as rollback_error:
+                raise BatchAborted("the write batch could not be rolled back") from rollback_error
+            raise
+        self._conn.execute("RELEASE batch_write")
+        self._changes.append(_batch_state.changes)
+        return result
+
+
+@contextmanager
+def write_batch():
+    """
+    Group commit: mutations run through the yielded WriteBatch are applied
+    in one IMMEDIATE transaction, committed once on exit, after which
+    listeners are notified of each mutation's changes in order. If the
+    commit fails, or a mutation raises BatchAborted, the transaction is
+    rolled back and nothing in the batch was written.
+    """
+    with get_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        batch = WriteBatch(conn)
+        _batch_state.pool = get_pool()
+        try:
+            yield batch
             conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            _batch_state.pool = None
+    for changes in batch._changes:
+        _notify_changes(changes)
 
 
 # ============== Event CRUD Operations ==============
 
-def create_event(event_data: dict) -> dict:
+# EVENT_COLUMNS for queries joining events as e
+_JOINED_EVENT_COLUMNS = ", ".join(f"e.{name.strip()}" for name in EVENT_COLUMNS.split(","))
+
+_INSERT_EVENT_SQL = """
+    INSERT INTO events (title, description, start_time, end_time, days, color, icon)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _insert_params(event_data: dict) -> tuple:
+    """Parameters for _INSERT_EVENT_SQL."""
+    return (
+        event_data["title"],
+        event_data.get("description"),
+        event_data["start_time"],
+        event_data.get("end_time"),
+        json.dumps(event_data["days"]),
+        event_data.get("color", "#3B82F6"),
+        event_data.get("icon", "📅")
+    )
+
+
+def _update_assignments(event_data: dict) -> Tuple[List[str], list]:
+    """Build the SET clauses and values for an event update."""
+    fields = []
+    values = []
+    
+    if "title" in event_data:
+        fields.append("title = ?")
+        values.append(event_data["title"])
+    if "description" in event_data:
+        fields.append("description = ?")
+        values.append(event_data["description"])
+    if "start_time" in event_data:
+        fields.append("start_time = ?")
+        values.append(event_data["start_time"])
+    if "end_time" in event_data:
+        fields.append("end_time = ?")
+        values.append(event_data["end_time"])
+    if "days" in event_data:
+        fields.append("days = ?")
+        values.append(json.dumps(event_data["days"]))
+    if "color" in event_data:
+        fields.append("color = ?")
+        values.append(event_data["color"])
+    if "icon" in event_data:
+        fields.append("icon = ?")
+        values.append(event_data["icon"])
+    
+    return fields, values
+
+
+class VersionConflict(Exception):
+    """
+    Raised when an update or delete expected a version of an event other
+    than the stored one. current is the event as it now stands.
+    """
+
+    def __init__(self, current: EventRecord):
+        super().__init__(f"event {current.id} is at version {current.version}")
+        self.current = current
+
+
+def create_event(event_data: dict) -> EventRecord:
     """Create a new event."""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO events (title, description, start_time, end_time, days, color, icon)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            event_data["title"],
-            event_data.get("description"),
-            event_data["start_time"],
-            event_data.get("end_time"),
-            json.dumps(event_data["days"]),
-            event_data.get("color", "#3B82F6"),
-            event_data.get("icon", "📅")
-        ))
-        conn.commit()
-        event_id = cursor.lastrowid
-        return get_event(event_id)
+        cursor.execute(f"{_INSERT_EVENT_SQL} RETURNING {EVENT_COLUMNS}", _insert_params(event_data))
+        event = _row_to_event(cursor.fetchone())
+        version = get_data_version("events")
+        _commit(conn, [("create", event.id, event, version)])
+    return event
 
 
-def get_event(event_id: int) -> Optional[dict]:
+def get_event(event_id: int) -> Optional[EventRecord]:
     """Get a single event by ID."""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM events WHERE id = ?", (event_id,))
+        cursor.execute(f"SELECT {EVENT_COLUMNS} FROM events WHERE id = ?", (event_id,))
         row = cursor.fetchone()
         if row:
-            return _row_to_event(dict(row))
+            return _row_to_event(row)
         return None
 
 
-def get_all_events() -> List[dict]:
+def get_all_events() -> List[EventRecord]:
     """Get all events."""
+    return get_all_events_with_version()[1]
+
+
+def get_all_events_with_version() -> Tuple[int, List[EventRecord]]:
+    """Get all events together with the data version they correspond to."""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM events ORDER BY start_time")
-        rows = cursor.fetchall()
-        return [_row_to_event(dict(row)) for row in rows]
+        # One read transaction so the version matches the rows
+        own_txn = not conn.in_transaction
+        if own_txn:
+            cursor.execute("BEGIN")
+        try:
+            version = get_data_version("events")
+            cursor.execute(f"SELECT {EVENT_COLUMNS} FROM events ORDER BY start_time, id")
+            rows = cursor.fetchall()
+        finally:
+            if own_txn:
+                conn.commit()
+        return version, [_row_to_event(row) for row in rows]
+
+
+def get_events_after(last_id: int, limit: int) -> List[EventRecord]:
+    """
+    Get up to limit events with id > last_id, in id order. Used to walk the
+    whole table in short keyset queries without holding a connection.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {EVENT_COLUMNS} FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)
+        )
+        return [_row_to_event(row) for row in cursor.fetchall()]
+
+
+def _day_filter(
+    day: Optional[int], from_minute: Optional[int], to_minute: Optional[int]
+) -> Tuple[str, list]:
+    """event_days conditions for events on a day overlapping [from_minute, to_minute)."""
+    conditions = []
+    params: list = []
+    if day is not None:
+        conditions.append("d.day = ?")
+        params.append(day)
+    if to_minute is not None:
+        conditions.append("d.start_minute < ?")
+        params.append(to_minute)
+    if from_minute is not None:
+        conditions.append("d.end_minute > ?")
+        params.append(from_minute)
+    return " AND ".join(conditions), params
+
+
+def query_events(
+    day: Optional[int] = None,
+    from_minute: Optional[int] = None,
+    to_minute: Optional[int] = None
+) -> List[EventRecord]:
+    """
+    Get events on a day (0=Monday) overlapping [from_minute, to_minute).
+    Uses the event_days index instead of decoding every row.
+    """
+    conditions, params = _day_filter(day, from_minute, to_minute)
+    where = f"WHERE {conditions}" if conditions else ""
+    
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {EVENT_COLUMNS} FROM events WHERE id IN (
+                SELECT d.event_id FROM event_days d {where}
+            )
+            ORDER BY start_time, id
+        """, params)
+        return [_row_to_event(row) for row in cursor.fetchall()]
+
+
+def get_event_rows_page(
+    columns: str,
+    after: Optional[Tuple[str, int]],
+    limit: int,
+    day: Optional[int] = None,
+    from_minute: Optional[int] = None,
+    to_minute: Optional[int] = None
+) -> List[sqlite3.Row]:
+    """
+    Get up to limit rows of just the given columns, in (start_time, id)
+    order after the keyset position after, optionally filtered as in
+    query_events(). Served by idx_events_start_id, so a page costs the
+    same wherever it falls in the table.
+    """
+    conditions, params = _day_filter(day, from_minute, to_minute)
+    where = []
+    if after is not None:
+        where.append("(start_time, id) > (?, ?)")
+        params[:0] = after
+    if conditions:
+        where.append(f"id IN (SELECT d.event_id FROM event_days d WHERE {conditions})")
+    sql = f"SELECT {columns} FROM events"
+    if where:
+        sql += f" WHERE {' AND '.join(where)}"
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"{sql} ORDER BY start_time, id LIMIT ?", params + [limit])
+        return cursor.fetchall()
+
+
+def get_events_at(day: int, minute: int) -> List[EventRecord]:
+    """Get events in progress on a day at a minute of day."""
+    return query_events(day, minute, minute + 1)
+
+
+def get_next_events(day: int, minute: int) -> List[EventRecord]:
+    """
+    Get the event(s) starting soonest after a day and minute of day,
+    looking up to a week ahead.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        for offset in range(8):
+            check_day = (day + offset) % 7
+            # offset 7 is the same weekday next week
+            after = minute if offset == 0 else -1
+            cursor.execute("""
+                SELECT start_minute FROM event_days
+                WHERE day = ? AND start_minute > ?
+                ORDER BY start_minute LIMIT 1
+            """, (check_day, after))
+            row = cursor.fetchone()
+            if row:
+                cursor.execute(f"""
+                    SELECT {EVENT_COLUMNS} FROM events WHERE id IN (
+                        SELECT event_id FROM event_days WHERE day = ? AND start_minute = ?
+                    )
+                    ORDER BY id
+                """, (check_day, row["start_minute"]))
+                return [_row_to_event(r) for r in cursor.fetchall()]
+        return []
+
+
+_SEARCH_TERM = re.compile(r"\w+")
+SEARCH_MAX_TERMS = 8
+# Bound on the matches ranked per search, newest first; 0 ranks every
+# match
+SEARCH_CANDIDATES = int(os.environ.get("SEARCH_CANDIDATES", "1000"))
+# snippet() delimiters; control characters, so the text can be escaped
+# before they become <mark> tags
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+
+def search_query(text: str) -> Optional[str]:
+    """
+    An FTS5 query matching events containing every word of text, or None
+    if text has no words. Every word matches as a prefix, so "pia les"
+    finds "Piano lessons". Words are quoted, so FTS5 syntax in text is
+    searched for literally.
+    """
+    terms = [f'"{term}"*' for term in _SEARCH_TERM.findall(text)[:SEARCH_MAX_TERMS]]
+    return " ".join(terms) or None
+
+
+def _snippet_html(snippet: Optional[str]) -> str:
+    """HTML-escape a snippet, then turn its match delimiters into <mark> tags."""
+    return (
+        html.escape(snippet or "")
+        .replace(_MARK_OPEN, "<mark>")
+        .replace(_MARK_CLOSE, "</mark>")
+    )
+
+
+def search_events(query: str, limit: int) -> List[Tuple[EventRecord, str]]:
+    """
+    Up to limit (event, snippet) pairs matching an FTS5 query, best first.
+    snippet is the best matching fragment of the title or description as
+    HTML: the text escaped, matches wrapped in <mark></mark>. Only the
+    SEARCH_CANDIDATES newest matches are ranked.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        # Ranking scores every match, so a short prefix on a very big
+        # table would rank most of it. Instead the index is walked in
+        # rowid order to the SEARCH_CANDIDATES-th newest match, and only
+        # matches from there on are ranked.
+        first_id = 0
+        if SEARCH_CANDIDATES > 0:
+            cursor.execute("""
+                SELECT rowid FROM events_fts WHERE events_fts MATCH ?
+                ORDER BY rowid DESC LIMIT 1 OFFSET ?
+            """, (query, SEARCH_CANDIDATES - 1))
+            row = cursor.fetchone()
+            first_id = row[0] if row else 0
+        # ORDER BY rank is served by FTS5 itself, so only the returned
+        # rows are joined and get a snippet
+        cursor.execute(f"""
+            SELECT {_JOINED_EVENT_COLUMNS},
+                   snippet(events_fts, -1, ?, ?, '…', 12) AS snippet
+            FROM events_fts JOIN events e ON e.id = events_fts.rowid
+            WHERE events_fts MATCH ? AND events_fts.rowid >= ?
+            ORDER BY rank
+            LIMIT ?
+        """, (_MARK_OPEN, _MARK_CLOSE, query, first_id, limit))
+        return [(_row_to_event(row[:-1]), _snippet_html(row["snippet"])) for row in cursor.fetchall()]
+
 
+def _check_version(event_id: int, expected_version: Optional[int]):
+    """After a write matched no row: raise VersionConflict if the event exists."""
+    if expected_version is not None:
+        current = get_event(event_id)
+        if current is not None:
+            raise VersionConflict(current)
 
-def update_event(event_id: int, event_data: dict) -> Optional[dict]:
-    """Update an existing event."""
+
+def update_event(
+    event_id: int, event_data: dict, expected_version: Optional[int] = None
+) -> Optional[EventRecord]:
+    """
+    Update an existing event in one UPDATE ... RETURNING statement.
+    Returns None if it does not exist; with expected_version, raises
+    VersionConflict if it is at another version.
+    """
     with get_db() as conn:
         cursor = conn.cursor()
         
         # Build update query dynamically
-        fields = []
-        values = []
-        
-        if "title" in event_data:
-            fields.append("title = ?")
-            values.append(event_data["title"])
-        if "description" in event_data:
-            fields.append("description = ?")
-            values.append(event_data["description"])
-        if "start_time" in event_data:
-            fields.append("start_time = ?")
-            values.append(event_data["start_time"])
-        if "end_time" in event_data:
-            fields.append("end_time = ?")
-            values.append(event_data["end_time"])
-        if "days" in event_data:
-            fields.append("days = ?")
-            values.append(json.dumps(event_data["days"]))
-        if "color" in event_data:
-            fields.append("color = ?")
-            values.append(event_data["color"])
-        if "icon" in event_data:
-            fields.append("icon = ?")
-            values.append(event_data["icon"])
+        fields, values = _update_assignments(event_data)
         
         if not fields:
-            return get_event(event_id)
+            event = get_event(event_id)
+            if event is not None and expected_version not in (None, event.version):
+                raise VersionConflict(event)
+            return event
         
         fields.append("updated_at = CURRENT_TIMESTAMP")
+        fields.append("version = version + 1")
         values.append(event_id)
+        where = "id = ?"
+        if expected_version is not None:
+            where += " AND version = ?"
+            values.append(expected_version)
         
         cursor.execute(f"""
-            UPDATE events SET {', '.join(fields)} WHERE id = ?
+            UPDATE events SET {', '.join(fields)} WHERE {where}
+            RETURNING {EVENT_COLUMNS}
         """, values)
-        conn.commit()
-        
-        return get_event(event_id)
+        rows = cursor.fetchall()
+        if not rows:
+            _commit(conn)
+            _check_version(event_id, expected_version)
+            return None
+        event = _row_to_event(rows[0])
+        version = get_data_version("events")
+        _commit(conn, [("update", event_id, event, version)])
+    return event
 
 
-def delete_event(event_id: int) -> bool:
-    """Delete an event."""
+def delete_event(event_id: int, expected_version: Optional[int] = None) -> bool:
+    """
+    Delete an event in one statement. Returns False if it did not exist;
+    with expected_version, raises VersionConflict if it is at another version.
+    """
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM events WHERE id = ?", (event_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+        if expected_version is None:
+            cursor.execute("DELETE FROM events WHERE id = ? RETURNING id", (event_id,))
+        else:
+            cursor.execute(
+                "DELETE FROM events WHERE id = ? AND version = ? RETURNING id",
+                (event_id, expected_version)
+            )
+        deleted = bool(cursor.fetchall())
+        if not deleted:
+            _commit(conn)
+            _check_version(event_id, expected_version)
+            return False
+        version = get_data_version("events")
+        _commit(conn, [("delete", event_id, None, version)])
+    return deleted
 
 
-def _row_to_event(row: dict) -> dict:
-    """Convert a database row to an event dict."""
-    return {
-        "id": row["id"],
-        "title": row["title"],
-        "description": row["description"],
-        "start_time": row["start_time"],
-        "end_time": row["end_time"],
-        "days": json.loads(row["days"]),
-        "color": row["color"],
-        "icon": row["icon"],
-        "created_at": row["created_at"],
-        "updated_at": row["updated_at"]
-    }
+# ============== Bulk Event Operations ==============
+
+class BulkOperationError(Exception):
+    """
+    Raised when a batch write is rejected. Nothing is written; errors holds
+    one {"index", "id", "error"} dict per offending item.
+    """
+
+    def __init__(self, errors: List[dict]):
+        super().__init__(f"{len(errors)} item(s) rejected")
+        self.errors = errors
+
+
+def _check_batch_ids(cursor: sqlite3.Cursor, ids: List[int]):
+    """Raise BulkOperationError for duplicate or unknown ids."""
+    errors = []
+    seen = set()
+    for index, event_id in enumerate(ids):
+        if event_id in seen:
+            errors.append({"index": index, "id": event_id, "error": "Duplicate id in batch"})
+        seen.add(event_id)
+    
+    cursor.execute(
+        "SELECT id FROM events WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(ids),)
+    )
+    existing = {row["id"] for row in cursor.fetchall()}
+    for index, event_id in enumerate(ids):
+        if event_id not in existing:
+            errors.append({"index": index, "id": event_id, "error": "Event not found"})
+    
+    if errors:
+        errors.sort(key=lambda e: e["index"])
+        raise BulkOperationError(errors)
+
+
+def _select_events_by_id(cursor: sqlite3.Cursor, ids: List[int]) -> Dict[int, EventRecord]:
+    cursor.execute(
+        f"SELECT {EVENT_COLUMNS} FROM events WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(ids),)
+    )
+    return {row["id"]: _row_to_event(row) for row in cursor.fetchall()}
+
+
+def create_events(events_data: List[dict]) -> List[EventRecord]:
+    """Create many events in one transaction. Returns them in input order."""
+    if not events_data:
+        return []
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            version = get_data_version("events")
+            cursor.execute("SELECT COALESCE(MAX(id), 0) AS last_id FROM events")
+            last_id = cursor.fetchone()["last_id"]
+            cursor.executemany(_INSERT_EVENT_SQL, [_insert_params(e) for e in events_data])
+            # AUTOINCREMENT ids only grow, and we hold the write lock
+            cursor.execute(f"SELECT {EVENT_COLUMNS} FROM events WHERE id > ? ORDER BY id", (last_id,))
+            created = [_row_to_event(row) for row in cursor.fetchall()]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    _notify_changes([
+        ("create", event["id"], event, version + i + 1)
+        for i, event in enumerate(created)
+    ])
+    return created
+
+
+def update_events(updates: List[dict]) -> List[EventRecord]:
+    """
+    Update many events in one transaction. Each item is a dict with "id"
+    plus the fields to change. All-or-nothing: raises BulkOperationError if
+    any id is unknown or repeated. Returns the updated events in input order.
+    """
+    if not updates:
+        return []
+    ids = [item["id"] for item in updates]
+    
+    # Items changing the same set of fields share one executemany() call
+    groups: dict = {}
+    for item in updates:
+        fields, values = _update_assignments(item)
+        fields.append("updated_at = CURRENT_TIMESTAMP")
+        fields.append("version = version + 1")
+        values.append(item["id"])
+        groups.setdefault(tuple(fields), []).append((item["id"], values))
+    
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            _check_batch_ids(cursor, ids)
+            version = get_data_version("events")
+            order = []
+            for fields, rows in groups.items():
+                cursor.executemany(
+                    f"UPDATE events SET {', '.join(fields)} WHERE id = ?",
+                    [values for _, values in rows]
+                )
+                order.extend(event_id for event_id, _ in rows)
+            events = _select_events_by_id(cursor, ids)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    _notify_changes([
+        ("update", event_id, events[event_id], version + i + 1)
+        for i, event_id in enumerate(order)
+    ])
+    return [events[event_id] for event_id in ids]
+
+
+def delete_events(ids: List[int]) -> int:
+    """
+    Delete many events in one transaction. All-or-nothing: raises
+    BulkOperationError if any id is unknown or repeated.
+    """
+    if not ids:
+        return 0
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            _check_batch_ids(cursor, ids)
+            version = get_data_version("events")
+            cursor.execute(
+                "DELETE FROM events WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(ids),)
+            )
+            deleted = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    _notify_changes([
+        ("delete", event_id, None, version + i + 1)
+        for i, event_id in enumerate(sorted(ids))
+    ])
+    return deleted
+
+
+def _row_to_event(row) -> EventRecord:
+    """Convert a row selected as EVENT_COLUMNS to an event record."""
+    return EventRecord.from_row(row)
+
+
+# ============== Sync Change Log ==============
+
+def get_event_changes(
+    since: int, limit: int, include_deleted: bool = True
+) -> Tuple[int, int, List[Tuple[int, int, Optional[EventRecord]]]]:
+    """
+    Up to limit logged changes after seq since, oldest first, read in one
+    transaction: (head, floor, changes). head is the latest seq and floor
+    the highest one compacted away; each change is (seq, event_id, event)
+    with event None for a tombstone. Without include_deleted, tombstones
+    are skipped, which from since=0 walks every live event.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        own_txn = not conn.in_transaction
+        if own_txn:
+            cursor.execute("BEGIN")
+        try:
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'event_changes'")
+            row = cursor.fetchone()
+            head = row["seq"] if row else 0
+            floor = get_data_version("sync_floor")
+            cursor.execute(f"""
+                SELECT c.seq, c.event_id, {_JOINED_EVENT_COLUMNS}
+                FROM event_changes c LEFT JOIN events e ON e.id = c.event_id
+                WHERE c.seq > ?{"" if include_deleted else " AND c.deleted = 0"}
+                ORDER BY c.seq
+                LIMIT ?
+            """, (since, limit))
+            rows = cursor.fetchall()
+        finally:
+            if own_txn:
+                conn.commit()
+    return head, floor, [
+        (row["seq"], row["event_id"], _row_to_event(row[2:]) if row[2] is not None else None)
+        for row in rows
+    ]
+
+
+def compact_event_changes(days: int) -> int:
+    """
+    Drop tombstones older than days from the change log, raising the sync
+    floor past them. Returns how many were dropped.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("""
+                DELETE FROM event_changes
+                WHERE deleted = 1 AND changed_at < datetime('now', ?)
+                RETURNING seq
+            """, (f"-{days} days",))
+            dropped = [row["seq"] for row in cursor.fetchall()]
+            if dropped:
+                cursor.execute(
+                    "UPDATE data_versions SET version = max(version, ?) WHERE name = 'sync_floor'",
+                    (max(dropped),)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(dropped)
 
 
 # ============== Settings Operations ==============
 
 def get_settings() -> dict:
     """Get application settings."""
+    return get_settings_with_version()[1]
+
+
+def get_settings_with_version() -> Tuple[int, dict]:
+    """Get application settings together with their data version."""
+    version, settings, _ = get_settings_state()
+    return version, settings
+
+
+def get_settings_state() -> Tuple[int, dict, dict]:
+    """
+    Get the settings data version, the public settings and the private
+    auth state ({"pin_hash", "token_epoch"}).
+    """
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM settings WHERE id = 1")
-        row = cursor.fetchone()
+        own_txn = not conn.in_transaction
+        if own_txn:
+            cursor.execute("BEGIN")
+        try:
+            version = get_data_version("settings")
+            cursor.execute("SELECT * FROM settings WHERE id = 1")
+            row = cursor.fetchone()
+        finally:
+            if own_txn:
+                conn.commit()
         if row:
-            return {
+            return version, {
                 "timezone": row["timezone"],
                 "notifications_enabled": bool(row["notifications_enabled"]),
                 "theme": row["theme"],
                 "title": row["title"] or "My Timetable",
                 "pin_is_set": row["pin_hash"] is not None
+            }, {
+                "pin_hash": row["pin_hash"],
+                "token_epoch": row["token_epoch"] or 0
             }
-        return {
+        return version, {
             "timezone": "Pacific/Auckland",
             "notifications_enabled": False,
             "theme": "default",
             "title": "My Timetable",
             "pin_is_set": False
-        }
+        }, {"pin_hash": None, "token_epoch": 0}
 
 
 def update_settings(settings_data: dict) -> dict:
@@ -250,17 +1504,20 @@ def update_settings(settings_data: dict) -> dict:
             cursor.execute(f"""
                 UPDATE settings SET {', '.join(fields)} WHERE id = 1
             """, values)
-            conn.commit()
+            _commit(conn)
         
         return get_settings()
 
 
 def set_pin_hash(pin_hash: str):
-    """Set or update the PIN hash."""
+    """Set or update the PIN hash. Bumps the token epoch, revoking all tokens."""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            UPDATE settings SET pin_hash = ?, updated_at = CURRENT_TIMESTAMP WHERE id = 1
+            UPDATE settings
+            SET pin_hash = ?, token_epoch = COALESCE(token_epoch, 0) + 1,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = 1
         """, (pin_hash,))
         conn.commit()
 
@@ -274,6 +1531,91 @@ def get_pin_hash() -> Optional[str]:
         return row["pin_hash"] if row else None
 
 
+# ============== Recurrence Exceptions ==============
+
+def _row_to_exception(row) -> dict:
+    return {
+        "id": row["id"],
+        "event_id": row["event_id"],
+        "date": row["date"],
+        "kind": row["kind"],
+        "start_time": row["start_time"],
+        "end_time": row["end_time"],
+        "title": row["title"],
+        "note": row["note"],
+        "created_at": row["created_at"],
+    }
+
+
+def get_exceptions(
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None
+) -> List[dict]:
+    """Get exceptions, optionally between two YYYY-MM-DD dates (inclusive)."""
+    conditions = []
+    params: list = []
+    if from_date is not None:
+        conditions.append("date >= ?")
+        params.append(from_date)
+    if to_date is not None:
+        conditions.append("date <= ?")
+        params.append(to_date)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM event_exceptions {where} ORDER BY date, id", params)
+        return [_row_to_exception(row) for row in cursor.fetchall()]
+
+
+def get_exceptions_with_version() -> Tuple[int, List[dict]]:
+    """Get all exceptions together with the data version they correspond to."""
+    with get_db() as conn:
+        own_txn = not conn.in_transaction
+        if own_txn:
+            conn.execute("BEGIN")
+        try:
+            version = get_data_version("exceptions")
+            exceptions = get_exceptions()
+        finally:
+            if own_txn:
+                conn.commit()
+        return version, exceptions
+
+
+def create_exception(data: dict) -> dict:
+    """
+    Create an exception. Raises sqlite3.IntegrityError if the event does
+    not exist or already has an exception on that date.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO event_exceptions (event_id, date, kind, start_time, end_time, title, note)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            data.get("event_id"),
+            data["date"],
+            data.get("kind", "skip"),
+            data.get("start_time"),
+            data.get("end_time"),
+            data.get("title"),
+            data.get("note"),
+        ))
+        cursor.execute("SELECT * FROM event_exceptions WHERE id = ?", (cursor.lastrowid,))
+        exception = _row_to_exception(cursor.fetchone())
+        _commit(conn)
+        return exception
+
+
+def delete_exception(exception_id: int) -> bool:
+    """Delete an exception. Returns False if it did not exist."""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM event_exceptions WHERE id = ?", (exception_id,))
+        _commit(conn)
+        return cursor.rowcount > 0
+
+
 # ============== PIN Attempts (Rate Limiting) ==============
 
 def record_pin_attempt(ip_address: str, success: bool = False):
@@ -284,7 +1626,35 @@ def record_pin_attempt(ip_address: str, success: bool = False):
             INSERT INTO pin_attempts (ip_address, success)
             VALUES (?, ?)
         """, (ip_address, 1 if success else 0))
-        conn.commit()
+        _commit(conn)
+
+
+def record_pin_attempts(attempts: List[Tuple[str, bool, str]]):
+    """
+    Record a batch of PIN attempts in one transaction. Each attempt is
+    (ip_address, success, attempt_time as 'YYYY-MM-DD HH:MM:SS' UTC).
+    """
+    if not attempts:
+        return
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT INTO pin_attempts (ip_address, success, attempt_time)
+            VALUES (?, ?, ?)
+        """, [(ip, 1 if success else 0, when) for ip, success, when in attempts])
+        _commit(conn)
+
+
+def get_recent_failed_attempt_times(minutes: int = 5) -> List[Tuple[str, str]]:
+    """Get (ip_address, attempt_time) of failed attempts in the last N minutes."""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT ip_address, attempt_time FROM pin_attempts
+            WHERE success = 0 AND attempt_time > datetime('now', ?)
+            ORDER BY attempt_time
+        """, (f"-{minutes} minutes",))
+        return [(row["ip_address"], row["attempt_time"]) for row in cursor.fetchall()]
 
 
 def get_recent_failed_attempts(ip_address: str, minutes: int = 5) -> int:
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Execution lane configuration
+DB_THREADS = int(os.environ.get("DB_THREADS", os.environ.get("DB_POOL_SIZE", "8")))
+DB_MAX_PENDING = int(os.environ.get("DB_MAX_PENDING", "0"))  # 0 = unbounded
+CRYPTO_THREADS = int(os.environ.get("CRYPTO_THREADS", "2"))
+CRYPTO_MAX_PENDING = int(os.environ.get("CRYPTO_MAX_PENDING", "32"))
+
+
+class LaneBusyError(RuntimeError):
+    """Raised when a lane's queue is full and new work is rejected."""
+
+    def __init__(self, lane: str):
+        super().__init__(f"The {lane} worker pool is busy")
+        self.lane = lane
+
+
+class Lane:
+    """
+    A named, bounded thread pool for blocking work called from async code.
+
+    max_workers caps concurrency; max_pending (if > 0) caps the number of
+    calls queued or running, beyond which new calls fail fast with
+    LaneBusyError instead of piling up behind the pool.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int = 0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # Stats
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._peak_queued = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f"{self.name}-worker",
+                    )
+        return self._executor
+
+    def _call(self, fn: Callable[..., T]) -> T:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run fn(*args, **kwargs) on this lane and await its result."""
+        with self._lock:
+            if self.max_pending and self._queued + self._running >= self.max_pending:
+                self._rejected += 1
+                raise LaneBusyError(self.name)
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+
+        # Carry context variables (e.g. per-request state) into the worker thread
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, fn, *args, **kwargs)
+        try:
+            future = self._get_executor().submit(self._call, call)
+        except RuntimeError:
+            # Executor has been shut down
+            with self._lock:
+                self._queued -= 1
+            raise
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        """Return concurrency and queue-depth statistics."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "peak_queued": self._peak_queued,
+            }
+
+    def shutdown(self):
+        """Wait for running work and stop the worker threads."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+db_lane = Lane("db", DB_THREADS, DB_MAX_PENDING)
+crypto_lane = Lane("crypto", CRYPTO_THREADS, CRYPTO_MAX_PENDING)
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking database call on the DB lane."""
+    return await db_lane.run(fn, *args, **kwargs)
+
+
+async def run_crypto(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a CPU-heavy call (bcrypt) on the crypto lane."""
+    return await crypto_lane.run(fn, *args, **kwargs)
+
+
+def lane_stats() -> dict:
+    """Get statistics for all lanes."""
+    return {"db": db_lane.stats(), "crypto": crypto_lane.stats()}
+
+
+def shutdown():
+    """Shut down all lanes."""
+    crypto_lane.shutdown()
+    db_lane.shutdown()
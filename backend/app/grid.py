@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import threading
+from typing import Dict, List, Tuple
+
+from .cache import events_cache
+from .conflicts import DAY_MINUTES, event_interval
+from .records import EventRecord
+from .tenancy import PerTenant
+
+SLOT_CHOICES = (5, 10, 15, 20, 30, 60)
+
+
+def _lowest_free(mask: int) -> int:
+    """Index of the lowest clear bit."""
+    return (~mask & (mask + 1)).bit_length() - 1
+
+
+def layout_day(events: List[EventRecord], day: int, slot_minutes: int) -> List[dict]:
+    """
+    Place one day's events on a grid of slot_minutes rows.
+
+    Each slot is a bitmask of the lanes (side-by-side columns) in use, so
+    an event takes the lowest lane free across all of its slots. Events
+    that overlap transitively form a cluster sharing one lane count, which
+    is the width the client divides the day column by.
+    """
+    n_slots = DAY_MINUTES // slot_minutes
+    slots = [0] * n_slots
+    # joined[i]: some event covers both slot i - 1 and slot i
+    joined = [False] * n_slots
+    placed: List[dict] = []
+
+    # events is the cached list, already ordered by (start_time, id)
+    bit = 1 << day
+    for event in (e for e in events if e.days_mask & bit):
+        start, end = event_interval(event)
+        first = min(start // slot_minutes, n_slots - 1)
+        last = min(max(-(-end // slot_minutes), first + 1), n_slots)
+        used = 0
+        for i in range(first, last):
+            used |= slots[i]
+        lane = _lowest_free(used)
+        lane_bit = 1 << lane
+        for i in range(first, last):
+            slots[i] |= lane_bit
+            joined[i] = joined[i] or i > first
+        placed.append({
+            "id": event.id,
+            "start_slot": first,
+            "span": last - first,
+            "lane": lane,
+        })
+
+    # Clusters are runs of slots chained together by events spanning them;
+    # every event in a run gets the run's widest lane count
+    run_width: List[int] = [0] * n_slots
+    i = 0
+    while i < n_slots:
+        if not slots[i]:
+            i += 1
+            continue
+        j = i
+        width = 0
+        while j < n_slots and slots[j] and (j == i or joined[j]):
+            width = max(width, slots[j].bit_length())
+            j += 1
+        for k in range(i, j):
+            run_width[k] = width
+        i = j
+    for item in placed:
+        item["lanes"] = run_width[item["start_slot"]]
+    return placed
+
+
+def build_grid(events: List[EventRecord], slot_minutes: int) -> List[dict]:
+    """Layouts for all seven days (0=Monday)."""
+    return [
+        {"day": day, "placements": layout_day(events, day, slot_minutes)}
+        for day in range(7)
+    ]
+
+
+class GridCache:
+    """Serialized grid responses, memoized per events data version and slot size."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bodies: Dict[int, Tuple[int, bytes]] = {}
+
+    def get_body(self, slot_minutes: int) -> Tuple[int, bytes]:
+        version, events_body = events_cache.get_body()
+        with self._lock:
+            cached = self._bodies.get(slot_minutes)
+            if cached is not None and cached[0] == version:
+                return cached
+
+        events_version, events = events_cache.get_events_with_version()
+        while events_version != version:
+            # A write landed in between; take both from the newer version
+            version, events_body = events_cache.get_body()
+            events_version, events = events_cache.get_events_with_version()
+        days = json.dumps(build_grid(events, slot_minutes), separators=(",", ":")).encode()
+        # The event list is spliced in as already-encoded bytes
+        body = b"".join([
+            b'{"version":', str(version).encode(),
+            b',"slot_minutes":', str(slot_minutes).encode(),
+            b',"slots":', str(DAY_MINUTES // slot_minutes).encode(),
+            b',"events":', events_body,
+            b',"days":', days, b"}",
+        ])
+        with self._lock:
+            self._bodies[slot_minutes] = (version, body)
+        return version, body
+
+
+grid_cache = PerTenant(GridCache)
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from .executor import run_db
+from .tenancy import PerTenant
+
+# Encoded and compressed variants of cached bodies
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "9"))
+VARIANT_CACHE_BYTES = int(os.environ.get("VARIANT_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+_VARY = "Accept, Accept-Encoding"
+
+
+def make_etag(name: str, version: int) -> str:
+    """Build a strong ETag from a data version."""
+    return f'"{name}-{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match uses weak comparison
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+# ============== Encodings ==============
+
+# The binary formats and brotli are optional dependencies; a format whose
+# module is missing is simply never offered
+def _msgpack_encoder() -> Optional[Callable[[object], bytes]]:
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack.packb
+
+
+def _cbor_encoder() -> Optional[Callable[[object], bytes]]:
+    try:
+        import cbor2
+    except ImportError:
+        return None
+    return cbor2.dumps
+
+
+def _brotli_compressor() -> Optional[Callable[[bytes], bytes]]:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def _gzip_compressor() -> Callable[[bytes], bytes]:
+    # mtime=0 keeps the output identical for identical bodies
+    return lambda body: gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+# Binary media type -> (ETag suffix, encoder loader)
+_MEDIA_TYPES = {
+    MSGPACK: ("msgpack", _msgpack_encoder),
+    CBOR: ("cbor", _cbor_encoder),
+}
+_MEDIA_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+# Content coding -> compressor loader, in order of preference
+_CODINGS = {
+    "br": _brotli_compressor,
+    "gzip": _gzip_compressor,
+}
+
+_encoders: Dict[str, Optional[Callable]] = {}
+_encoders_lock = threading.Lock()
+
+
+def _encoder(name: str) -> Optional[Callable]:
+    """The encoder or compressor for a media type or coding, None if unavailable."""
+    try:
+        return _encoders[name]
+    except KeyError:
+        pass
+    loader = _MEDIA_TYPES[name][1] if name in _MEDIA_TYPES else _CODINGS[name]
+    with _encoders_lock:
+        if name not in _encoders:
+            _encoders[name] = loader()
+        return _encoders[name]
+
+
+def _weights(header: Optional[str]) -> Dict[str, float]:
+    """'a, b;q=0.5' -> {a: 1.0, b: 0.5}, lower-cased."""
+    weights: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        value, *params = part.split(";")
+        value = value.strip().lower()
+        if not value:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, arg = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(arg)
+                except ValueError:
+                    q = 0.0
+        weights[_MEDIA_ALIASES.get(value, value)] = q
+    return weights
+
+
+def negotiate(request: Request) -> Tuple[str, Optional[str]]:
+    """
+    (media type, content coding) to answer a request with: JSON unless
+    Accept prefers an available binary format, and the available coding
+    Accept-Encoding weighs highest (brotli on a tie), or None for identity.
+    """
+    accept = _weights(request.headers.get("accept"))
+    media = JSON
+    # No Accept header, or a wildcard, means JSON, which also wins ties
+    best = max(accept.get(name, 0.0) for name in (JSON, "application/*", "*/*")) if accept else 1.0
+    for name in _MEDIA_TYPES:
+        q = accept.get(name, 0.0)
+        if q > best and _encoder(name) is not None:
+            media, best = name, q
+
+    accept_encoding = _weights(request.headers.get("accept-encoding"))
+    coding = None
+    best = 0.0
+    for name in _CODINGS:
+        q = accept_encoding.get(name, accept_encoding.get("*", 0.0))
+        if q > best and _encoder(name) is not None:
+            coding, best = name, q
+    return media, coding
+
+
+# ============== Variant Cache ==============
+
+class VariantCache:
+    """
+    Encoded and compressed variants of cached JSON bodies, keyed on the
+    body's ETag. A variant is built once, on the first request for it
+    after a data change, and then served as is. Least recently used
+    variants are dropped beyond max_bytes; variants of old versions are
+    never requested again and age out the same way.
+    """
+
+    def __init__(self, max_bytes: int = VARIANT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._variants: "OrderedDict[Tuple[str, str, Optional[str]], bytes]" = OrderedDict()
+        self._size = 0
+
+    def lookup(self, etag: str, media: str, coding: Optional[str]) -> Optional[bytes]:
+        key = (etag, media, coding)
+        with self._lock:
+            body = self._variants.get(key)
+            if body is not None:
+                self._variants.move_to_end(key)
+            return body
+
+    def build(self, etag: str, body: bytes, media: str, coding: Optional[str]) -> bytes:
+        """Encode and compress a JSON body, caching the result (and the uncompressed encoding)."""
+        if media != JSON:
+            encoded = self.lookup(etag, media, None)
+            if encoded is None:
+                encoded = _encoder(media)(json.loads(body))
+                self._store((etag, media, None), encoded)
+            body = encoded
+        if coding is not None:
+            body = _encoder(coding)(body)
+            self._store((etag, media, coding), body)
+        return body
+
+    def _store(self, key: Tuple[str, str, Optional[str]], body: bytes):
+        with self._lock:
+            previous = self._variants.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._variants[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes and len(self._variants) > 1:
+                _, evicted = self._variants.popitem(last=False)
+                self._size -= len(evicted)
+
+
+variant_cache = PerTenant(VariantCache)
+
+
+def _variant_etag(etag: str, media: str, coding: Optional[str]) -> str:
+    # Each representation gets its own strong ETag; plain JSON keeps the base one
+    suffix = "" if media == JSON else f"-{_MEDIA_TYPES[media][0]}"
+    if coding is not None:
+        suffix += f"-{coding}"
+    return f'{etag[:-1]}{suffix}"' if suffix else etag
+
+
+async def conditional_response(request: Request, etag: str, body: bytes) -> Response:
+    """
+    Return 304 if the client already has this version, else the body in
+    the negotiated encoding and compression. body is the JSON encoding;
+    other variants come from the variant cache, built off the event loop.
+    """
+    media, coding = negotiate(request)
+    if len(body) < COMPRESS_MIN_BYTES:
+        coding = None
+    variant_etag = _variant_etag(etag, media, coding)
+    headers = {"ETag": variant_etag, "Cache-Control": "no-cache", "Vary": _VARY}
+    if etag_matches(request, variant_etag):
+        return Response(status_code=304, headers=headers)
+
+    if media != JSON or coding is not None:
+        cache = variant_cache.current()
+        variant = cache.lookup(etag, media, coding)
+        if variant is None:
+            variant = await run_db(cache.build, etag, body, media, coding)
+        body = variant
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type=media, headers=headers)
@@ -1,12 +1,23 @@
 from __future__ import annotations
 
+import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from .database import init_db
-from .routers import events, auth, settings
+from .database import UnknownTenantError, init_db, close_db
+from .executor import LaneBusyError, shutdown as shutdown_executors
+from .writer import writer
+from .changefeed import change_feed
+from .auth import pin_limiter
+from .sync import compactor
+from .tenancy import tenant_scope
+from . import metrics
+from .profiling import SLOW_REQUEST_MS, SlowRequestMiddleware
+from .routers import events, auth, settings, admin, grid, occurrences, sync
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -14,8 +25,20 @@ async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     # Startup
     init_db()
+    if metrics.METRICS_ENABLED:
+        metrics.install()
+    await change_feed.start()
+    await pin_limiter.start()
+    await compactor.start()
     yield
     # Shutdown
+    await compactor.stop()
+    await pin_limiter.stop()
+    await writer.stop()
+    await change_feed.stop()
+    shutdown_executors()
+    metrics.uninstall()
+    close_db()
 
 
 app = FastAPI(
@@ -39,10 +62,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+if SLOW_REQUEST_MS > 0:
+    app.add_middleware(SlowRequestMiddleware, threshold_ms=SLOW_REQUEST_MS)
+
+
+@app.exception_handler(LaneBusyError)
+async def lane_busy_handler(request: Request, exc: LaneBusyError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please try again shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(UnknownTenantError)
+async def unknown_tenant_handler(request: Request, exc: UnknownTenantError):
+    # Only reached if a tenant's database disappears after tenant_scope ran
+    return JSONResponse(status_code=404, content={"detail": "Unknown tenant"})
+
 
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
+    logger.exception("Unhandled error in %s %s", request.method, request.url.path)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error", "message": str(exc)}
@@ -51,8 +95,21 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 # Include routers
 app.include_router(events.router, prefix="/api", tags=["events"])
+app.include_router(grid.router, prefix="/api", tags=["grid"])
+app.include_router(occurrences.router, prefix="/api", tags=["occurrences"])
+app.include_router(sync.router, prefix="/api", tags=["sync"])
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(settings.router, prefix="/api/settings", tags=["settings"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+
+# The same API per tenant (household), each backed by its own database
+_tenant = [Depends(tenant_scope)]
+app.include_router(events.router, prefix="/api/t/{tenant}", tags=["tenants"], dependencies=_tenant)
+app.include_router(grid.router, prefix="/api/t/{tenant}", tags=["tenants"], dependencies=_tenant)
+app.include_router(occurrences.router, prefix="/api/t/{tenant}", tags=["tenants"], dependencies=_tenant)
+app.include_router(sync.router, prefix="/api/t/{tenant}", tags=["tenants"], dependencies=_tenant)
+app.include_router(auth.router, prefix="/api/t/{tenant}/auth", tags=["tenants"], dependencies=_tenant)
+app.include_router(settings.router, prefix="/api/t/{tenant}/settings", tags=["tenants"], dependencies=_tenant)
 
 
 @app.get("/")
@@ -69,3 +126,15 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    """Prometheus metrics (enable with METRICS_ENABLED=true, protect with METRICS_TOKEN)."""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not metrics.authorized(request.headers.get("authorization")):
+        raise HTTPException(
+            status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"}
+        )
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import hmac
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import database
+from .cache import token_cache
+from .executor import lane_stats
+from .writer import writer
+
+# Off by default: when disabled no middleware is installed, connections are
+# not wrapped and the observe_* helpers return immediately.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+DB_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0,
+)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_label_text(self.labelnames, labels)} {value:g}" for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, labels: Labels = (), amount: float = 1.0):
+        self.inc(labels, -amount)
+
+    def set(self, labels: Labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_label_text(self.labelnames, labels)} {value:g}" for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Labels, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((labels, list(c), t[0]) for labels, (c, t) in self._series.items())
+        lines = self._header()
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _label_text(self.labelnames, labels, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            inf = _label_text(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# ============== Metrics ==============
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+)
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+db_acquire = Histogram(
+    "db_connection_acquire_seconds", "Time waiting for a pooled connection.", buckets=DB_BUCKETS
+)
+db_query = Histogram(
+    "db_query_seconds", "Statement execution time by statement type.", ("statement",), DB_BUCKETS
+)
+db_fetch = Histogram(
+    "db_fetch_seconds", "Time reading result rows by statement type.", ("statement",), DB_BUCKETS
+)
+db_commit = Histogram("db_commit_seconds", "Commit (WAL write/fsync) time.", buckets=DB_BUCKETS)
+crypto_latency = Histogram("crypto_seconds", "bcrypt hash/verify time.", ("operation",))
+
+_METRICS: List[_Metric] = [
+    http_requests, http_latency, http_in_flight,
+    db_acquire, db_query, db_fetch, db_commit, crypto_latency,
+]
+
+
+def _statement(sql: Optional[str]) -> str:
+    """Label a statement by its leading keyword (SELECT, INSERT, ...)."""
+    if not sql:
+        return "OTHER"
+    head = sql.lstrip().split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+def _observe_db(kind: str, sql: Optional[str], seconds: float):
+    if kind == "query":
+        db_query.observe((_statement(sql),), seconds)
+    elif kind == "fetch":
+        db_fetch.observe((_statement(sql),), seconds)
+    elif kind == "acquire":
+        db_acquire.observe((), seconds)
+    elif kind == "commit":
+        db_commit.observe((), seconds)
+
+
+def observe_crypto(operation: str, seconds: float):
+    """Record a bcrypt operation; a no-op when metrics are disabled."""
+    if METRICS_ENABLED:
+        crypto_latency.observe((operation,), seconds)
+
+
+# ============== Runtime stats ==============
+
+def _stats_lines(name: str, help_text: str, samples: Iterable[Tuple[Labels, float]],
+                 labelnames: Sequence[str] = (), kind: str = "gauge") -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_label_text(labelnames, labels)} {value:g}" for labels, value in samples)
+    return lines
+
+
+# Stats keys exported as gauges (values right now) and as counters
+# (running totals, exported with a _total suffix)
+_POOL_GAUGES = ("size", "idle", "in_use", "open_tenants")
+_POOL_COUNTERS = ("acquires", "waits")
+_LANE_GAUGES = ("queued", "running", "peak_queued")
+_LANE_COUNTERS = ("completed", "rejected")
+_WRITER_GAUGES = ("queued", "largest_batch")
+_WRITER_COUNTERS = ("written", "failed", "batches")
+_TOKEN_GAUGES = ("size",)
+_TOKEN_COUNTERS = ("hits", "misses")
+
+
+def _runtime_lines() -> List[str]:
+    lines: List[str] = []
+    pool = database.pool_stats()
+    for key in _POOL_GAUGES:
+        lines += _stats_lines(f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')}.",
+                              [((), pool[key])])
+    for key in _POOL_COUNTERS:
+        lines += _stats_lines(f"db_pool_{key}_total", f"Connection pool {key}.",
+                              [((), pool[key])], kind="counter")
+    lines += _stats_lines("db_pool_wait_seconds_total", "Time spent waiting for a connection.",
+                          [((), pool["wait_time_total_ms"] / 1000)], kind="counter")
+
+    lanes = lane_stats()
+    for key in _LANE_GAUGES:
+        lines += _stats_lines(
+            f"executor_{key}", f"Worker pool {key.replace('_', ' ')} tasks.",
+            [((lane,), stats[key]) for lane, stats in lanes.items()], ("lane",),
+        )
+    for key in _LANE_COUNTERS:
+        lines += _stats_lines(
+            f"executor_{key}_total", f"Worker pool {key} tasks.",
+            [((lane,), stats[key]) for lane, stats in lanes.items()], ("lane",), "counter",
+        )
+
+    writes = writer.stats()
+    for key in _WRITER_GAUGES:
+        lines += _stats_lines(f"db_writer_{key}", f"Group-commit writer {key.replace('_', ' ')}.",
+                              [((), writes[key])])
+    for key in _WRITER_COUNTERS:
+        lines += _stats_lines(f"db_writer_{key}_total", f"Group-commit writer {key}.",
+                              [((), writes[key])], kind="counter")
+
+    tokens = token_cache.stats()
+    for key in _TOKEN_GAUGES:
+        lines += _stats_lines(f"token_cache_{key}", f"Verified-token cache {key}.",
+                              [((), tokens[key])])
+    for key in _TOKEN_COUNTERS:
+        lines += _stats_lines(f"token_cache_{key}_total", f"Verified-token cache {key}.",
+                              [((), tokens[key])], kind="counter")
+    return lines
+
+
+def render() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    lines.extend(_runtime_lines())
+    return "\n".join(lines) + "\n"
+
+
+def authorized(authorization: Optional[str]) -> bool:
+    """Check an Authorization header against METRICS_TOKEN (open when unset)."""
+    if not METRICS_TOKEN:
+        return True
+    scheme, _, token = (authorization or "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), METRICS_TOKEN.encode())
+
+
+# ============== Middleware ==============
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status and in-flight
+    requests. Event streams (text/event-stream) stay open for as long as
+    the client listens, so they are counted but leave the in-flight gauge
+    once the stream starts and are kept out of the latency histogram.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming = True
+                        http_in_flight.dec()
+                        break
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            # Label by route template so ids do not explode the series count
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            if not streaming:
+                http_in_flight.dec()
+                http_latency.observe((method, path), elapsed)
+            http_requests.inc((method, path, str(status_code)))
+
+
+def install():
+    """Start recording database timings (middleware is added by main)."""
+    database.add_query_observer(_observe_db)
+
+
+def uninstall():
+    database.remove_query_observer(_observe_db)
@@ -1,18 +1,23 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Annotated, List, Literal, Optional, Union
 from pydantic import BaseModel, Field
 
+# HH:MM on a 24-hour clock; 24:00 is allowed as the end of the day
+TIME_PATTERN = r"^(([01]\d|2[0-3]):[0-5]\d|24:00)$"
+
+Weekday = Annotated[int, Field(ge=0, le=6)]  # 0=Monday, 6=Sunday
+
 
 # ============== Event Models ==============
 
 class EventBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
-    start_time: str = Field(..., pattern=r"^\d{2}:\d{2}$")  # HH:MM format
-    end_time: Optional[str] = Field(None, pattern=r"^\d{2}:\d{2}$")
-    days: List[int] = Field(..., min_length=1)  # 0=Monday, 6=Sunday
+    start_time: str = Field(..., pattern=TIME_PATTERN)  # HH:MM format
+    end_time: Optional[str] = Field(None, pattern=TIME_PATTERN)
+    days: List[Weekday] = Field(..., min_length=1)
     color: str = Field(default="#3B82F6", pattern=r"^#[0-9A-Fa-f]{6}$")
     icon: str = Field(default="📅")
 
@@ -24,22 +29,147 @@ class EventCreate(EventBase):
 class EventUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
-    start_time: Optional[str] = Field(None, pattern=r"^\d{2}:\d{2}$")
-    end_time: Optional[str] = Field(None, pattern=r"^\d{2}:\d{2}$")
-    days: Optional[List[int]] = None
+    start_time: Optional[str] = Field(None, pattern=TIME_PATTERN)
+    end_time: Optional[str] = Field(None, pattern=TIME_PATTERN)
+    days: Optional[List[Weekday]] = Field(None, min_length=1)
     color: Optional[str] = Field(None, pattern=r"^#[0-9A-Fa-f]{6}$")
     icon: Optional[str] = None
 
 
+class EventBulkUpdate(EventUpdate):
+    id: int
+
+
+class EventBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+
+class BulkDeleteResult(BaseModel):
+    deleted: int
+
+
 class Event(EventBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    version: int = 1
 
     class Config:
         from_attributes = True
 
 
+class GridPlacement(BaseModel):
+    id: int
+    start_slot: int
+    span: int  # number of slots covered
+    lane: int  # column within the day, 0-based
+    lanes: int  # columns shared by this event's overlap cluster
+
+
+class GridDay(BaseModel):
+    day: int  # 0=Monday
+    placements: List[GridPlacement]
+
+
+class GridLayout(BaseModel):
+    version: int
+    slot_minutes: int
+    slots: int
+    events: List[Event]
+    days: List[GridDay]
+
+
+class Conflict(BaseModel):
+    day: int  # 0=Monday
+    event_id: Optional[int]  # None for an event that is not saved yet
+    other_id: int
+    start_time: str  # HH:MM, start of the overlap
+    end_time: str  # HH:MM, end of the overlap
+
+
+class SearchHit(BaseModel):
+    event: Event
+    snippet: str  # best matching fragment, matches wrapped in <mark></mark>
+
+
+# ============== Occurrence Models ==============
+
+class EventExceptionCreate(BaseModel):
+    event_id: Optional[int] = None  # None applies to every event (holiday)
+    date: date
+    kind: Literal["skip", "modify"] = "skip"
+    start_time: Optional[str] = Field(None, pattern=TIME_PATTERN)
+    end_time: Optional[str] = Field(None, pattern=TIME_PATTERN)
+    title: Optional[str] = Field(None, min_length=1, max_length=100)
+    note: Optional[str] = Field(None, max_length=200)
+
+
+class EventException(EventExceptionCreate):
+    id: int
+    created_at: datetime
+
+
+class Occurrence(BaseModel):
+    event_id: int
+    date: date
+    start: datetime  # local time with UTC offset
+    end: Optional[datetime] = None
+    title: str
+    color: str
+    icon: str
+    modified: bool = False
+
+
+# ============== Sync Models ==============
+
+class SyncCreate(BaseModel):
+    op: Literal["create"]
+    client_id: Optional[str] = Field(None, max_length=100)  # echoed back with the new id
+    event: EventCreate
+
+
+class SyncUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    base_version: int  # version the offline edit was made to
+    changes: EventUpdate
+    base: Optional[EventUpdate] = None  # changed fields as they were at base_version
+
+
+class SyncDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+    base_version: Optional[int] = None
+
+
+SyncOperation = Annotated[Union[SyncCreate, SyncUpdate, SyncDelete], Field(discriminator="op")]
+
+
+class SyncUpload(BaseModel):
+    operations: List[SyncOperation] = Field(..., min_length=1, max_length=500)
+
+
+class SyncResult(BaseModel):
+    index: int
+    status: Literal["applied", "merged", "conflict"]
+    id: Optional[int] = None
+    client_id: Optional[str] = None
+    event: Optional[Event] = None  # as it now stands; None once deleted
+    conflicts: List[str] = []  # fields where the server's value was kept
+
+
+class SyncUploadResult(BaseModel):
+    results: List[SyncResult]
+
+
+class SyncChanges(BaseModel):
+    token: str  # opaque; pass back as since
+    reset: bool  # true: drop local events first, changed is a full copy
+    more: bool  # true: call again with token for the rest
+    changed: List[Event]
+    deleted: List[int]
+
+
 # ============== Auth Models ==============
 
 class PINSetup(BaseModel):
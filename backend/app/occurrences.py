@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import calendar
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from . import database
+from .cache import events_cache, settings_cache
+from .records import EventRecord, format_minutes, to_minutes
+from .tenancy import PerTenant
+
+OCCURRENCE_MAX_DAYS = int(os.environ.get("OCCURRENCE_MAX_DAYS", "366"))
+OCCURRENCE_CACHE_MONTHS = int(os.environ.get("OCCURRENCE_CACHE_MONTHS", "24"))
+
+DEFAULT_TIMEZONE = "Pacific/Auckland"
+
+
+def _offset_text(offset: timedelta) -> str:
+    minutes = int(offset.total_seconds() // 60)
+    sign = "+" if minutes >= 0 else "-"
+    minutes = abs(minutes)
+    return f"{sign}{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class _DayClock:
+    """UTC offsets of local times on one date."""
+
+    __slots__ = ("day", "tz", "offset")
+
+    def __init__(self, day: date, tz: ZoneInfo):
+        self.day = day
+        self.tz = tz
+        first = datetime(day.year, day.month, day.day, 0, 0, tzinfo=tz).utcoffset()
+        last = datetime(day.year, day.month, day.day, 23, 59, tzinfo=tz).utcoffset()
+        # One offset for the whole date unless it is a DST changeover
+        self.offset = _offset_text(first) if first == last else None
+
+    def offset_at(self, hhmm: str) -> str:
+        if self.offset is not None:
+            return self.offset
+        hours, minutes = hhmm.split(":")
+        local = datetime(self.day.year, self.day.month, self.day.day,
+                         int(hours), int(minutes), tzinfo=self.tz)
+        return _offset_text(local.utcoffset())
+
+
+# Stands in for the date in day templates; JSON encoding escapes any NUL
+# in titles, so it cannot clash with event data
+_DATE_MARK = "\x00"
+
+
+class _Rules:
+    """
+    Everything needed to expand occurrences for one set of data versions.
+
+    Without exceptions, a date's occurrences depend only on its weekday and
+    UTC offset, so each (weekday, offset) is encoded once as a template and
+    a date costs one join of the template's pieces around it. Dates with
+    exceptions or a DST changeover are encoded event by event.
+    """
+
+    __slots__ = ("stamp", "tz", "by_weekday", "static", "skipped_dates",
+                 "exceptions", "exception_dates", "templates")
+
+    def __init__(self, stamp: tuple, tz: ZoneInfo, events: List[EventRecord], exceptions: List[dict]):
+        self.stamp = stamp
+        self.tz = tz
+        # Per weekday, events in start-time order (the cached list is sorted)
+        self.by_weekday: List[List[EventRecord]] = [[] for _ in range(7)]
+        # Pre-encoded JSON for the fields that do not vary by date
+        self.static: Dict[int, str] = {}
+        for event in events:
+            for day in event.weekdays:
+                self.by_weekday[day].append(event)
+            self.static[event.id] = self._encode_static(event, event.title)
+        self.skipped_dates = set()
+        self.exceptions: Dict[Tuple[int, str], dict] = {}
+        self.exception_dates = set()
+        for exception in exceptions:
+            if exception["event_id"] is None:
+                if exception["kind"] == "skip":
+                    self.skipped_dates.add(exception["date"])
+            else:
+                self.exceptions[(exception["event_id"], exception["date"])] = exception
+                self.exception_dates.add(exception["date"])
+        # (weekday, offset) -> the day's JSON split where the date goes
+        self.templates: Dict[Tuple[int, str], List[bytes]] = {}
+
+    @staticmethod
+    def _encode_static(event: EventRecord, title: str) -> str:
+        return (
+            f'"event_id":{event.id},"title":{json.dumps(title, ensure_ascii=False)},'
+            f'"color":{json.dumps(event.color)},"icon":{json.dumps(event.icon, ensure_ascii=False)}'
+        )
+
+    def expand_day(self, day: date) -> bytes:
+        """Comma-joined JSON objects for the occurrences on one local date."""
+        iso = day.isoformat()
+        if iso in self.skipped_dates:
+            return b""
+        clock = _DayClock(day, self.tz)
+        if clock.offset is None or iso in self.exception_dates:
+            return ",".join(self._encode_day(clock, iso, iso)).encode()
+
+        key = (day.weekday(), clock.offset)
+        pieces = self.templates.get(key)
+        if pieces is None:
+            template = ",".join(self._encode_day(clock, _DATE_MARK, None))
+            pieces = [piece.encode() for piece in template.split(_DATE_MARK)]
+            self.templates[key] = pieces
+        return iso.encode().join(pieces)
+
+    def _encode_day(self, clock: _DayClock, iso: str, exception_date: Optional[str]) -> List[str]:
+        items = []
+        for event in self.by_weekday[clock.day.weekday()]:
+            start_time, end_time = event.start_time, event.end_time
+            static = self.static[event.id]
+            modified = "false"
+            exception = (
+                self.exceptions.get((event.id, exception_date))
+                if exception_date is not None else None
+            )
+            if exception is not None:
+                if exception["kind"] == "skip":
+                    continue
+                if exception["start_time"] and not exception["end_time"] and end_time:
+                    # Moving only the start keeps the usual duration
+                    duration = event.end - event.start
+                    end_time = format_minutes(min(to_minutes(exception["start_time"]) + duration, 24 * 60 - 1))
+                start_time = exception["start_time"] or start_time
+                end_time = exception["end_time"] or end_time
+                if exception["title"]:
+                    static = self._encode_static(event, exception["title"])
+                modified = "true"
+            end = f'"{iso}T{end_time}:00{clock.offset_at(end_time)}"' if end_time else "null"
+            items.append(
+                f'{{"date":"{iso}","start":"{iso}T{start_time}:00{clock.offset_at(start_time)}","end":{end},'
+                f'{static},"modified":{modified}}}'
+            )
+        return items
+
+
+class OccurrenceCache:
+    """
+    Expanded occurrences, cached one calendar month at a time.
+
+    A month is stored as pre-encoded JSON plus where each date ends in it, so
+    any window is served by slicing the months it touches. Everything is keyed
+    on the events and exceptions data versions and the settings timezone;
+    a change to any of them drops the cached months.
+    """
+
+    def __init__(self, max_months: int = OCCURRENCE_CACHE_MONTHS):
+        self.max_months = max_months
+        self._lock = threading.Lock()
+        self._rules: Optional[_Rules] = None
+        self._months: "OrderedDict[Tuple[int, int], Tuple[bytes, List[int]]]" = OrderedDict()
+
+    def _current_rules(self) -> _Rules:
+        events_version, events = events_cache.get_events_with_version()
+        exceptions_version = database.get_data_version("exceptions")
+        tz_name = settings_cache.get_settings().get("timezone") or DEFAULT_TIMEZONE
+        stamp = (events_version, exceptions_version, tz_name)
+        with self._lock:
+            if self._rules is not None and self._rules.stamp == stamp:
+                return self._rules
+
+        exceptions_version, exceptions = database.get_exceptions_with_version()
+        try:
+            tz = ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            tz = ZoneInfo(DEFAULT_TIMEZONE)
+        rules = _Rules((events_version, exceptions_version, tz_name), tz, events, exceptions)
+        with self._lock:
+            if self._rules is None or self._rules.stamp != rules.stamp:
+                self._rules = rules
+                self._months.clear()
+        return rules
+
+    def month(self, year: int, month: int) -> Tuple[bytes, List[int]]:
+        """
+        The month's occurrences as one comma-joined buffer, plus where each
+        date's occurrences end in it (bounds[d] for day d, bounds[0] = 0).
+        """
+        rules = self._current_rules()
+        key = (year, month)
+        with self._lock:
+            if self._rules is rules and key in self._months:
+                self._months.move_to_end(key)
+                return self._months[key]
+
+        parts: List[bytes] = []
+        bounds = [0]
+        size = 0
+        for d in range(1, calendar.monthrange(year, month)[1] + 1):
+            text = rules.expand_day(date(year, month, d))
+            if text:
+                if parts:
+                    parts.append(b",")
+                    size += 1
+                parts.append(text)
+                size += len(text)
+            bounds.append(size)
+        entry = (b"".join(parts), bounds)
+        with self._lock:
+            if self._rules is rules:
+                self._months[key] = entry
+                while len(self._months) > self.max_months:
+                    self._months.popitem(last=False)
+        return entry
+
+    def slice(self, year: int, month: int, first: int, last: int) -> bytes:
+        """Comma-joined occurrences on days first..last of one month."""
+        body, bounds = self.month(year, month)
+        if first == 1 and last == len(bounds) - 1:
+            return body
+        # A slice can begin with the comma separating it from earlier days
+        return body[bounds[first - 1]:bounds[last]].lstrip(b",")
+
+
+occurrence_cache = PerTenant(OccurrenceCache)
+
+
+def month_spans(start: date, end: date) -> Iterator[Tuple[int, int, int, int]]:
+    """(year, month, first day, last day) for each month start..end touches."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        first = start.day if (year, month) == (start.year, start.month) else 1
+        last = end.day if (year, month) == (end.year, end.month) else calendar.monthrange(year, month)[1]
+        yield year, month, first, last
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def encode_window(start: date, end: date) -> bytes:
+    """The occurrences from start to end (inclusive) as one JSON array."""
+    chunks = (occurrence_cache.slice(*span) for span in month_spans(start, end))
+    return b"[" + b",".join(chunk for chunk in chunks if chunk) + b"]"
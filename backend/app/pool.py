@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of long-lived SQLite connections.
+
+    A thread that already holds a connection gets the same one back on
+    nested acquires, so helpers like get_event() called from inside
+    create_event() share a single connection. Idle connections remember
+    the thread that last used them and are handed back to that thread
+    first, which keeps each worker thread on a warm connection with its
+    own statement cache.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 8,
+        timeout: float = 10.0,
+        busy_timeout_ms: int = 5000,
+        cached_statements: int = 256,
+        create: bool = True,
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        # Without create, a missing file is an error rather than a new database
+        self.create = create
+
+        self._cond = threading.Condition()
+        self._idle: List[sqlite3.Connection] = []
+        self._owners: Dict[int, int] = {}
+        self._local = threading.local()
+        self._size = 0
+        self._closed = False
+
+        # Stats
+        self._acquires = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path if self.create else f"file:{quote(os.path.abspath(self.path))}?mode=rw",
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            uri=not self.create,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        thread_id = threading.get_ident()
+        started = time.perf_counter()
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                if self._idle:
+                    # Prefer the connection this thread used last time
+                    for i in range(len(self._idle) - 1, -1, -1):
+                        if self._owners.get(id(self._idle[i])) == thread_id:
+                            conn = self._idle.pop(i)
+                            break
+                    else:
+                        conn = self._idle.pop()
+                    break
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            self._acquires += 1
+            if waited:
+                elapsed = time.perf_counter() - started
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        with self._cond:
+            self._owners[id(conn)] = thread_id
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection):
+        # Never hand a connection with an open transaction to the next user
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                self._owners.pop(id(conn), None)
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._cond:
+            self._size -= 1
+            self._owners.pop(id(conn), None)
+            self._cond.notify()
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection (re-entrant per thread)."""
+        held: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._checkin(conn)
+
+    def holds_connection(self) -> bool:
+        """Whether the calling thread already has a connection checked out."""
+        return getattr(self._local, "conn", None) is not None
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def in_use(self) -> int:
+        """Number of connections currently checked out."""
+        with self._cond:
+            return self._size - len(self._idle)
+
+    def stats(self) -> dict:
+        """Return pool size and wait-time statistics."""
+        with self._cond:
+            return {
+                "path": self.path,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "acquires": self._acquires,
+                "waits": self._waits,
+                "wait_time_total_ms": round(self._wait_time * 1000, 3),
+                "wait_time_max_ms": round(self._max_wait * 1000, 3),
+            }
+
+    def close(self):
+        """Close idle connections; busy ones are closed when they are returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            for conn in idle:
+                self._owners.pop(id(conn), None)
+            self._cond.notify_all()
+        for conn in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
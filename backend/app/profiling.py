@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import database
+
+# Slow-request log: off when SLOW_REQUEST_MS is 0
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_MAX_QUERIES = int(os.environ.get("SLOW_REQUEST_MAX_QUERIES", "20"))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "60"))
+
+logger = logging.getLogger("app.slow_requests")
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _in_app_code(frame) -> bool:
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(_APP_DIR):
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _collapse(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the whole worker process.
+
+    A background thread wakes every interval, reads every other thread's
+    current stack from sys._current_frames() and counts identical stacks.
+    Nothing is hooked into the code being profiled, so the overhead is
+    one stack walk per thread per sample. Results use the collapsed-stack
+    format ("thread;outer;...;inner count") read by flamegraph.pl,
+    speedscope and similar tools. Only one profile runs at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float, interval: float = 0.005) -> Tuple[str, int]:
+        """Sample for seconds; returns the collapsed stacks and sample count."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            return self._sample(seconds, interval)
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _sample(seconds: float, interval: float) -> Tuple[str, int]:
+        me = threading.get_ident()
+        counts: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _collapse(frame)
+                counts[";".join([names.get(ident, str(ident)), *stack])] += 1
+            samples += 1
+            time.sleep(interval)
+        lines = [f"{stack} {count}" for stack, count in counts.most_common()]
+        return "\n".join(lines) + "\n", samples
+
+
+profiler = SamplingProfiler()
+
+
+# ============== Slow-request log ==============
+
+class _Trace:
+    """SQL timings and worker threads seen while serving one request."""
+
+    __slots__ = ("queries", "threads", "stacks")
+
+    def __init__(self):
+        self.queries: List[Tuple[str, Optional[str], float]] = []
+        self.threads: Set[int] = set()
+        self.stacks: Optional[Dict[str, str]] = None
+
+
+# Worker threads inherit this through the context copied by run_db()
+_current_trace: ContextVar[Optional[_Trace]] = ContextVar("request_trace", default=None)
+
+
+def _record_query(kind: str, sql: Optional[str], seconds: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.queries.append((kind, sql, seconds))
+        trace.threads.add(threading.get_ident())
+
+
+def _summarize_queries(trace: _Trace) -> List[str]:
+    totals: Dict[Tuple[str, str], List[float]] = {}
+    for kind, sql, seconds in trace.queries:
+        key = (kind, " ".join((sql or "").split())[:200])
+        entry = totals.setdefault(key, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+    ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+    lines = [
+        f"  {total * 1000:9.3f} ms  x{count:<4d} {kind:7s} {sql}"
+        for (kind, sql), (count, total) in ranked[:SLOW_REQUEST_MAX_QUERIES]
+    ]
+    if len(ranked) > SLOW_REQUEST_MAX_QUERIES:
+        lines.append(f"  ... {len(ranked) - SLOW_REQUEST_MAX_QUERIES} more statements")
+    return lines
+
+
+class SlowRequestMiddleware:
+    """
+    ASGI middleware logging requests slower than SLOW_REQUEST_MS.
+
+    Each request gets a trace collecting the SQL run through get_db() on
+    its behalf. A watchdog thread checks running requests; once one passes
+    the threshold it snapshots the stacks of the event loop thread and the
+    worker threads that did database work for it, so the log shows what
+    was happening while the request was slow rather than after it ended.
+    """
+
+    def __init__(self, app: ASGIApp, threshold_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.threshold = threshold_ms / 1000
+        self._lock = threading.Lock()
+        self._active: Dict[int, Tuple[float, _Trace, int]] = {}
+        self._next_id = 0
+        self._watchdog: Optional[threading.Thread] = None
+        database.add_query_observer(_record_query)
+
+    def _ensure_watchdog(self):
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="slow-request-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    def _watch(self):
+        interval = min(max(self.threshold / 2, 0.01), 1.0)
+        while True:
+            time.sleep(interval)
+            now = time.perf_counter()
+            with self._lock:
+                overdue = [
+                    (trace, loop_thread) for started, trace, loop_thread in self._active.values()
+                    if trace.stacks is None and now - started >= self.threshold
+                ]
+            if not overdue:
+                continue
+            frames = sys._current_frames()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            # Worker threads busy in our code (e.g. a bcrypt verify) may be
+            # working for this request even if they never touched the database
+            busy = {ident for ident, frame in frames.items() if _in_app_code(frame)}
+            busy.discard(threading.get_ident())
+            for trace, loop_thread in overdue:
+                trace.stacks = {
+                    ("event loop" if ident == loop_thread else names.get(ident, f"thread {ident}")):
+                        "".join(traceback.format_stack(frames[ident]))
+                    for ident in {loop_thread, *trace.threads, *busy} if ident in frames
+                }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self._ensure_watchdog()
+        status_code = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Event streams stay open by design; never report them
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        trace = _Trace()
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self._active[request_id] = (started, trace, threading.get_ident())
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                del self._active[request_id]
+            _current_trace.reset(token)
+            if elapsed >= self.threshold and not streaming:
+                self._log(scope, status_code, elapsed, trace)
+
+    @staticmethod
+    def _log(scope: Scope, status_code: int, elapsed: float, trace: _Trace):
+        route = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+        db_total = sum(seconds for _, _, seconds in trace.queries)
+        lines = [
+            f"Slow request: {scope['method']} {route} -> {status_code} in {elapsed * 1000:.1f} ms "
+            f"({len(trace.queries)} db operations, {db_total * 1000:.1f} ms in database)"
+        ]
+        lines.extend(_summarize_queries(trace))
+        if trace.stacks:
+            for name, stack in trace.stacks.items():
+                lines.append(f"  stack ({name}) when the threshold was passed:")
+                lines.extend("    " + line for line in stack.rstrip().splitlines())
+        logger.warning("\n".join(lines))
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from . import database
+from .executor import run_db
+from .writer import writer
+
+# Background bookkeeping configuration
+ATTEMPT_FLUSH_SECONDS = float(os.environ.get("ATTEMPT_FLUSH_SECONDS", "2"))
+ATTEMPT_PRUNE_SECONDS = float(os.environ.get("ATTEMPT_PRUNE_SECONDS", "600"))
+ATTEMPT_RETENTION_HOURS = int(os.environ.get("ATTEMPT_RETENTION_HOURS", "24"))
+RATE_LIMIT_MAX_IPS = int(os.environ.get("RATE_LIMIT_MAX_IPS", "100000"))
+MAX_PENDING_ATTEMPTS = 10000
+
+
+def _utc_timestamp(when: float) -> str:
+    """Format like SQLite's CURRENT_TIMESTAMP."""
+    return datetime.fromtimestamp(when, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class PinAttemptLimiter:
+    """
+    In-memory sliding-window limiter for failed PIN attempts, per tenant
+    and IP.
+
+    Each IP keeps a ring buffer of its last max_attempts failure times, so
+    the check is O(1): the IP is locked out while the buffer is full and
+    its oldest entry is still inside the window. IPs are kept in order of
+    their latest failure, so idle ones are evicted from the front in time
+    proportional to how many expired. Attempts are queued and written to
+    pin_attempts in batches by a background task, which also evicts idle
+    IPs and prunes old rows. On start, recent failures are
+    loaded back from the database so a restart does not lift a lockout;
+    tenants are loaded the first time they are checked.
+    """
+
+    def __init__(self, max_attempts: int, window_seconds: float, max_ips: int = RATE_LIMIT_MAX_IPS):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.max_ips = max_ips
+        self._lock = threading.Lock()
+        self._failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._pending: List[Tuple[Optional[str], str, bool, str]] = []
+        self._loaded: Set[Optional[str]] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(ip_address: str) -> str:
+        tenant = database.current_tenant()
+        return ip_address if tenant is None else f"{tenant}/{ip_address}"
+
+    def is_limited(self, ip_address: str, now: Optional[float] = None) -> bool:
+        """Check whether an IP is locked out of the current tenant."""
+        now = time.time() if now is None else now
+        with self._lock:
+            failures = self._failures.get(self._key(ip_address))
+            return (
+                failures is not None
+                and len(failures) >= self.max_attempts
+                and failures[0] > now - self.window_seconds
+            )
+
+    def record(self, ip_address: str, success: bool, now: Optional[float] = None):
+        """Record an attempt; it is persisted by the next flush."""
+        now = time.time() if now is None else now
+        tenant = database.current_tenant()
+        with self._lock:
+            self._pending.append((tenant, ip_address, success, _utc_timestamp(now)))
+            if not success:
+                self._add_failure(self._key(ip_address), now)
+
+    def _add_failure(self, key: str, when: float):
+        failures = self._failures.get(key)
+        if failures is None:
+            failures = self._failures[key] = deque(maxlen=self.max_attempts)
+            if len(self._failures) > self.max_ips:
+                self._failures.popitem(last=False)
+        else:
+            self._failures.move_to_end(key)
+        failures.append(when)
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Forget IPs whose latest failure is outside the window."""
+        cutoff = (time.time() if now is None else now) - self.window_seconds
+        evicted = 0
+        with self._lock:
+            # Oldest latest-failure first; stop at the first IP still in
+            # the window instead of scanning them all. Failures loaded from
+            # the database can sit behind newer ones and wait their turn,
+            # which is_limited() tolerates.
+            while self._failures:
+                key = next(iter(self._failures))
+                if self._failures[key][-1] > cutoff:
+                    break
+                del self._failures[key]
+                evicted += 1
+        return evicted
+
+    def load(self):
+        """Seed the in-memory state from the current tenant's recent failures."""
+        rows = database.get_recent_failed_attempt_times(int(self.window_seconds // 60) + 1)
+        tenant = database.current_tenant()
+        prefix = f"{tenant}/"
+        with self._lock:
+            # Replace whatever this tenant had; default-tenant keys are bare IPs
+            stale = [
+                key for key in self._failures
+                if (key.startswith(prefix) if tenant is not None else "/" not in key)
+            ]
+            for key in stale:
+                del self._failures[key]
+            for ip_address, attempt_time in rows:
+                when = datetime.strptime(attempt_time, "%Y-%m-%d %H:%M:%S").replace(
+                    tzinfo=timezone.utc
+                ).timestamp()
+                self._add_failure(self._key(ip_address), when)
+            self._loaded.add(tenant)
+
+    async def ensure_loaded(self):
+        """Load the current tenant's recent failures if not done yet."""
+        if database.current_tenant() not in self._loaded:
+            await run_db(self.load)
+
+    def flush(self):
+        """Write queued attempts to the database, one transaction per tenant."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        by_tenant: Dict[Optional[str], List[Tuple[str, bool, str]]] = {}
+        for tenant, ip_address, success, attempt_time in pending:
+            by_tenant.setdefault(tenant, []).append((ip_address, success, attempt_time))
+        try:
+            for tenant, attempts in by_tenant.items():
+                with database.use_tenant(tenant):
+                    writer.submit(database.record_pin_attempts, attempts).result()
+                # Drop what is written so a later failure does not requeue it
+                pending = [p for p in pending if p[0] != tenant]
+        except Exception:
+            with self._lock:
+                # Requeue, keeping the backlog bounded if the DB stays unavailable
+                self._pending[:0] = pending[-MAX_PENDING_ATTEMPTS:]
+                del self._pending[:-MAX_PENDING_ATTEMPTS]
+            raise
+
+    async def start(self):
+        """Load recent state and start the background flush/prune task."""
+        await run_db(self.load)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await run_db(self.flush)
+
+    async def _run(self):
+        last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(ATTEMPT_FLUSH_SECONDS)
+            try:
+                self.evict_expired()
+                await run_db(self.flush)
+                if time.monotonic() - last_prune >= ATTEMPT_PRUNE_SECONDS:
+                    last_prune = time.monotonic()
+                    for tenant in [None, *database.open_tenants()]:
+                        with database.use_tenant(tenant):
+                            await run_db(database.clear_old_attempts, ATTEMPT_RETENTION_HOURS)
+            except Exception:
+                # Keep the task alive; attempts stay queued for the next flush
+                continue
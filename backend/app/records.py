@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Mapping
+from datetime import datetime
+from functools import lru_cache
+from json.encoder import encode_basestring
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Event fields in the order the Event model serializes them
+EVENT_KEYS = (
+    "title", "description", "start_time", "end_time", "days", "color", "icon",
+    "id", "created_at", "updated_at", "version",
+)
+
+# Columns read by EventRecord.from_row, in constructor order
+EVENT_COLUMNS = (
+    "id, title, description, start_time, end_time, days, color, icon, created_at, updated_at, version"
+)
+
+# HH:MM for every minute of the day, plus 24:00 as an end of day
+_HHMM = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60 + 1))
+_HHMM_COUNT = len(_HHMM)
+# Sorted day numbers and their JSON for every 7-bit mask
+_DAYS = tuple(tuple(d for d in range(7) if mask >> d & 1) for mask in range(128))
+_DAYS_JSON = tuple("[" + ",".join(map(str, days)) + "]" for days in _DAYS)
+
+
+@lru_cache(maxsize=4096)
+def to_minutes(hhmm: str) -> int:
+    """'HH:MM' -> minute of day."""
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(minute: int) -> str:
+    """Minute of day -> 'HH:MM'."""
+    if 0 <= minute < _HHMM_COUNT:
+        return _HHMM[minute]
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def days_to_mask(days: Iterable[int]) -> int:
+    """Day numbers (0=Monday) -> bitmask; anything outside 0-6 is dropped."""
+    mask = 0
+    for day in days:
+        if 0 <= day <= 6:
+            mask |= 1 << day
+    return mask
+
+
+@lru_cache(maxsize=1024)
+def _stored_days(text: str) -> Tuple[int, str]:
+    """
+    The days column's JSON -> (bitmask, compact JSON in the stored order).
+    Most tables repeat a handful of spellings, so records share the strings.
+    """
+    days = json.loads(text)
+    return days_to_mask(days), json.dumps(days, separators=(",", ":"))
+
+
+@lru_cache(maxsize=1024)
+def _days_list(days_json: str) -> Tuple[int, ...]:
+    return tuple(json.loads(days_json))
+
+
+def _timestamp_json(value: Optional[str]) -> str:
+    # SQLite's CURRENT_TIMESTAMP; rendered as Event (pydantic) renders a datetime
+    if value is None:
+        return "null"
+    if len(value) == 19 and value[10] == " ":
+        return f'"{value[:10]}T{value[11:]}"'
+    return f'"{datetime.fromisoformat(value).isoformat()}"'
+
+
+class EventRecord(Mapping):
+    """
+    One stored event.
+
+    Slotted, with days kept as a 7-bit mask (bit 0 = Monday) and times as
+    minutes of day, so a cached table costs a fraction of the equivalent
+    dicts. It still reads like the old event dict (record["days"],
+    record.get("end_time"), dict(record)) for code that wants one, while
+    hot paths use the attributes and to_json() directly.
+
+    days is returned and serialized as stored, in the order given and
+    with any repeats; days_json holds that list as compact JSON (shared
+    between records), while the mask answers weekdays and on_day().
+    """
+
+    __slots__ = (
+        "id", "title", "description", "start", "end", "days_mask", "days_json",
+        "color", "icon", "created_at", "updated_at", "version",
+    )
+
+    def __init__(
+        self, id: int, title: str, description: Optional[str], start: int,
+        end: Optional[int], days_mask: int, color: str, icon: str,
+        created_at: Optional[str], updated_at: Optional[str], version: int = 1,
+        days_json: Optional[str] = None
+    ):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.start = start
+        self.end = end
+        self.days_mask = days_mask
+        # The stored days; sorted and without repeats unless given
+        self.days_json = _DAYS_JSON[days_mask] if days_json is None else days_json
+        self.color = color
+        self.icon = icon
+        self.created_at = created_at
+        self.updated_at = updated_at
+        # Bumped by every update; the basis of the event's ETag
+        self.version = version
+
+    @classmethod
+    def from_row(cls, row) -> "EventRecord":
+        """Build from a row selected as EVENT_COLUMNS."""
+        id, title, description, start_time, end_time, days, color, icon, created_at, updated_at, version = row
+        days_mask, days_json = _stored_days(days)
+        return cls(
+            id, title, description, to_minutes(start_time),
+            to_minutes(end_time) if end_time else None, days_mask,
+            color, icon, created_at, updated_at, version, days_json,
+        )
+
+    @property
+    def start_time(self) -> str:
+        return format_minutes(self.start)
+
+    @property
+    def end_time(self) -> Optional[str]:
+        return None if self.end is None else format_minutes(self.end)
+
+    @property
+    def days(self) -> List[int]:
+        return list(_days_list(self.days_json))
+
+    @property
+    def weekdays(self) -> Tuple[int, ...]:
+        """The distinct days, in order from Monday."""
+        return _DAYS[self.days_mask]
+
+    def on_day(self, day: int) -> bool:
+        return bool(self.days_mask >> day & 1)
+
+    # Mapping interface (the event dict it replaces)
+
+    def __getitem__(self, key: str):
+        if key not in EVENT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(EVENT_KEYS)
+
+    def __len__(self) -> int:
+        return len(EVENT_KEYS)
+
+    def __repr__(self) -> str:
+        return f"EventRecord(id={self.id!r}, title={self.title!r})"
+
+    def to_json(self) -> str:
+        """Encode exactly as the Event model would, without building it."""
+        # Table lookups are inlined; this runs once per event per list body
+        start, end = self.start, self.end
+        start = _HHMM[start] if 0 <= start < _HHMM_COUNT else format_minutes(start)
+        if end is None:
+            end = "null"
+        else:
+            end = f'"{_HHMM[end]}"' if 0 <= end < _HHMM_COUNT else f'"{format_minutes(end)}"'
+        created, updated = self.created_at, self.updated_at
+        created = (
+            f'"{created[:10]}T{created[11:]}"' if created and len(created) == 19 and created[10] == " "
+            else _timestamp_json(created)
+        )
+        updated = (
+            f'"{updated[:10]}T{updated[11:]}"' if updated and len(updated) == 19 and updated[10] == " "
+            else _timestamp_json(updated)
+        )
+        description = "null" if self.description is None else encode_basestring(self.description)
+        return (
+            f'{{"title":{encode_basestring(self.title)},"description":{description},'
+            f'"start_time":"{start}","end_time":{end},'
+            f'"days":{self.days_json},"color":{encode_basestring(self.color)},'
+            f'"icon":{encode_basestring(self.icon)},"id":{self.id},'
+            f'"created_at":{created},"updated_at":{updated},"version":{self.version}}}'
+        )
+
+
+def encode_events(events: Iterable[EventRecord]) -> bytes:
+    """A JSON array of events, as List[Event] would serialize it."""
+    return ("[" + ",".join([event.to_json() for event in events]) + "]").encode()
+
+
+# ============== Projections ==============
+
+def _text_json(value: Optional[str]) -> str:
+    return "null" if value is None else encode_basestring(value)
+
+
+def _end_time_json(value: Optional[str]) -> str:
+    # Stored times are validated HH:MM; an empty end time means none
+    return encode_basestring(value) if value else "null"
+
+
+def _days_json(text: str) -> str:
+    return _stored_days(text)[1]
+
+
+# Column value -> JSON, rendered as EventRecord.to_json renders each field
+_FIELD_JSON: Dict[str, Callable[..., str]] = {
+    "id": str,
+    "title": encode_basestring,
+    "description": _text_json,
+    "start_time": encode_basestring,
+    "end_time": _end_time_json,
+    "days": _days_json,
+    "color": encode_basestring,
+    "icon": encode_basestring,
+    "created_at": _timestamp_json,
+    "updated_at": _timestamp_json,
+    "version": str,
+}
+
+
+class EventProjection:
+    """
+    A subset of event fields, encoded straight from rows that select only
+    those columns. The columns always include start_time and id, the
+    keyset position of a row, whether or not they are output.
+    """
+
+    __slots__ = ("fields", "columns", "_encoders", "_key_indexes")
+
+    def __init__(self, fields: Sequence[str]):
+        # Output in the Event model's key order, whatever order was asked for
+        self.fields = tuple(key for key in EVENT_KEYS if key in fields)
+        selected = self.fields + tuple(key for key in ("start_time", "id") if key not in self.fields)
+        self.columns = ", ".join(selected)
+        self._encoders = [
+            (f"{encode_basestring(key)}:", _FIELD_JSON[key], i) for i, key in enumerate(self.fields)
+        ]
+        self._key_indexes = (selected.index("start_time"), selected.index("id"))
+
+    def encode(self, row) -> str:
+        """JSON object for a row selected as self.columns."""
+        return "{" + ",".join([name + encode(row[i]) for name, encode, i in self._encoders]) + "}"
+
+    def key(self, row) -> Tuple[str, int]:
+        """(start_time, id) of a row selected as self.columns."""
+        start, id = self._key_indexes
+        return row[start], row[id]
+
+
+@lru_cache(maxsize=64)
+def projection(fields: Tuple[str, ...]) -> EventProjection:
+    """The (shared) projection of a tuple of known field names."""
+    return EventProjection(fields)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from ..auth import pin_auth
+from ..profiling import PROFILE_MAX_SECONDS, ProfilerBusyError, profiler
+
+router = APIRouter()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    auth: dict = Depends(pin_auth)
+):
+    """
+    Sample every thread of this worker for the given time and return the
+    collapsed stacks (flamegraph.pl / speedscope format). Requires PIN
+    authentication; one profile may run at a time.
+    """
+    try:
+        text, samples = await asyncio.to_thread(profiler.run, seconds, interval_ms / 1000)
+    except ProfilerBusyError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    return PlainTextResponse(
+        text,
+        headers={
+            "Content-Disposition": 'attachment; filename="profile.collapsed"',
+            "X-Profile-Samples": str(samples),
+        },
+    )
@@ -20,20 +20,20 @@ def get_client_ip(request: Request) -> str:
 async def auth_status():
     """Check if PIN has been set up."""
     return {
-        "pin_is_set": auth_module.is_pin_set()
+        "pin_is_set": await auth_module.is_pin_set()
     }
 
 
 @router.post("/setup", response_model=dict)
 async def setup_pin(setup: PINSetup):
     """Set up initial PIN. Only works if no PIN is set."""
-    if auth_module.is_pin_set():
+    if await auth_module.is_pin_set():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="PIN is already set. Use change endpoint to modify."
         )
     
-    success = auth_module.setup_pin(setup.pin)
+    success = await auth_module.setup_pin(setup.pin)
     if success:
         return {"message": "PIN set successfully"}
     else:
@@ -48,7 +48,7 @@ async def verify_pin(verify: PINVerify, request: Request):
     """Verify PIN and return access token."""
     client_ip = get_client_ip(request)
     
-    token = auth_module.authenticate_pin(verify.pin, client_ip)
+    token = await auth_module.authenticate_pin(verify.pin, client_ip)
     
     if token:
         return Token(access_token=token)
@@ -62,13 +62,13 @@ async def verify_pin(verify: PINVerify, request: Request):
 @router.post("/change", response_model=dict)
 async def change_pin(change: PINChange):
     """Change existing PIN."""
-    if not auth_module.is_pin_set():
+    if not await auth_module.is_pin_set():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No PIN is currently set. Use setup endpoint."
         )
     
-    success = auth_module.change_pin(change.old_pin, change.new_pin)
+    success = await auth_module.change_pin(change.old_pin, change.new_pin)
     
     if success:
         return {"message": "PIN changed successfully"}
@@ -1,79 +1,523 @@
 from __future__ import annotations
 
-from typing import List
-from fastapi import APIRouter, HTTPException, status, Depends
+import base64
+import codecs
+import hashlib
+import os
+import re
+from datetime import datetime
+from json.encoder import encode_basestring
+from typing import AsyncIterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Header, Query
+from fastapi.responses import Response, StreamingResponse
 
-from .. import database
-from ..models import Event, EventCreate, EventUpdate
+from .. import database, transfer
+from ..models import (
+    Event, EventCreate, EventUpdate, EventBulkUpdate, EventBulkDelete, BulkDeleteResult,
+    Conflict, SearchHit, TIME_PATTERN
+)
 from ..auth import pin_auth
+from ..executor import run_db
+from ..writer import run_isolated_write, run_write
+from ..cache import events_cache, settings_cache
+from ..http_cache import make_etag, etag_matches, conditional_response
+from ..changefeed import change_feed
+from ..conflicts import EventConflict, conflict_index, reject_conflicts
+from ..records import EVENT_KEYS, EventProjection, EventRecord, encode_events, projection
 
 router = APIRouter()
 
+# Keyset pages of GET /api/events (limit / cursor / fields)
+EVENTS_PAGE_SIZE = int(os.environ.get("EVENTS_PAGE_SIZE", "500"))
+EVENTS_DEFAULT_LIMIT = 100
+EVENTS_MAX_LIMIT = 1000
+SEARCH_MAX_LIMIT = 100
+# Longest import line buffered while looking for its newline
+IMPORT_MAX_LINE = int(os.environ.get("IMPORT_MAX_LINE", str(1024 * 1024)))
+
+
+# Event responses are encoded by the records themselves; response_model
+# only documents them
+def _event_response(event: EventRecord, status_code: int = status.HTTP_200_OK) -> Response:
+    return Response(
+        event.to_json().encode(), status_code=status_code, media_type="application/json",
+        headers={"ETag": make_etag(f"event{event.id}", event.version)}
+    )
+
+
+def _expected_version(if_match: Optional[str], event_id: int) -> Optional[int]:
+    """The event version an If-Match header requires, None for none (or '*')."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    # If-Match uses strong comparison, so weak tags never match
+    prefix = f'"event{event_id}-'
+    versions = {
+        tag[len(prefix):-1] for tag in (t.strip() for t in if_match.split(","))
+        if tag.startswith(prefix) and tag.endswith('"')
+    }
+    if len(versions) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="If-Match must name a single version"
+        )
+    version = versions.pop() if versions else ""
+    if not version.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Event has been changed"
+        )
+    return int(version)
+
+
+def _version_conflict(conflict: database.VersionConflict) -> HTTPException:
+    current = conflict.current
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Event has been changed",
+        headers={"ETag": make_etag(f"event{current.id}", current.version)}
+    )
+
+
+def _events_response(events: List[EventRecord], status_code: int = status.HTTP_200_OK) -> Response:
+    return Response(encode_events(events), status_code=status_code, media_type="application/json")
+
+
+async def _local_now() -> Tuple[int, int]:
+    """Current (day, minute of day) in the configured timezone, 0=Monday."""
+    settings = await run_db(settings_cache.get_settings)
+    try:
+        tz = ZoneInfo(settings["timezone"])
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = ZoneInfo("Pacific/Auckland")
+    now = datetime.now(tz)
+    return now.weekday(), now.hour * 60 + now.minute
+
+
+def _parse_fields(fields: Optional[str]) -> EventProjection:
+    if fields is None:
+        return projection(EVENT_KEYS)
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names.difference(EVENT_KEYS)
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}" if unknown else "No fields requested"
+        )
+    return projection(tuple(key for key in EVENT_KEYS if key in names))
+
+
+_CURSOR_PATTERN = re.compile(r"^(\d{2}:\d{2}),(\d+)$")
+
+
+def _encode_cursor(key: Tuple[str, int]) -> str:
+    return base64.urlsafe_b64encode(f"{key[0]},{key[1]}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    # Opaque to clients: the (start_time, id) of the last event returned
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except ValueError:
+        text = ""
+    match = _CURSOR_PATTERN.match(text)
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return match.group(1), int(match.group(2))
+
+
+def _events_page(
+    fields: EventProjection, after: Optional[Tuple[str, int]], size: int, filters: tuple
+) -> Tuple[bytes, Optional[Tuple[str, int]], bool]:
+    """Up to size events after a keyset position: (comma-joined JSON, last position, more follow)."""
+    rows = database.get_event_rows_page(fields.columns, after, size + 1, *filters)
+    more = len(rows) > size
+    del rows[size:]
+    if not rows:
+        return b"", after, False
+    return ",".join([fields.encode(row) for row in rows]).encode(), fields.key(rows[-1]), more
+
+
+async def _events_page_stream(
+    fields: EventProjection, after: Optional[Tuple[str, int]], limit: Optional[int], filters: tuple
+) -> AsyncIterator[bytes]:
+    # Without a limit, every matching event as a plain array
+    yield b"[" if limit is None else b'{"items":['
+    remaining = limit
+    first = True
+    more = True
+    while more and remaining != 0:
+        size = EVENTS_PAGE_SIZE if remaining is None else min(remaining, EVENTS_PAGE_SIZE)
+        chunk, after, more = await run_db(_events_page, fields, after, size, filters)
+        if chunk:
+            yield chunk if first else b"," + chunk
+            first = False
+        if remaining is not None:
+            remaining -= size
+    if limit is None:
+        yield b"]"
+    else:
+        next_cursor = f'"{_encode_cursor(after)}"' if more and after is not None else "null"
+        yield f'],"next_cursor":{next_cursor}}}'.encode()
+
 
 @router.get("/events", response_model=List[Event])
-async def list_events():
-    """Get all events. Public endpoint - no PIN required."""
-    events = database.get_all_events()
-    return events
+async def list_events(
+    request: Request,
+    day: Optional[int] = Query(None, ge=0, le=6),
+    from_time: Optional[str] = Query(None, alias="from", pattern=TIME_PATTERN),
+    to_time: Optional[str] = Query(None, alias="to", pattern=TIME_PATTERN),
+    fields: Optional[str] = Query(None, description="Comma-separated event fields to return"),
+    limit: Optional[int] = Query(None, ge=1, le=EVENTS_MAX_LIMIT),
+    cursor: Optional[str] = None
+):
+    """
+    Get all events. Public endpoint - no PIN required.
+    Optionally filter to events on a day (0=Monday) overlapping from-to (HH:MM).
+
+    fields=id,title,... returns only those fields. With limit or cursor the
+    events come a page at a time in (start_time, id) order, as
+    {"items": [...], "next_cursor": ...}; pass next_cursor back as cursor
+    for the following page until it is null.
+    """
+    filtered = day is not None or from_time is not None or to_time is not None
+    paged = limit is not None or cursor is not None
+    from_minute = database.to_minutes(from_time) if from_time else None
+    to_minute = database.to_minutes(to_time) if to_time else None
+
+    if fields is not None or paged:
+        after = _decode_cursor(cursor) if cursor is not None else None
+        if paged and limit is None:
+            limit = EVENTS_DEFAULT_LIMIT
+        # The body depends on the events and on every query parameter. The
+        # version is read before streaming, so a write racing the stream
+        # can only make the tag older than the body, never newer.
+        query = f"{fields}|{limit}|{cursor}|{day}|{from_minute}|{to_minute}"
+        digest = hashlib.blake2b(query.encode(), digest_size=6).hexdigest()
+        version = await run_db(database.get_data_version, "events")
+        headers = {"ETag": make_etag(f"events-{digest}", version), "Cache-Control": "no-cache"}
+        if etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return StreamingResponse(
+            _events_page_stream(_parse_fields(fields), after, limit, (day, from_minute, to_minute)),
+            media_type="application/json", headers=headers
+        )
+
+    if not filtered:
+        version, body = await run_db(events_cache.get_body)
+        return await conditional_response(request, make_etag("events", version), body)
+    
+    return _events_response(await run_db(database.query_events, day, from_minute, to_minute))
+
+
+@router.get("/events/now", response_model=List[Event])
+async def events_now():
+    """Get events in progress right now (settings timezone). Public endpoint."""
+    day, minute = await _local_now()
+    return _events_response(await run_db(database.get_events_at, day, minute))
+
+
+@router.get("/events/next", response_model=List[Event])
+async def events_next():
+    """Get the next event(s) to start (settings timezone). Public endpoint."""
+    day, minute = await _local_now()
+    return _events_response(await run_db(database.get_next_events, day, minute))
+
+
+@router.get("/events/conflicts", response_model=List[Conflict])
+async def list_conflicts(day: Optional[int] = Query(None, ge=0, le=6)):
+    """
+    Get every pair of events that overlap on the same day, optionally for
+    one day (0=Monday). Public endpoint.
+    """
+    return await run_db(conflict_index.all_conflicts, day)
+
+
+def _search(text: str, limit: int) -> bytes:
+    query = database.search_query(text)
+    hits = database.search_events(query, limit) if query else []
+    return ("[" + ",".join([
+        f'{{"event":{event.to_json()},"snippet":{encode_basestring(snippet)}}}'
+        for event, snippet in hits
+    ]) + "]").encode()
+
+
+@router.get("/events/search", response_model=List[SearchHit])
+async def search_events(
+    q: str = Query(..., max_length=200),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT)
+):
+    """
+    Find events by words in their title or description. Public endpoint.
+    Every word matches as a prefix, so partial input works for
+    type-ahead; title matches rank first. Each hit carries an HTML
+    snippet: the text escaped, the matches wrapped in <mark></mark>.
+    """
+    return Response(await run_db(_search, q, limit), media_type="application/json")
+
+
+def _event_conflict(conflict: EventConflict) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={"message": "Event overlaps existing events", "conflicts": conflict.conflicts}
+    )
+
+
+def _create_without_conflicts(event_data: dict) -> EventRecord:
+    reject_conflicts(event_data)
+    return database.create_event(event_data)
+
+
+def _update_without_conflicts(
+    event_id: int, update_data: dict, expected_version: Optional[int]
+) -> Optional[EventRecord]:
+    existing = database.get_event(event_id)
+    if existing:
+        reject_conflicts({**existing, **update_data}, event_id)
+    return database.update_event(event_id, update_data, expected_version)
+
+
+@router.get("/events/stream")
+async def stream_events(
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-Sent Events feed of event changes. Public endpoint.
+
+    Each message is a create/update/delete delta whose id is the data
+    version. Reconnect with Last-Event-ID (or ?last_event_id=) to receive
+    only what was missed; a 'reset' message means re-fetch /api/events.
+    """
+    feed = await change_feed.current()
+    if feed.is_full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open streams"
+        )
+    
+    if last_event_id is None and last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    
+    return StreamingResponse(
+        feed.subscribe(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _export_stream(fmt: str, tz: str) -> AsyncIterator[str]:
+    # Each step of export_lines reads one chunk of rows, so step it on the
+    # DB lane; no connection is held between chunks
+    lines = transfer.export_lines(fmt, tz)
+    while True:
+        text = await run_db(next, lines, None)
+        if text is None:
+            break
+        yield text
+
+
+async def _request_lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+        if len(pending) > IMPORT_MAX_LINE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Import line longer than {IMPORT_MAX_LINE} characters"
+            )
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+@router.get("/events/export")
+async def export_events(format: str = Query("ndjson", pattern="^(ndjson|ics)$")):
+    """Stream all events as NDJSON or iCalendar. Public endpoint."""
+    settings = await run_db(settings_cache.get_settings)
+    media_type = "text/calendar" if format == "ics" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_stream(format, settings["timezone"]),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="timetable.{format}"'}
+    )
+
+
+@router.post("/events/import")
+async def import_events(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|ics)$"),
+    auth: dict = Depends(pin_auth)
+):
+    """
+    Add events from an NDJSON or iCalendar request body. Requires PIN
+    authentication. The body is parsed as it arrives and written in
+    chunked transactions; invalid records are skipped and reported. A line
+    longer than IMPORT_MAX_LINE stops the import with 413; chunks already
+    written stay.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ics" if "calendar" in content_type else "ndjson"
+    
+    settings = await run_db(settings_cache.get_settings)
+    importer = transfer.Importer(format, tz=settings["timezone"])
+    async for line in _request_lines(request):
+        for batch in importer.feed(line):
+            await run_db(database.create_events, batch)
+            importer.committed(batch)
+    for batch in importer.finish():
+        await run_db(database.create_events, batch)
+        importer.committed(batch)
+    return importer.result()
+
+
+def _bulk_error(exc: database.BulkOperationError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail={"message": "Batch rejected; no changes were made", "errors": exc.errors}
+    )
+
+
+@router.post("/events/bulk", response_model=List[Event], status_code=status.HTTP_201_CREATED)
+async def create_events_bulk(
+    events: List[EventCreate],
+    auth: dict = Depends(pin_auth)
+):
+    """Create many events in one transaction. Requires PIN authentication."""
+    created = await run_db(database.create_events, [e.model_dump() for e in events])
+    return _events_response(created, status.HTTP_201_CREATED)
+
+
+@router.patch("/events/bulk", response_model=List[Event])
+async def update_events_bulk(
+    events: List[EventBulkUpdate],
+    auth: dict = Depends(pin_auth)
+):
+    """
+    Update many events in one transaction. Requires PIN authentication.
+    All-or-nothing: unknown or repeated ids reject the whole batch.
+    """
+    updates = [{k: v for k, v in e.model_dump().items() if v is not None} for e in events]
+    try:
+        updated = await run_db(database.update_events, updates)
+    except database.BulkOperationError as exc:
+        raise _bulk_error(exc)
+    return _events_response(updated)
+
+
+@router.delete("/events/bulk", response_model=BulkDeleteResult)
+async def delete_events_bulk(
+    body: EventBulkDelete,
+    auth: dict = Depends(pin_auth)
+):
+    """
+    Delete many events in one transaction. Requires PIN authentication.
+    All-or-nothing: unknown or repeated ids reject the whole batch.
+    """
+    try:
+        deleted = await run_db(database.delete_events, body.ids)
+    except database.BulkOperationError as exc:
+        raise _bulk_error(exc)
+    return {"deleted": deleted}
 
 
 @router.get("/events/{event_id}", response_model=Event)
 async def get_event(event_id: int):
     """Get a specific event by ID. Public endpoint."""
-    event = database.get_event(event_id)
+    event = await run_db(database.get_event, event_id)
     if not event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
-    return event
+    return _event_response(event)
 
 
 @router.post("/events", response_model=Event, status_code=status.HTTP_201_CREATED)
 async def create_event(
     event: EventCreate,
+    check_conflicts: bool = False,
     auth: dict = Depends(pin_auth)
 ):
-    """Create a new event. Requires PIN authentication."""
+    """
+    Create a new event. Requires PIN authentication.
+    With check_conflicts=true, an event overlapping others is rejected (409).
+    """
     event_data = event.model_dump()
-    created = database.create_event(event_data)
-    return created
+    if check_conflicts:
+        # Checked and written in one step of the writer, so no other
+        # write can slip in between
+        try:
+            created = await run_isolated_write(_create_without_conflicts, event_data)
+        except EventConflict as conflict:
+            raise _event_conflict(conflict)
+    else:
+        created = await run_write(database.create_event, event_data)
+    return _event_response(created, status.HTTP_201_CREATED)
 
 
 @router.put("/events/{event_id}", response_model=Event)
 async def update_event(
     event_id: int,
     event: EventUpdate,
+    check_conflicts: bool = False,
+    if_match: Optional[str] = Header(None),
     auth: dict = Depends(pin_auth)
 ):
-    """Update an existing event. Requires PIN authentication."""
-    # Check if event exists
-    existing = database.get_event(event_id)
-    if not existing:
+    """
+    Update an existing event. Requires PIN authentication.
+    With check_conflicts=true, a change that overlaps others is rejected (409).
+    With If-Match set to the event's ETag, the update only applies if nobody
+    has changed the event since (else 412, with the current ETag).
+    """
+    expected_version = _expected_version(if_match, event_id)
+    # Filter out None values
+    update_data = {k: v for k, v in event.model_dump().items() if v is not None}
+    try:
+        if check_conflicts:
+            updated = await run_isolated_write(
+                _update_without_conflicts, event_id, update_data, expected_version
+            )
+        else:
+            updated = await run_write(database.update_event, event_id, update_data, expected_version)
+    except database.VersionConflict as conflict:
+        raise _version_conflict(conflict)
+    except EventConflict as conflict:
+        raise _event_conflict(conflict)
+    if updated is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
-    
-    # Filter out None values
-    update_data = {k: v for k, v in event.model_dump().items() if v is not None}
-    
-    updated = database.update_event(event_id, update_data)
-    return updated
+    return _event_response(updated)
 
 
 @router.delete("/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_event(
     event_id: int,
+    if_match: Optional[str] = Header(None),
     auth: dict = Depends(pin_auth)
 ):
-    """Delete an event. Requires PIN authentication."""
-    existing = database.get_event(event_id)
-    if not existing:
+    """
+    Delete an event. Requires PIN authentication.
+    With If-Match, only the version it names is deleted (else 412).
+    """
+    expected_version = _expected_version(if_match, event_id)
+    try:
+        deleted = await run_write(database.delete_event, event_id, expected_version)
+    except database.VersionConflict as conflict:
+        raise _version_conflict(conflict)
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
-    
-    database.delete_event(event_id)
     return None
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+
+from ..executor import run_db
+from ..grid import SLOT_CHOICES, grid_cache
+from ..http_cache import make_etag, conditional_response
+from ..models import GridLayout
+
+router = APIRouter()
+
+
+@router.get("/grid", response_model=GridLayout)
+async def get_grid(request: Request, slot_minutes: int = Query(30)):
+    """
+    Get the weekly grid layout: for each day (0=Monday), every event's
+    first slot, span and lane, with overlapping events side by side.
+    Public endpoint; supports If-None-Match like /events.
+    """
+    if slot_minutes not in SLOT_CHOICES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"slot_minutes must be one of {', '.join(map(str, SLOT_CHOICES))}"
+        )
+    version, body = await run_db(grid_cache.get_body, slot_minutes)
+    return await conditional_response(request, make_etag(f"grid{slot_minutes}", version), body)
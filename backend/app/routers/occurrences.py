@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import date
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from .. import database
+from ..models import EventException, EventExceptionCreate, Occurrence
+from ..auth import pin_auth
+from ..executor import run_db
+from ..writer import run_write
+from ..occurrences import OCCURRENCE_MAX_DAYS, month_spans, occurrence_cache
+
+router = APIRouter()
+
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+
+def _parse_date(value: str, name: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'{name}' is not a valid date"
+        )
+
+
+async def _occurrence_stream(start: date, end: date) -> AsyncIterator[bytes]:
+    yield b"["
+    first = True
+    for span in month_spans(start, end):
+        chunk = await run_db(occurrence_cache.slice, *span)
+        if chunk:
+            yield chunk if first else b"," + chunk
+            first = False
+    yield b"]"
+
+
+@router.get("/occurrences", response_model=List[Occurrence])
+async def list_occurrences(
+    from_date: str = Query(..., alias="from", pattern=DATE_PATTERN),
+    to_date: str = Query(..., alias="to", pattern=DATE_PATTERN)
+):
+    """
+    Expand the weekly events into dated occurrences from..to (YYYY-MM-DD,
+    inclusive) in the settings timezone, with exceptions applied.
+    Public endpoint; streamed a month at a time.
+    """
+    start = _parse_date(from_date, "from")
+    end = _parse_date(to_date, "to")
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' must not be before 'from'"
+        )
+    if (end - start).days >= OCCURRENCE_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {OCCURRENCE_MAX_DAYS} days can be requested at once"
+        )
+    return StreamingResponse(_occurrence_stream(start, end), media_type="application/json")
+
+
+@router.get("/exceptions", response_model=List[EventException])
+async def list_exceptions(
+    from_date: Optional[str] = Query(None, alias="from", pattern=DATE_PATTERN),
+    to_date: Optional[str] = Query(None, alias="to", pattern=DATE_PATTERN)
+):
+    """Get recurrence exceptions, optionally between two dates. Public endpoint."""
+    return await run_db(database.get_exceptions, from_date, to_date)
+
+
+@router.post("/exceptions", response_model=EventException, status_code=status.HTTP_201_CREATED)
+async def create_exception(
+    exception: EventExceptionCreate,
+    auth: dict = Depends(pin_auth)
+):
+    """
+    Skip or change one date of an event; without event_id, skip every
+    event on that date (e.g. a holiday). Requires PIN authentication.
+    """
+    if exception.event_id is None and exception.kind != "skip":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Exceptions for every event can only skip the date"
+        )
+    if exception.event_id is not None and not await run_db(database.get_event, exception.event_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+    try:
+        return await run_write(database.create_exception, exception.model_dump(mode="json"))
+    except sqlite3.IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="An exception already exists for that event and date"
+        )
+
+
+@router.delete("/exceptions/{exception_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_exception(
+    exception_id: int,
+    auth: dict = Depends(pin_auth)
+):
+    """Delete a recurrence exception. Requires PIN authentication."""
+    if not await run_write(database.delete_exception, exception_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Exception not found"
+        )
+    return None
@@ -1,18 +1,23 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, Depends, Request
 
 from .. import database
 from ..models import Settings, SettingsUpdate
 from ..auth import pin_auth
+from ..executor import run_db
+from ..writer import run_write
+from ..cache import settings_cache
+from ..http_cache import make_etag, conditional_response
 
 router = APIRouter()
 
 
 @router.get("", response_model=Settings)
-async def get_settings():
+async def get_settings(request: Request):
     """Get application settings. Public endpoint."""
-    return database.get_settings()
+    version, body = await run_db(settings_cache.get_body)
+    return await conditional_response(request, make_etag("settings", version), body)
 
 
 @router.put("", response_model=Settings)
@@ -22,5 +27,5 @@ async def update_settings(
 ):
     """Update application settings. Requires PIN authentication."""
     update_data = {k: v for k, v in settings.model_dump().items() if v is not None}
-    updated = database.update_settings(update_data)
+    updated = await run_write(database.update_settings, update_data)
     return updated
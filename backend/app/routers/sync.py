@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import Response
+
+from .. import sync
+from ..models import SyncChanges, SyncUpload, SyncUploadResult
+from ..auth import pin_auth
+from ..executor import run_db
+from ..writer import run_write
+
+router = APIRouter()
+
+
+@router.get("/sync", response_model=SyncChanges)
+async def get_changes(
+    since: Optional[str] = None,
+    limit: int = Query(sync.SYNC_PAGE_SIZE, ge=1, le=sync.SYNC_PAGE_SIZE)
+):
+    """
+    Events changed and deleted since a sync token. Public endpoint.
+
+    Without since (or with one too old to answer), reset is true and
+    changed holds every event. Apply the page, keep its token, and while
+    more is true call again with it.
+    """
+    try:
+        position = sync.parse_token(since) if since is not None else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+    body = await run_db(sync.changes_page, position, limit)
+    return Response(body, media_type="application/json", headers={"Cache-Control": "no-store"})
+
+
+@router.post("/sync", response_model=SyncUploadResult)
+async def upload_changes(
+    upload: SyncUpload,
+    auth: dict = Depends(pin_auth)
+):
+    """
+    Apply edits queued while offline, in order, in one transaction.
+    Requires PIN authentication. Updates and deletes carry the version
+    they were made to; conflicts are resolved per operation (see the
+    status and conflicts of each result) rather than failing the batch.
+    """
+    results = await run_write(sync.apply_operations, upload.operations)
+    return Response(sync.encode_results(results), media_type="application/json")
@@ -0,0 +1,216 @@
+"""
+Offline delta sync for kiosk clients.
+
+A client keeps a local copy of the events and an opaque token. GET
+/api/sync?since=<token> returns only what changed after the token (rows
+from the event_changes log, tombstones included) plus a new token, so a
+reconnect costs the number of changes rather than the size of the
+timetable. Tokens carry the database's random id next to the log
+position; a token older than the oldest retained tombstone, or from
+another database, gets a reset: a full copy to replace the local one.
+
+Edits made while offline are uploaded as one batch of operations, each
+made to a known base version. The server resolves conflicts:
+
+- an update to an unchanged event applies as is;
+- an update to an event changed since is merged field by field: fields
+  only the client changed are applied, fields both sides changed keep
+  the server's value and are reported as conflicts;
+- an update or delete of an event deleted on the server loses (the
+  deletion stands), a delete of an event edited since loses (the edit
+  stands); deleting an event already gone succeeds.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import List, Optional, Tuple
+
+from . import database
+from .executor import run_db
+from .records import EventRecord
+
+# Change log configuration
+SYNC_PAGE_SIZE = int(os.environ.get("SYNC_PAGE_SIZE", "1000"))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get("SYNC_TOMBSTONE_DAYS", "30"))
+SYNC_COMPACT_SECONDS = float(os.environ.get("SYNC_COMPACT_SECONDS", "3600"))
+
+
+# ============== Changes ==============
+
+def parse_token(token: str) -> Tuple[Optional[int], int]:
+    """
+    (database id, change log position) of a sync token; ValueError if
+    malformed. Tokens from before database ids have None for the id.
+    """
+    database_id, _, position = token.rpartition(".")
+    try:
+        if not position.isdigit():
+            raise ValueError
+        return (int(database_id, 16) if database_id else None), int(position)
+    except ValueError:
+        raise ValueError(f"Invalid sync token: {token!r}")
+
+
+def changes_page(since: Optional[Tuple[Optional[int], int]], limit: int = SYNC_PAGE_SIZE) -> bytes:
+    """
+    Up to limit changes after a parsed token as a SyncChanges JSON body.
+    since None, or a token this database can no longer (or never could)
+    answer for, gives a reset page.
+    """
+    database_id = database.get_data_version("database_id")
+    reset = since is None or since[0] != database_id
+    if not reset:
+        position = since[1]
+        head, floor, changes = database.get_event_changes(position, limit + 1)
+        # Tombstones past the token were compacted, or the database was
+        # restored from before it
+        reset = position < floor or position > head
+    if reset:
+        head, floor, changes = database.get_event_changes(0, limit + 1, include_deleted=False)
+
+    more = len(changes) > limit
+    del changes[limit:]
+    token = f"{database_id:x}.{changes[-1][0] if more else head}"
+    changed = ",".join([event.to_json() for _, _, event in changes if event is not None])
+    deleted = ",".join([str(event_id) for _, event_id, event in changes if event is None])
+    return (
+        f'{{"token":"{token}","reset":{json.dumps(reset)},"more":{json.dumps(more)},'
+        f'"changed":[{changed}],"deleted":[{deleted}]}}'
+    ).encode()
+
+
+# ============== Offline Edits ==============
+
+def _same(field: str, a, b) -> bool:
+    if field == "days":
+        return sorted(set(a)) == sorted(set(b))
+    return a == b
+
+
+def _merge(current: EventRecord, changes: dict, base: dict) -> Tuple[dict, List[str]]:
+    """Three-way merge of an edit made to an older version of current: (fields to apply, conflicts)."""
+    merged = {}
+    conflicts = []
+    for field, value in changes.items():
+        theirs = current[field]
+        if _same(field, theirs, value):
+            continue
+        if field in base and _same(field, theirs, base[field]):
+            merged[field] = value
+        else:
+            # Changed on both sides, or the client did not say what it
+            # changed from: the server's value stands
+            conflicts.append(field)
+    return merged, conflicts
+
+
+def _apply(index: int, operation) -> dict:
+    result = {
+        "index": index, "status": "applied", "id": getattr(operation, "id", None),
+        "client_id": None, "event": None, "conflicts": [],
+    }
+    if operation.op == "create":
+        event = database.create_event(operation.event.model_dump())
+        result.update(id=event.id, client_id=operation.client_id, event=event)
+        return result
+
+    current = database.get_event(operation.id)
+    if operation.op == "delete":
+        if current is None:
+            return result
+        if operation.base_version not in (None, current.version):
+            result.update(status="conflict", event=current)
+            return result
+        database.delete_event(operation.id, current.version)
+        return result
+
+    if current is None:
+        result["status"] = "conflict"
+        return result
+    changes = operation.changes.model_dump(exclude_none=True)
+    if current.version == operation.base_version:
+        result["event"] = database.update_event(operation.id, changes, current.version)
+        return result
+    base = operation.base.model_dump(exclude_none=True) if operation.base else {}
+    merged, conflicts = _merge(current, changes, base)
+    if merged:
+        current = database.update_event(operation.id, merged, current.version)
+    result.update(
+        status="merged" if merged or not conflicts else "conflict",
+        event=current, conflicts=conflicts,
+    )
+    return result
+
+
+def apply_operations(operations: list) -> List[dict]:
+    """
+    Apply a client's offline operations (SyncCreate / SyncUpdate /
+    SyncDelete) in order, resolving conflicts as described above. Returns
+    one result dict per operation. Run through the writer, the batch
+    commits as a single transaction.
+    """
+    return [_apply(index, operation) for index, operation in enumerate(operations)]
+
+
+def encode_results(results: List[dict]) -> bytes:
+    """A SyncUploadResult JSON body."""
+    parts = []
+    for result in results:
+        event = result["event"]
+        parts.append(
+            f'{{"index":{result["index"]},"status":"{result["status"]}",'
+            f'"id":{json.dumps(result["id"])},"client_id":{json.dumps(result["client_id"])},'
+            f'"event":{"null" if event is None else event.to_json()},'
+            f'"conflicts":{json.dumps(result["conflicts"])}}}'
+        )
+    return f'{{"results":[{",".join(parts)}]}}'.encode()
+
+
+# ============== Compaction ==============
+
+class ChangeLogCompactor:
+    """
+    Background task dropping tombstones older than SYNC_TOMBSTONE_DAYS
+    from every open database's change log. Live events keep their one
+    row each, so the log never outgrows the events table by more than
+    the retained tombstones.
+    """
+
+    def __init__(self, days: int = SYNC_TOMBSTONE_DAYS, interval: float = SYNC_COMPACT_SECONDS):
+        self.days = days
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def compact(self) -> int:
+        """Compact every open database now; returns the tombstones dropped."""
+        dropped = 0
+        for tenant in [None, *database.open_tenants()]:
+            with database.use_tenant(tenant):
+                dropped += await run_db(database.compact_event_changes, self.days)
+        return dropped
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.compact()
+            except Exception:
+                # Keep the task alive; tombstones wait for the next round
+                continue
+
+
+compactor = ChangeLogCompactor()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, Path, status
+
+from . import database
+
+T = TypeVar("T")
+
+
+class PerTenant(Generic[T]):
+    """
+    Holds one instance of some per-database state (a cache, a change feed)
+    for each tenant, created on first use for the tenant of the current
+    context. Attribute access is forwarded to the current tenant's
+    instance, so module-level singletons keep working unchanged.
+
+    Instances are kept in an LRU bounded like the tenant connection pools.
+    """
+
+    def __init__(self, factory: Callable[[], T], max_tenants: Optional[int] = None):
+        self._factory = factory
+        self._max_tenants = max_tenants or database.MAX_OPEN_TENANTS
+        self._lock = threading.Lock()
+        self._default: Optional[T] = None
+        self._instances: "OrderedDict[str, T]" = OrderedDict()
+
+    def current(self) -> T:
+        """Get (or create) the instance for the current tenant."""
+        tenant = database.current_tenant()
+        with self._lock:
+            if tenant is None:
+                if self._default is None:
+                    self._default = self._factory()
+                return self._default
+            instance = self._instances.get(tenant)
+            if instance is None:
+                instance = self._instances[tenant] = self._factory()
+                while len(self._instances) > self._max_tenants:
+                    self._instances.popitem(last=False)
+            else:
+                self._instances.move_to_end(tenant)
+            return instance
+
+    def peek(self) -> Optional[T]:
+        """Get the current tenant's instance without creating one."""
+        tenant = database.current_tenant()
+        with self._lock:
+            return self._default if tenant is None else self._instances.get(tenant)
+
+    def items(self) -> List[Tuple[Optional[str], T]]:
+        """All live (tenant, instance) pairs; the default tenant is None."""
+        with self._lock:
+            pairs: List[Tuple[Optional[str], T]] = list(self._instances.items())
+            if self._default is not None:
+                pairs.insert(0, (None, self._default))
+            return pairs
+
+    def __getattr__(self, name: str):
+        return getattr(self.current(), name)
+
+
+async def tenant_scope(tenant: str = Path(..., description="Tenant (household) name")):
+    """
+    Dependency scoping the rest of the request to a tenant's database.
+    Tenants are provisioned ahead of time (python -m app.cli tenant
+    create); any other name is a 404, and no request creates a database.
+    """
+    if not database.tenant_exists(tenant):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown tenant"
+        )
+    database.set_tenant(tenant)
+    return tenant
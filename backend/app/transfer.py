@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from pydantic import ValidationError
+
+from . import database
+from .models import EventCreate
+from .records import EventRecord
+
+FORMATS = ("ndjson", "ics")
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+ICS_DAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+# A Monday; weekly rules are anchored to this week
+ICS_ANCHOR = date(2024, 1, 1)
+
+# RFC 7986 COLOR takes a CSS3 color name; the exact hex travels in
+# X-TIMETABLE-COLOR
+CSS3_COLORS = {
+    "aliceblue": "#F0F8FF", "antiquewhite": "#FAEBD7", "aqua": "#00FFFF",
+    "aquamarine": "#7FFFD4", "azure": "#F0FFFF", "beige": "#F5F5DC",
+    "bisque": "#FFE4C4", "black": "#000000", "blanchedalmond": "#FFEBCD",
+    "blue": "#0000FF", "blueviolet": "#8A2BE2", "brown": "#A52A2A",
+    "burlywood": "#DEB887", "cadetblue": "#5F9EA0", "chartreuse": "#7FFF00",
+    "chocolate": "#D2691E", "coral": "#FF7F50", "cornflowerblue": "#6495ED",
+    "cornsilk": "#FFF8DC", "crimson": "#DC143C", "cyan": "#00FFFF",
+    "darkblue": "#00008B", "darkcyan": "#008B8B", "darkgoldenrod": "#B8860B",
+    "darkgray": "#A9A9A9", "darkgreen": "#006400", "darkgrey": "#A9A9A9",
+    "darkkhaki": "#BDB76B", "darkmagenta": "#8B008B", "darkolivegreen": "#556B2F",
+    "darkorange": "#FF8C00", "darkorchid": "#9932CC", "darkred": "#8B0000",
+    "darksalmon": "#E9967A", "darkseagreen": "#8FBC8F", "darkslateblue": "#483D8B",
+    "darkslategray": "#2F4F4F", "darkslategrey": "#2F4F4F", "darkturquoise": "#00CED1",
+    "darkviolet": "#9400D3", "deeppink": "#FF1493", "deepskyblue": "#00BFFF",
+    "dimgray": "#696969", "dimgrey": "#696969", "dodgerblue": "#1E90FF",
+    "firebrick": "#B22222", "floralwhite": "#FFFAF0", "forestgreen": "#228B22",
+    "fuchsia": "#FF00FF", "gainsboro": "#DCDCDC", "ghostwhite": "#F8F8FF",
+    "gold": "#FFD700", "goldenrod": "#DAA520", "gray": "#808080",
+    "green": "#008000", "greenyellow": "#ADFF2F", "grey": "#808080",
+    "honeydew": "#F0FFF0", "hotpink": "#FF69B4", "indianred": "#CD5C5C",
+    "indigo": "#4B0082", "ivory": "#FFFFF0", "khaki": "#F0E68C",
+    "lavender": "#E6E6FA", "lavenderblush": "#FFF0F5", "lawngreen": "#7CFC00",
+    "lemonchiffon": "#FFFACD", "lightblue": "#ADD8E6", "lightcoral": "#F08080",
+    "lightcyan": "#E0FFFF", "lightgoldenrodyellow": "#FAFAD2", "lightgray": "#D3D3D3",
+    "lightgreen": "#90EE90", "lightgrey": "#D3D3D3", "lightpink": "#FFB6C1",
+    "lightsalmon": "#FFA07A", "lightseagreen": "#20B2AA", "lightskyblue": "#87CEFA",
+    "lightslategray": "#778899", "lightslategrey": "#778899", "lightsteelblue": "#B0C4DE",
+    "lightyellow": "#FFFFE0", "lime": "#00FF00", "limegreen": "#32CD32",
+    "linen": "#FAF0E6", "magenta": "#FF00FF", "maroon": "#800000",
+    "mediumaquamarine": "#66CDAA", "mediumblue": "#0000CD", "mediumorchid": "#BA55D3",
+    "mediumpurple": "#9370DB", "mediumseagreen": "#3CB371", "mediumslateblue": "#7B68EE",
+    "mediumspringgreen": "#00FA9A", "mediumturquoise": "#48D1CC", "mediumvioletred": "#C71585",
+    "midnightblue": "#191970", "mintcream": "#F5FFFA", "mistyrose": "#FFE4E1",
+    "moccasin": "#FFE4B5", "navajowhite": "#FFDEAD", "navy": "#000080",
+    "oldlace": "#FDF5E6", "olive": "#808000", "olivedrab": "#6B8E23",
+    "orange": "#FFA500", "orangered": "#FF4500", "orchid": "#DA70D6",
+    "palegoldenrod": "#EEE8AA", "palegreen": "#98FB98", "paleturquoise": "#AFEEEE",
+    "palevioletred": "#DB7093", "papayawhip": "#FFEFD5", "peachpuff": "#FFDAB9",
+    "peru": "#CD853F", "pink": "#FFC0CB", "plum": "#DDA0DD",
+    "powderblue": "#B0E0E6", "purple": "#800080", "red": "#FF0000",
+    "rosybrown": "#BC8F8F", "royalblue": "#4169E1", "saddlebrown": "#8B4513",
+    "salmon": "#FA8072", "sandybrown": "#F4A460", "seagreen": "#2E8B57",
+    "seashell": "#FFF5EE", "sienna": "#A0522D", "silver": "#C0C0C0",
+    "skyblue": "#87CEEB", "slateblue": "#6A5ACD", "slategray": "#708090",
+    "slategrey": "#708090", "snow": "#FFFAFA", "springgreen": "#00FF7F",
+    "steelblue": "#4682B4", "tan": "#D2B48C", "teal": "#008080",
+    "thistle": "#D8BFD8", "tomato": "#FF6347", "turquoise": "#40E0D0",
+    "violet": "#EE82EE", "wheat": "#F5DEB3", "white": "#FFFFFF",
+    "whitesmoke": "#F5F5F5", "yellow": "#FFFF00", "yellowgreen": "#9ACD32",
+}
+# First name wins where several share a value (aqua/cyan, gray/grey)
+_CSS3_NAMES = {value: name for name, value in reversed(list(CSS3_COLORS.items()))}
+
+
+# ============== Export ==============
+
+def event_to_ndjson(event: EventRecord) -> str:
+    """Encode an event as one NDJSON line."""
+    return event.to_json() + "\n"
+
+
+def _ics_escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _ics_fold(line: str) -> str:
+    """Fold a content line at 75 octets as required by RFC 5545."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    current = b""
+    for char in line:
+        char_bytes = char.encode()
+        if len(current) + len(char_bytes) > (75 if not parts else 74):
+            parts.append(current.decode())
+            current = b""
+        current += char_bytes
+    parts.append(current.decode())
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def ics_header(tz: str) -> str:
+    return "".join(_ics_fold(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Kids Timetable//EN",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-TIMEZONE:{tz}",
+    ])
+
+
+ICS_FOOTER = "END:VCALENDAR\r\n"
+
+
+def event_to_ics(event: EventRecord, tz: str, stamp: Optional[str] = None) -> str:
+    """Encode an event as a weekly-recurring VEVENT."""
+    days = event.weekdays
+    first = ICS_ANCHOR + timedelta(days=days[0])
+    start = event.start_time.replace(":", "")
+    stamp = stamp or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{event.id}@kids-timetable",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;TZID={tz}:{first:%Y%m%d}T{start}00",
+    ]
+    if event.end_time:
+        lines.append(f"DTEND;TZID={tz}:{first:%Y%m%d}T{event.end_time.replace(':', '')}00")
+    lines.append(f"RRULE:FREQ=WEEKLY;BYDAY={','.join(ICS_DAYS[d] for d in days)}")
+    lines.append(f"SUMMARY:{_ics_escape(event.title)}")
+    if event.description:
+        lines.append(f"DESCRIPTION:{_ics_escape(event.description)}")
+    lines.append(f"X-TIMETABLE-COLOR:{event.color}")
+    name = _CSS3_NAMES.get(event.color.upper())
+    if name:
+        lines.append(f"COLOR:{name}")
+    lines.append(f"X-TIMETABLE-ICON:{_ics_escape(event.icon)}")
+    lines.append("END:VEVENT")
+    return "".join(_ics_fold(line) for line in lines)
+
+
+def export_chunk(fmt: str, tz: str, after_id: int, limit: int = CHUNK_SIZE) -> Tuple[str, int]:
+    """
+    Encode up to limit events with id > after_id. Returns the text and the
+    last id written; an empty string means the export is complete.
+    """
+    events = database.get_events_after(after_id, limit)
+    if not events:
+        return "", after_id
+    if fmt == "ics":
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        text = "".join(event_to_ics(event, tz, stamp) for event in events)
+    else:
+        text = "".join(event_to_ndjson(event) for event in events)
+    return text, events[-1].id
+
+
+def export_lines(fmt: str, tz: str = "Pacific/Auckland") -> Iterator[str]:
+    """Yield the whole timetable in the given format, one chunk of rows at a time."""
+    if fmt == "ics":
+        yield ics_header(tz)
+    after_id = 0
+    while True:
+        text, after_id = export_chunk(fmt, tz, after_id)
+        if not text:
+            break
+        yield text
+    if fmt == "ics":
+        yield ICS_FOOTER
+
+
+# ============== Import ==============
+
+class _NDJSONParser:
+    def feed(self, line: str) -> Iterator[dict]:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+    def close(self) -> Iterator[dict]:
+        return iter(())
+
+
+class _ICSParser:
+    """
+    Incremental VEVENT parser; handles line unfolding across feed() calls.
+    DTSTART/DTEND with a TZID or in UTC are converted to tz, the timetable's
+    own timezone; floating times are taken as already local.
+    """
+
+    def __init__(self, tz: str = "Pacific/Auckland"):
+        self._tz = ZoneInfo(tz)
+        self._pending: Optional[str] = None
+        self._event: Optional[dict] = None
+        self._params: Dict[str, Dict[str, str]] = {}
+
+    def feed(self, line: str) -> Iterator[dict]:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and self._pending is not None:
+            self._pending += line[1:]
+            return
+        # Take the new line before parsing, so a rejected event does not
+        # lose it
+        pending, self._pending = self._pending, line
+        if pending is not None:
+            yield from self._content_line(pending)
+
+    def close(self) -> Iterator[dict]:
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            yield from self._content_line(pending)
+
+    def _content_line(self, line: str) -> Iterator[dict]:
+        if ":" not in line:
+            return
+        head, value = line.split(":", 1)
+        name, *params = head.split(";")
+        name = name.upper()
+
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            self._event = {}
+            self._params = {}
+        elif name == "END" and value.upper() == "VEVENT":
+            event, self._event = self._event, None
+            if event is not None:
+                yield self._to_record(event)
+        elif self._event is not None:
+            self._event[name] = value
+            self._params[name] = {
+                key.upper(): arg.strip('"')
+                for key, _, arg in (param.partition("=") for param in params)
+            }
+
+    @staticmethod
+    def _unescape(value: str) -> str:
+        return (
+            value.replace("\\n", "\n").replace("\\N", "\n")
+            .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+        )
+
+    def _local(self, props: dict, name: str) -> Optional[Tuple[datetime, int]]:
+        """A DATE-TIME property in local time, and how many days conversion moved it."""
+        value = props.get(name, "")
+        try:
+            moment = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+        except ValueError:
+            return None
+        if value.endswith("Z"):
+            zone = timezone.utc
+        elif "TZID" in self._params.get(name, {}):
+            tzid = self._params[name]["TZID"]
+            try:
+                zone = ZoneInfo(tzid)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"Unsupported {name} TZID: {tzid}")
+        else:
+            return moment, 0
+        local = moment.replace(tzinfo=zone).astimezone(self._tz).replace(tzinfo=None)
+        return local, (local.date() - moment.date()).days
+
+    def _to_record(self, props: dict) -> dict:
+        record: dict = {"title": self._unescape(props.get("SUMMARY", ""))}
+        if "DESCRIPTION" in props:
+            record["description"] = self._unescape(props["DESCRIPTION"])
+        start = self._local(props, "DTSTART")
+        record["start_time"] = f"{start[0]:%H:%M}" if start else None
+        if "DTEND" in props:
+            end = self._local(props, "DTEND")
+            if end is None:
+                record["end_time"] = None
+            elif start and end[0].time() == time() and end[0].date() > start[0].date():
+                # Ends at the local midnight after the start
+                record["end_time"] = "24:00"
+            else:
+                record["end_time"] = f"{end[0]:%H:%M}"
+
+        # BYDAY is in the event's own timezone; moving the start to local
+        # time can move it to another day
+        shift = start[1] if start else 0
+        days: List[int] = []
+        for part in props.get("RRULE", "").split(";"):
+            if part.upper().startswith("BYDAY="):
+                for code in part[6:].split(","):
+                    code = code.strip().upper()[-2:]
+                    if code in ICS_DAYS:
+                        days.append((ICS_DAYS.index(code) + shift) % 7)
+        if not days and start:
+            days = [start[0].weekday()]
+        record["days"] = sorted(set(days))
+
+        color = props.get("X-TIMETABLE-COLOR") or props.get("COLOR", "")
+        if not color.startswith("#"):
+            # Exports from before X-TIMETABLE-COLOR put the hex in COLOR
+            color = CSS3_COLORS.get(color.strip().lower(), "")
+        if color:
+            record["color"] = color
+        if "X-TIMETABLE-ICON" in props:
+            record["icon"] = self._unescape(props["X-TIMETABLE-ICON"])
+        return record
+
+
+class Importer:
+    """
+    Streaming importer: feed it lines, write out the batches it returns.
+
+    Records are validated one at a time and buffered up to chunk_size, so
+    memory does not grow with the size of the upload. Invalid records are
+    skipped and reported. Imported events always get new ids.
+    """
+
+    def __init__(self, fmt: str, chunk_size: int = CHUNK_SIZE, tz: str = "Pacific/Auckland"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        self._parser = _ICSParser(tz) if fmt == "ics" else _NDJSONParser()
+        self.chunk_size = chunk_size
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self._index = 0
+        self._batch: List[dict] = []
+
+    def feed(self, line: str) -> List[List[dict]]:
+        """Parse a line; return any batches that are ready to be written."""
+        try:
+            records = list(self._parser.feed(line))
+        except ValueError as exc:
+            self._error(str(exc))
+            self._index += 1
+            return []
+        return self._add(records)
+
+    def finish(self) -> List[List[dict]]:
+        """Flush the parser; return the remaining batches."""
+        batches = self._add(list(self._parser.close()))
+        if self._batch:
+            batches.append(self._batch)
+            self._batch = []
+        return batches
+
+    def committed(self, batch: List[dict]):
+        self.imported += len(batch)
+
+    def result(self) -> dict:
+        return {"imported": self.imported, "failed": self.failed, "errors": self.errors}
+
+    def _add(self, records: List[dict]) -> List[List[dict]]:
+        batches = []
+        for record in records:
+            try:
+                event = EventCreate.model_validate(record).model_dump()
+            except ValidationError as exc:
+                self._error(exc.errors(include_url=False, include_context=False))
+            else:
+                self._batch.append(event)
+                if len(self._batch) >= self.chunk_size:
+                    batches.append(self._batch)
+                    self._batch = []
+            self._index += 1
+        return batches
+
+    def _error(self, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"index": self._index, "error": error})
+
+
+def import_lines(
+    lines: Iterable[str], fmt: str, chunk_size: int = CHUNK_SIZE, tz: str = "Pacific/Auckland"
+) -> dict:
+    """Import from an iterable of text lines, committing one chunk at a time."""
+    importer = Importer(fmt, chunk_size, tz)
+    for line in lines:
+        for batch in importer.feed(line):
+            database.create_events(batch)
+            importer.committed(batch)
+    for batch in importer.finish():
+        database.create_events(batch)
+        importer.committed(batch)
+    return importer.result()
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from . import database
+
+T = TypeVar("T")
+
+# Group commit configuration
+WRITE_BATCH_MAX = int(os.environ.get("WRITE_BATCH_MAX", "64"))
+WRITE_BATCH_WINDOW_MS = float(os.environ.get("WRITE_BATCH_WINDOW_MS", "0"))
+
+
+class _Write:
+    __slots__ = ("fn", "args", "kwargs", "isolated", "context", "future")
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict, isolated: bool = False):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        # Starts a transaction of its own, after earlier writes commit
+        self.isolated = isolated
+        # Tenant, request trace etc. of the caller
+        self.context = contextvars.copy_context()
+        self.future: Future = Future()
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread applying mutations in group-committed batches.
+
+    Callers queue a mutation and wait for its result. The writer takes
+    everything queued (up to max_batch, optionally lingering window
+    seconds for more), groups it by tenant and runs each group through
+    database.write_batch(): one IMMEDIATE transaction with a savepoint per
+    mutation and a single commit. A burst of writes therefore costs one
+    commit instead of one each and never queues on SQLite's write lock.
+
+    Each caller gets its own result or exception, and only after the
+    commit, so a read issued after the await sees the write. Mutations
+    run this way must commit through database._commit().
+
+    An isolated mutation starts a new transaction once everything queued
+    before it is committed, so state kept current by change listeners
+    (e.g. the conflict index) matches the database when it runs, and
+    nothing else is written between what it reads and what it writes.
+    """
+
+    def __init__(self, max_batch: int = WRITE_BATCH_MAX, window_ms: float = WRITE_BATCH_WINDOW_MS):
+        self.max_batch = max(max_batch, 1)
+        self.window = window_ms / 1000
+        self._queue: "queue.SimpleQueue[Optional[_Write]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Stats
+        self._submitted = 0
+        self._batches = 0
+        self._written = 0
+        self._failed = 0
+        self._largest_batch = 0
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="db-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def _submit(self, write: _Write) -> Future:
+        with self._lock:
+            self._submitted += 1
+        self._ensure_thread()
+        self._queue.put(write)
+        return write.future
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """Queue fn(*args, **kwargs); the future resolves once it is committed."""
+        return self._submit(_Write(fn, args, kwargs))
+
+    def submit_isolated(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """Like submit(), but fn runs first in a transaction of its own."""
+        return self._submit(_Write(fn, args, kwargs, isolated=True))
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Queue a mutation and await its committed result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def run_isolated(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Queue an isolated mutation and await its committed result."""
+        return await asyncio.wrap_future(self.submit_isolated(fn, *args, **kwargs))
+
+    def _collect(self, first: _Write) -> List[Optional[_Write]]:
+        batch: List[Optional[_Write]] = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if batch[-1] is None:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            stopping = batch[-1] is None
+            writes = [w for w in batch if w is not None and w.future.set_running_or_notify_cancel()]
+
+            # One transaction per tenant, keeping each tenant's order
+            by_tenant: Dict[Optional[str], List[_Write]] = {}
+            for write in writes:
+                tenant = write.context.run(database.current_tenant)
+                by_tenant.setdefault(tenant, []).append(write)
+            for tenant, group in by_tenant.items():
+                segment: List[_Write] = []
+                for write in group:
+                    if write.isolated and segment:
+                        self._apply(tenant, segment)
+                        segment = []
+                    segment.append(write)
+                self._apply(tenant, segment)
+            if stopping:
+                return
+
+    def _apply(self, tenant: Optional[str], group: List[_Write]):
+        results: List[tuple] = []
+        try:
+            with database.use_tenant(tenant), database.write_batch() as batch:
+                for write in group:
+                    try:
+                        result = write.context.run(batch.run, write.fn, *write.args, **write.kwargs)
+                    except database.BatchAborted:
+                        raise
+                    except Exception as exc:
+                        results.append((write, None, exc))
+                    else:
+                        results.append((write, result, None))
+        except Exception as exc:
+            # BEGIN or COMMIT failed, or SQLite rolled the transaction
+            # back under a mutation: nothing in the group was written
+            with self._lock:
+                self._batches += 1
+                self._failed += len(group)
+            for write in group:
+                write.future.set_exception(exc)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._largest_batch = max(self._largest_batch, len(group))
+            for _, _, error in results:
+                if error is None:
+                    self._written += 1
+                else:
+                    self._failed += 1
+        for write, result, error in results:
+            if error is None:
+                write.future.set_result(result)
+            else:
+                write.future.set_exception(error)
+
+    def stats(self) -> dict:
+        """Return queue and batching statistics."""
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "queued": self._queue.qsize(),
+                "submitted": self._submitted,
+                "written": self._written,
+                "failed": self._failed,
+                "batches": self._batches,
+                "largest_batch": self._largest_batch,
+            }
+
+    def shutdown(self):
+        """Apply everything already queued, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    async def stop(self):
+        """shutdown() without blocking the event loop while the queue drains."""
+        await asyncio.to_thread(self.shutdown)
+
+
+writer = GroupCommitWriter()
+
+
+async def run_write(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a mutation through the group-commit writer."""
+    return await writer.run(fn, *args, **kwargs)
+
+
+async def run_isolated_write(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a mutation that reads before it writes through the writer, isolated."""
+    return await writer.run_isolated(fn, *args, **kwargs)
@@ -0,0 +1,18 @@
+"""
+Benchmarks for the timetable backend. Run modules with ``python -m benchmarks.<name>``
+from ``backend/``; each uses a throwaway database.
+
+  bench_db               micro-benchmarks of the database layer at several sizes
+  bench_load             concurrent mixed read/write/verify load through the ASGI app
+  bench_conditional_get  cached and 304 responses against the old response_model path
+  bench_encodings        wire size and cost of each JSON/msgpack/CBOR and gzip/brotli variant
+  bench_records          memory and JSON encoding of event records against per-row dicts
+  bench_search           type-ahead search latency as each query is typed, up to 100k events
+  bench_startup          cold start per fresh process: import, startup, first response
+  bench_sync             delta sync after a few changes against a full re-fetch
+  bench_writes           concurrent single writes, committed one by one against group-committed
+
+bench_db, bench_load, bench_search and bench_startup accept ``-o results.json`` to save a run and
+``--baseline results.json --threshold 0.1`` to fail (exit 1) when a later
+run is slower than the baseline by more than the threshold.
+"""
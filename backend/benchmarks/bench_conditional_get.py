@@ -0,0 +1,67 @@
+"""
+Requests/sec for GET /api/events and /api/settings before and after
+conditional GET support.
+
+    cd backend && python -m benchmarks.bench_conditional_get --events 500
+
+"before" re-validates the event list through pydantic and re-encodes it on
+every request (the old response_model path); "after" serves the cached
+bytes, and "after (304)" is a client revalidating with If-None-Match.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+from fastapi.testclient import TestClient
+
+from . import common  # points DATABASE_PATH at a temporary file
+from app import database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Event, Settings  # noqa: E402
+
+
+@app.get("/bench/legacy/events", response_model=List[Event])
+async def legacy_events():
+    return database.get_all_events()
+
+
+@app.get("/bench/legacy/settings", response_model=Settings)
+async def legacy_settings():
+    return database.get_settings()
+
+
+def measure(client: TestClient, path: str, seconds: float, headers=None) -> float:
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        client.get(path, headers=headers)
+        done += 1
+    return done / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=common.description(__doc__))
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        common.seed(args.events)
+
+        for name, legacy, current in [
+            ("events", "/bench/legacy/events", "/api/events"),
+            ("settings", "/bench/legacy/settings", "/api/settings"),
+        ]:
+            etag = client.get(current).headers["etag"]
+            before = measure(client, legacy, args.seconds)
+            after = measure(client, current, args.seconds)
+            not_modified = measure(client, current, args.seconds, {"If-None-Match": etag})
+            print(f"{name:9s} before: {before:8.0f} req/s   "
+                  f"after: {after:8.0f} req/s ({after / before:4.1f}x)   "
+                  f"after (304): {not_modified:8.0f} req/s ({not_modified / before:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmarks for the database layer at several table sizes.
+
+    cd backend && python -m benchmarks.bench_db --sizes 100,1000,10000
+    cd backend && python -m benchmarks.bench_db -o base.json
+    cd backend && python -m benchmarks.bench_db --baseline base.json --threshold 0.15
+
+Each function is timed directly, without HTTP or caching in front of it:
+get_all_events (full read + decode), _row_to_event (per-row decode cost,
+reported per row), create_event and update_event (one committed write each).
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from itertools import count
+from typing import Dict
+
+from . import common  # points DATABASE_PATH at a temporary file
+from app import database  # noqa: E402
+
+
+def bench_size(size: int, seconds: float) -> Dict[str, dict]:
+    common.seed(size)
+    results: Dict[str, dict] = {}
+
+    results[f"get_all_events[{size}]"] = common.time_calls(database.get_all_events, seconds)
+
+    with database.get_db() as conn:
+        rows = conn.execute(f"SELECT {database.EVENT_COLUMNS} FROM events").fetchall()
+    decode = common.time_calls(lambda: [database._row_to_event(row) for row in rows], seconds)
+    # Report the per-row cost so sizes are comparable
+    per_row = max(len(rows), 1)
+    results[f"_row_to_event[{size}]"] = {
+        **decode,
+        "ops_per_sec": round(decode["ops_per_sec"] * per_row, 2),
+        "mean_ms": round(decode["mean_ms"] / per_row, 6),
+        "p50_ms": round(decode["p50_ms"] / per_row, 6),
+        "p99_ms": round(decode["p99_ms"] / per_row, 6),
+    }
+
+    created = []
+    numbers = count(size)
+    results[f"create_event[{size}]"] = common.time_calls(
+        lambda: created.append(database.create_event(common.make_event(next(numbers)))["id"]),
+        seconds,
+    )
+    if created:
+        database.delete_events(created)
+
+    ids = [row["id"] for row in rows] or [0]
+    cursor = count()
+
+    def update():
+        i = next(cursor)
+        database.update_event(ids[i % len(ids)], {"title": f"Updated {i}"})
+
+    results[f"update_event[{size}]"] = common.time_calls(update, seconds)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=common.description(__doc__))
+    common.add_sizes_argument(parser, "100,1000,10000")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per benchmark")
+    common.add_result_arguments(parser)
+    args = parser.parse_args()
+
+    results: Dict[str, dict] = {}
+    for size in args.sizes:
+        for name, metrics in bench_size(size, args.seconds).items():
+            results[name] = metrics
+            print(f"{name:28s} {metrics['ops_per_sec']:12.1f} ops/s   "
+                  f"p50 {metrics['p50_ms']:10.4f} ms   p99 {metrics['p99_ms']:10.4f} ms")
+
+    return common.finish("db", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Wire size and server cost of each negotiated variant of GET /api/events.
+
+    cd backend && python -m benchmarks.bench_encodings --events 1000
+
+For every Accept / Accept-Encoding combination the server can offer
+(msgpack, cbor2 and brotli are optional installs), prints the bytes on
+the wire, the time to produce the response once the variant is cached,
+and the one-off time to build the variant after a data change.
+"json+identity" is the response as it was before negotiation. Times
+cover conditional_response() only: routing and the client's decoding
+are the same for every variant or not the server's cost.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from starlette.requests import Request
+
+from . import common  # points DATABASE_PATH at a temporary file
+from app import database  # noqa: E402
+from app.cache import events_cache  # noqa: E402
+from app.http_cache import (  # noqa: E402
+    CBOR, JSON, MSGPACK, _encoder, conditional_response, make_etag, variant_cache,
+)
+
+
+def make_request(media: str, coding: str) -> Request:
+    headers = [(b"accept", media.encode()), (b"accept-encoding", coding.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/api/events", "headers": headers})
+
+
+async def run(args):
+    version, body = events_cache.get_body()
+    etag = make_etag("events", version)
+    media_types = [JSON] + [m for m in (MSGPACK, CBOR) if _encoder(m) is not None]
+    codings = ["identity"] + [c for c in ("gzip", "br") if _encoder(c) is not None]
+
+    baseline = None
+    print(f"{args.events} events")
+    for media in media_types:
+        for coding in codings:
+            request = make_request(media, coding)
+            variant_cache.current().__init__()
+            started = time.perf_counter()
+            response = await conditional_response(request, etag, body)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                await conditional_response(request, etag, body)
+            per_request_us = (time.perf_counter() - started) / args.repeat * 1e6
+
+            size = len(response.body)
+            baseline = baseline or (size, per_request_us)
+            name = f"{media.split('/')[1]}+{coding}"
+            build = f"{build_ms:7.1f} ms" if media != JSON or coding != "identity" else "      -   "
+            print(f"{name:18s} {size / 1024:9.1f} KB ({size / baseline[0]:6.1%})   "
+                  f"cached {per_request_us:6.1f} us/request   build {build}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=common.description(__doc__))
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    common.seed(args.events)
+    database.init_db()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
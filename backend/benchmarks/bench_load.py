@@ -0,0 +1,136 @@
+"""
+In-process load test: concurrent clients driving the ASGI app.
+
+    cd backend && python -m benchmarks.bench_load --events 1000 --clients 20
+    cd backend && python -m benchmarks.bench_load --mix read=90,write=10 -o load.json
+
+Requests go straight to the app through httpx's ASGI transport, so the
+numbers cover routing, validation, the worker pools and the database but
+not the network or uvicorn. Operations:
+
+  read    GET /api/events
+  write   POST /api/events or PUT /api/events/{id} (alternating, with a token)
+  verify  POST /api/auth/verify with the correct PIN (bcrypt-bound)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from . import common  # points DATABASE_PATH at a temporary file
+from app import database  # noqa: E402
+from app.main import app  # noqa: E402
+
+PIN = "2468"
+OPERATIONS = ("read", "write", "verify")
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"unknown operation in --mix: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, token: str, ids: List[int]):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.ids = ids
+        self.writes = 0
+        self.errors = 0
+
+    async def read(self):
+        return await self.client.get("/api/events")
+
+    async def write(self):
+        self.writes += 1
+        if self.writes % 2:
+            return await self.client.post(
+                "/api/events", json=common.make_event(self.writes), headers=self.headers
+            )
+        event_id = self.ids[self.writes % len(self.ids)]
+        return await self.client.put(
+            f"/api/events/{event_id}", json={"title": f"Load {self.writes}"}, headers=self.headers
+        )
+
+    async def verify(self):
+        return await self.client.post("/api/auth/verify", json={"pin": PIN})
+
+
+async def run(args) -> Dict[str, dict]:
+    mix = parse_mix(args.mix)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    rng = random.Random(args.seed)
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        await asyncio.to_thread(common.seed, args.events)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if not (await client.get("/api/auth/status")).json()["pin_is_set"]:
+                await client.post("/api/auth/setup", json={"pin": PIN})
+            token = (await client.post("/api/auth/verify", json={"pin": PIN})).json()["access_token"]
+            ids = [row["id"] for row in await asyncio.to_thread(database.get_events_after, 0, 1000)]
+            workload = Workload(client, token, ids or [1])
+
+            latencies: Dict[str, List[float]] = {name: [] for name in names}
+            deadline = time.perf_counter() + args.seconds
+
+            async def worker():
+                while time.perf_counter() < deadline:
+                    name = rng.choices(names, weights)[0]
+                    t0 = time.perf_counter()
+                    response = await getattr(workload, name)()
+                    latencies[name].append(time.perf_counter() - t0)
+                    if response.status_code >= 400:
+                        workload.errors += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.clients)))
+            elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in names:
+        metrics = common.summarize(latencies[name], elapsed)
+        metrics["req_per_sec"] = metrics.pop("ops_per_sec")
+        results[f"load[{name}]"] = metrics
+    overall = common.summarize([t for samples in latencies.values() for t in samples], elapsed)
+    overall["req_per_sec"] = overall.pop("ops_per_sec")
+    overall["errors"] = workload.errors
+    results["load[all]"] = overall
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=common.description(__doc__))
+    parser.add_argument("--events", type=int, default=1000, help="events to seed (100 to 100000)")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent clients")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--mix", default="read=80,write=15,verify=5",
+                        help="operation weights, e.g. read=80,write=15,verify=5")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the operation mix")
+    common.add_result_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for name, metrics in results.items():
+        print(f"{name:14s} {metrics['count']:7d} req   {metrics['req_per_sec']:9.1f} req/s   "
+              f"p50 {metrics['p50_ms']:9.3f} ms   p99 {metrics['p99_ms']:9.3f} ms")
+    if results["load[all]"]["errors"]:
+        print(f"errors: {results['load[all]']['errors']}", file=sys.stderr)
+
+    return common.finish("load", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
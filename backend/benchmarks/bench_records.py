@@ -0,0 +1,97 @@
+"""
+Memory and encoding cost of slotted event records against per-row dicts.
+
+    cd backend && python -m benchmarks.bench_records --events 10000
+
+"before" is the old representation: one dict per row with a decoded days
+list, serialized by validating into the Event model. "after" is
+EventRecord (days as a bitmask, times as minutes) encoding itself.
+Memory is what tracemalloc sees allocated for the decoded table.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from . import common  # points DATABASE_PATH at a temporary file
+from app import database  # noqa: E402
+from app.models import Event  # noqa: E402
+from app.records import EVENT_COLUMNS, EventRecord, encode_events  # noqa: E402
+
+_events_adapter = TypeAdapter(List[Event])
+
+
+def legacy_row_to_event(row) -> dict:
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "description": row["description"],
+        "start_time": row["start_time"],
+        "end_time": row["end_time"],
+        "days": json.loads(row["days"]),
+        "color": row["color"],
+        "icon": row["icon"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+        "version": row["version"],
+    }
+
+
+def bytes_per_row(rows, decode: Callable) -> float:
+    gc.collect()
+    tracemalloc.start()
+    decoded = [decode(row) for row in rows]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / len(decoded)
+
+
+def best_ms(fn: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=common.description(__doc__))
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    common.seed(args.events)
+    with database.get_db() as conn:
+        rows = conn.execute(f"SELECT {EVENT_COLUMNS} FROM events ORDER BY start_time, id").fetchall()
+    dicts = [legacy_row_to_event(row) for row in rows]
+    records = [EventRecord.from_row(row) for row in rows]
+    assert _events_adapter.dump_json(_events_adapter.validate_python(dicts)) == encode_events(records)
+
+    n = len(rows)
+    lines = [
+        ("memory (bytes/event)",
+         bytes_per_row(rows, legacy_row_to_event), bytes_per_row(rows, EventRecord.from_row)),
+        ("decode rows (ms)",
+         best_ms(lambda: [legacy_row_to_event(row) for row in rows], args.repeat),
+         best_ms(lambda: [EventRecord.from_row(row) for row in rows], args.repeat)),
+        ("encode list (ms)",
+         best_ms(lambda: _events_adapter.dump_json(_events_adapter.validate_python(dicts)), args.repeat),
+         best_ms(lambda: encode_events(records), args.repeat)),
+        ("encode one by one (ms)",
+         best_ms(lambda: [Event.model_validate(e).model_dump_json() for e in dicts], args.repeat),
+         best_ms(lambda: [r.to_json() for r in records], args.repeat)),
+    ]
+    print(f"{n} events")
+    for name, before, after in lines:
+        print(f"{name:24s} before: {before:10.1f}   after: {after:10.1f}   ({before / after:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
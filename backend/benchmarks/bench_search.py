@@ -0,0 +1,87 @@
+"""
+Type-ahead latency of event search at several table sizes.
+
+    cd backend && python -m benchmarks.bench_search --sizes 1000,100000
+    cd backend && python -m benchmarks.bench_search -o search.json --baseline old.json
+
+Events get titles and descriptions drawn from a small vocabulary of
+household activities, so common words match a large share of the table,
+the worst case for ranking. Each query is typed a character at a time
+and every prefix is timed through database.search_events(), as a
+type-ahead box would issue them. --candidates sets SEARCH_CANDIDATES, the
+bound on matches ranked per search (0 ranks every match).
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from typing import Dict, List
+
+from . import common  # points DATABASE_PATH at a temporary file
+from app import database  # noqa: E402
+
+ACTIVITIES = [
+    "swimming", "piano", "soccer", "homework", "dinner", "bath", "reading", "karate",
+    "dentist", "library", "ballet", "scouts", "chess", "art", "guitar", "tennis",
+    "violin", "gym", "school", "bus", "grandma", "football", "drama", "choir",
+]
+KINDS = ["lesson", "practice", "club", "time", "trip", "match"]
+QUERIES = ["piano", "swimming practice", "grandma visit", "chess club", "xylophone"]
+
+
+def seed(size: int):
+    """size events with activity titles and descriptions, written as the API would."""
+    database.init_db()
+    common.reset_db()
+    rnd = random.Random(size)
+    for offset in range(0, size, common.SEED_CHUNK):
+        events = []
+        for i in range(offset, min(offset + common.SEED_CHUNK, size)):
+            event = common.make_event(i)
+            event["title"] = f"{rnd.choice(ACTIVITIES).title()} {rnd.choice(KINDS)}"
+            event["description"] = " ".join(rnd.choice(ACTIVITIES + KINDS) for _ in range(6))
+            events.append(event)
+        database.create_events(events)
+
+
+def run(size: int, limit: int, repeat: int) -> Dict[str, dict]:
+    seed(size)
+    results = {}
+    for text in QUERIES:
+        latencies: List[float] = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for end in range(1, len(text) + 1):
+                query = database.search_query(text[:end])
+                if query is None:
+                    continue
+                t0 = time.perf_counter()
+                database.search_events(query, limit)
+                latencies.append(time.perf_counter() - t0)
+        results[f"typeahead[{size}] {text}"] = common.summarize(latencies, time.perf_counter() - started)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=common.description(__doc__))
+    common.add_sizes_argument(parser, "1000,100000")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5, help="times each query is typed")
+    parser.add_argument("--candidates", type=int, default=database.SEARCH_CANDIDATES,
+                        help="matches ranked per search (SEARCH_CANDIDATES)")
+    common.add_result_arguments(parser)
+    args = parser.parse_args()
+    database.SEARCH_CANDIDATES = args.candidates
+
+    results: Dict[str, dict] = {}
+    for size in args.sizes:
+        results.update(run(size, args.limit, args.repeat))
+    for name, metrics in results.items():
+        print(f"{name:42s} p50 {metrics['p50_ms']:7.2f} ms   p99 {metrics['p99_ms']:7.2f} ms")
+    return common.finish("search", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Cold start: import, startup and first response, each in a fresh interpreter.
+
+    cd backend && python -m benchmarks.bench_startup --runs 10
+    cd backend && python -m benchmarks.bench_startup -o startup.json --baseline old.json
+
+Every run starts a new Python process, as a scaled-to-zero instance
+would, and times importing app.main, the lifespan startup (schema
+migrations, background tasks) and the first GET /api/events through
+httpx's ASGI transport. "new" runs migrate an empty database each time;
+"migrated" runs reuse one that is already current. "total" is the whole
+process, from launch to exit.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from . import common
+
+# Runs in the child; stdout carries one JSON object of phase timings
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+import httpx
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/api/events")
+        done = time.perf_counter()
+    assert response.status_code == 200, response.status_code
+    return ready, done
+
+ready, done = asyncio.run(main())
+print(json.dumps({"import": imported - started, "startup": ready - imported, "first_response": done - ready}))
+"""
+
+PHASES = ("import", "startup", "first_response", "total")
+
+
+def run_child(database_path: str) -> Dict[str, float]:
+    env = dict(os.environ, DATABASE_PATH=database_path,
+               TENANT_DIR=os.path.join(os.path.dirname(database_path), "tenants"))
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, cwd=os.path.dirname(os.path.dirname(__file__)),
+        check=True, capture_output=True, text=True,
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=common.description(__doc__))
+    parser.add_argument("--runs", type=int, default=10, help="processes per scenario")
+    common.add_result_arguments(parser)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    migrated = os.path.join(directory, "migrated.db")
+    run_child(migrated)  # create and migrate it once
+
+    results: Dict[str, dict] = {}
+    for scenario in ("new", "migrated"):
+        samples: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+        for i in range(args.runs):
+            path = os.path.join(directory, f"new-{i}.db") if scenario == "new" else migrated
+            for phase, seconds in run_child(path).items():
+                samples[phase].append(seconds)
+        for phase in PHASES:
+            summary = common.summarize(samples[phase], sum(samples[phase]))
+            del summary["ops_per_sec"]
+            results[f"{scenario}[{phase}]"] = summary
+
+    for name, metrics in results.items():
+        print(f"{name:26s} p50 {metrics['p50_ms']:9.2f} ms   p99 {metrics['p99_ms']:9.2f} ms")
+    return common.finish("startup", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Cost of a kiosk reconnect: a delta sync against re-fetching the timetable.
+
+    cd backend && python -m benchmarks.bench_sync --sizes 1000,10000
+
+For each table size, times changes_page() (the GET /api/sync body) after
+0, 10 and 100 changes since the client's token, half updates and half
+deletes, against the full copy a client without a token downloads. The
+delta's time and size follow the changes, not the number of events.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from . import common  # points DATABASE_PATH at a temporary file
+from app import database, sync  # noqa: E402
+
+
+def run(events: int, changes_counts, seconds: float):
+    common.seed(events)
+    full = sync.changes_page(None, events)
+    print(f"{events} events")
+    metrics = common.time_calls(lambda: sync.changes_page(None, events), seconds)
+    print(f"  full copy      {len(full) / 1024:8.1f} KB   p50 {metrics['p50_ms']:8.3f} ms")
+
+    for count in changes_counts:
+        token = sync.parse_token(json.loads(sync.changes_page(None, events))["token"])
+        ids = [event.id for event in database.get_events_after(0, count)]
+        updates = ids[: count // 2]
+        if updates:
+            database.update_events([{"id": event_id, "title": "Changed"} for event_id in updates])
+        if ids[count // 2:]:
+            database.delete_events(ids[count // 2:])
+        body = sync.changes_page(token)
+        metrics = common.time_calls(lambda: sync.changes_page(token), seconds)
+        print(f"  {count:4d} changes   {len(body) / 1024:8.1f} KB   p50 {metrics['p50_ms']:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=common.description(__doc__))
+    common.add_sizes_argument(parser, "1000,10000")
+    parser.add_argument("--changes", type=common.number_list(), default="0,10,100",
+                        help="comma-separated change counts (default 0,10,100)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="timing per measurement")
+    args = parser.parse_args()
+
+    for events in args.sizes:
+        run(events, args.changes, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Throughput of concurrent single-event writes, committed one by one
+against group-committed through the writer.
+
+    cd backend && python -m benchmarks.bench_writes --writes 2000 --concurrency 64
+
+"direct" runs each create_event on the db lane as the routers used to:
+its own transaction and commit, contending for SQLite's write lock.
+"grouped" submits the same calls through a GroupCommitWriter, once per
+window setting.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+from . import common  # points DATABASE_PATH at a temporary file
+from app import database  # noqa: E402
+from app.executor import run_db  # noqa: E402
+from app.writer import GroupCommitWriter  # noqa: E402
+
+
+async def drive(write: Callable[[dict], Awaitable], writes: int, concurrency: int) -> float:
+    """Issue writes from concurrency callers; return writes per second."""
+    counter = iter(range(writes))
+
+    async def caller():
+        for i in counter:
+            await write(common.make_event(i))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return writes / (time.perf_counter() - started)
+
+
+async def run(args) -> List[tuple]:
+    results = []
+    common.reset_db()
+    rate = await drive(lambda e: run_db(database.create_event, e), args.writes, args.concurrency)
+    results.append(("direct", rate, None))
+
+    for window_ms in args.windows:
+        common.reset_db()
+        writer = GroupCommitWriter(max_batch=args.max_batch, window_ms=window_ms)
+        rate = await drive(lambda e: writer.run(database.create_event, e), args.writes, args.concurrency)
+        stats = writer.stats()
+        await writer.stop()
+        results.append((f"grouped {window_ms:g}ms", rate, stats["written"] / max(stats["batches"], 1)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=common.description(__doc__))
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--windows", type=common.number_list(float), default="0,1",
+                        help="comma-separated batch windows in ms (default 0,1)")
+    args = parser.parse_args()
+
+    database.init_db()
+    results = asyncio.run(run(args))
+    print(f"{args.writes} writes, {args.concurrency} concurrent callers")
+    direct = results[0][1]
+    for name, rate, per_batch in results:
+        batching = f"   {per_batch:5.1f} writes/commit" if per_batch else ""
+        print(f"{name:14s} {rate:9.0f} writes/s   ({rate / direct:4.1f}x){batching}")
+
+
+if __name__ == "__main__":
+    main()
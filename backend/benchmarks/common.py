@@ -0,0 +1,189 @@
+"""
+Shared helpers: a throwaway database, seeding, latency summaries and
+JSON result files that can be compared against a baseline.
+
+Import this module before anything from ``app`` so DATABASE_PATH points
+at a temporary file rather than the real timetable.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("TENANT_DIR", os.path.join(os.path.dirname(os.environ["DATABASE_PATH"]), "tenants"))
+
+from app import database  # noqa: E402
+
+SEED_CHUNK = 1000
+
+# Metrics where a larger number is better; everything else is a latency
+HIGHER_IS_BETTER = ("ops_per_sec", "req_per_sec")
+
+
+# ============== Data ==============
+
+def make_event(i: int) -> dict:
+    """A deterministic event; times and days spread across the week."""
+    start = (i * 15) % (24 * 60)
+    end = min(start + 45, 24 * 60 - 1)
+    return {
+        "title": f"Event {i}",
+        "description": "Seeded by benchmark" if i % 3 else None,
+        "start_time": f"{start // 60:02d}:{start % 60:02d}",
+        "end_time": f"{end // 60:02d}:{end % 60:02d}" if i % 2 else None,
+        "days": sorted({i % 7, (i + 3) % 7}),
+        "color": "#3B82F6",
+        "icon": "📅",
+    }
+
+
+def reset_db():
+    """Empty the benchmark database (events only; settings are kept)."""
+    with database.get_db() as conn:
+        conn.execute("DELETE FROM events")
+        conn.commit()
+    from app.cache import events_cache
+    events_cache.invalidate()
+
+
+def seed(count: int):
+    """Replace the events with count generated ones, in bulk transactions."""
+    database.init_db()
+    reset_db()
+    for offset in range(0, count, SEED_CHUNK):
+        database.create_events([make_event(i) for i in range(offset, min(offset + SEED_CHUNK, count))])
+
+
+# ============== Measurement ==============
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Summarize per-operation latencies (seconds) measured over elapsed seconds."""
+    return {
+        "count": len(latencies),
+        "ops_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 4) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 4),
+    }
+
+
+def time_calls(fn: Callable[[], object], seconds: float, min_calls: int = 5) -> Dict[str, float]:
+    """Call fn repeatedly for about seconds and summarize the latencies."""
+    latencies: List[float] = []
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline or len(latencies) < min_calls:
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+# ============== Results ==============
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "when": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def save_results(path: str, suite: str, results: Dict[str, dict]):
+    """Write results as {"suite", "environment", "results": {name: metrics}}."""
+    with open(path, "w") as f:
+        json.dump({"suite": suite, "environment": environment(), "results": results}, f, indent=2)
+        f.write("\n")
+
+
+def load_results(path: str) -> Dict[str, dict]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    Compare against a baseline; return a line per regression larger than
+    threshold (a fraction, e.g. 0.1 for 10%). Throughput regresses when it
+    drops, latencies when they grow.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in ("ops_per_sec", "req_per_sec", "p50_ms", "p99_ms"):
+            new, old = metrics.get(metric), base.get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > threshold:
+                regressions.append(
+                    f"{name} {metric}: {old:g} -> {new:g} ({change:+.1%})"
+                )
+    return regressions
+
+
+def finish(suite: str, results: Dict[str, dict], output: Optional[str],
+           baseline: Optional[str], threshold: float) -> int:
+    """Save and/or compare results; returns the process exit code."""
+    if output:
+        save_results(output, suite, results)
+        print(f"results written to {output}")
+    if not baseline:
+        return 0
+    regressions = compare(results, load_results(baseline), threshold)
+    if regressions:
+        print(f"regressions over {threshold:.0%} against {baseline}:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print(f"no regressions over {threshold:.0%} against {baseline}")
+    return 0
+
+
+def description(doc: str) -> str:
+    """A module docstring's first paragraph, on one line, for argparse."""
+    return " ".join(doc.strip().split("\n\n", 1)[0].split())
+
+
+def number_list(kind: Callable[[str], float] = int) -> Callable[[str], list]:
+    """argparse type for a comma-separated list of numbers, e.g. 100,1000,10000."""
+    def parse(text: str) -> list:
+        try:
+            return [kind(part) for part in text.split(",") if part.strip()]
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected comma-separated numbers, got {text!r}")
+    return parse
+
+
+def add_sizes_argument(parser, default: str):
+    parser.add_argument("--sizes", type=number_list(), default=default,
+                        help=f"comma-separated event counts (default {default})")
+
+
+def add_result_arguments(parser):
+    parser.add_argument("--output", "-o", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previous results file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed regression as a fraction (default 0.10)")
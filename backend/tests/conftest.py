@@ -0,0 +1,83 @@
+"""
+Test fixtures. The databases live in a temporary directory, and each test
+gets its own tenant (household) database through /api/t/<name>, so tests
+never see each other's events.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import uuid
+
+# Before anything from app is imported: app.database reads these at import
+_TMP = tempfile.mkdtemp(prefix="timetable-tests-")
+os.environ["DATABASE_PATH"] = os.path.join(_TMP, "timetable.db")
+os.environ["TENANT_DIR"] = os.path.join(_TMP, "tenants")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import database  # noqa: E402
+from app.auth import hash_pin  # noqa: E402
+from app.main import app  # noqa: E402
+
+PIN = "1234"
+PIN_HASH = hash_pin(PIN)
+
+
+class Tenant:
+    """A freshly provisioned tenant with its PIN set, and requests scoped to it."""
+
+    def __init__(self, client: TestClient, name: str):
+        self.client = client
+        self.name = name
+        self.base = f"/api/t/{name}"
+        assert database.create_tenant(name, PIN_HASH)
+        token = client.post(f"{self.base}/auth/verify", json={"pin": PIN}).json()["access_token"]
+        self.auth = {"Authorization": f"Bearer {token}"}
+
+    def get(self, path: str, **kwargs):
+        return self.client.get(self.base + path, **kwargs)
+
+    def post(self, path: str, headers: dict = None, **kwargs):
+        return self.client.post(self.base + path, headers={**self.auth, **(headers or {})}, **kwargs)
+
+    def put(self, path: str, headers: dict = None, **kwargs):
+        return self.client.put(self.base + path, headers={**self.auth, **(headers or {})}, **kwargs)
+
+    def delete(self, path: str, headers: dict = None, **kwargs):
+        return self.client.delete(self.base + path, headers={**self.auth, **(headers or {})}, **kwargs)
+
+    def create_event(self, **fields) -> dict:
+        event = {"title": "Event", "start_time": "09:00", "end_time": "10:00", "days": [0], **fields}
+        response = self.post("/events", json=event)
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    def db(self):
+        """Context for calling app.database directly against this tenant."""
+        return database.use_tenant(self.name)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _temporary_databases():
+    yield
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def new_tenant(client):
+    """Factory provisioning another tenant with a unique name."""
+    return lambda: Tenant(client, f"test{uuid.uuid4().hex[:12]}")
+
+
+@pytest.fixture
+def tenant(new_tenant) -> Tenant:
+    return new_tenant()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import argparse
+import json
+
+import pytest
+
+from app.models import EventCreate
+from benchmarks import common
+
+
+def test_percentile_is_nearest_rank():
+    samples = [float(n) for n in range(1, 101)]
+
+    assert common.percentile(samples, 50) == 50.0
+    assert common.percentile(samples, 99) == 99.0
+    assert common.percentile([3.0], 99) == 3.0
+    assert common.percentile([], 50) == 0.0
+
+
+def test_compare_flags_throughput_drops_and_latency_growth():
+    baseline = {"read": {"ops_per_sec": 1000, "p99_ms": 2.0}, "gone": {"ops_per_sec": 5}}
+    results = {
+        "read": {"ops_per_sec": 850, "p99_ms": 2.1},
+        "new": {"ops_per_sec": 1},
+    }
+
+    assert common.compare(results, baseline, 0.10) == ["read ops_per_sec: 1000 -> 850 (-15.0%)"]
+    # Faster and lower-latency results never regress
+    assert common.compare({"read": {"ops_per_sec": 2000, "p99_ms": 1.0}}, baseline, 0.10) == []
+
+
+def test_finish_saves_results_and_fails_on_regression(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    output = tmp_path / "results.json"
+    common.save_results(str(baseline), "db", {"read": {"p50_ms": 1.0}})
+
+    assert common.finish("db", {"read": {"p50_ms": 1.05}}, str(output), str(baseline), 0.10) == 0
+    assert json.loads(output.read_text())["results"] == {"read": {"p50_ms": 1.05}}
+    assert common.finish("db", {"read": {"p50_ms": 1.5}}, None, str(baseline), 0.10) == 1
+
+
+def test_number_list_parses_sizes():
+    parse = common.number_list()
+
+    assert parse("100,1000, 10000,") == [100, 1000, 10000]
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse("100,lots")
+
+
+def test_seeded_events_are_valid_requests():
+    for i in range(200):
+        EventCreate(**common.make_event(i))
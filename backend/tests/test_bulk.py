@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+
+def bulk_delete(tenant, ids):
+    return tenant.client.request("DELETE", f"{tenant.base}/events/bulk", json={"ids": ids}, headers=tenant.auth)
+
+
+def event(title: str, **fields) -> dict:
+    return {"title": title, "start_time": "09:00", "days": [0], **fields}
+
+
+def test_bulk_create_keeps_input_order(tenant):
+    response = tenant.post("/events/bulk", json=[event("B", start_time="10:00"), event("A")])
+
+    assert response.status_code == 201
+    assert [e["title"] for e in response.json()] == ["B", "A"]
+    assert len(tenant.get("/events").json()) == 2
+
+
+def test_invalid_item_rejects_the_bulk_create(tenant):
+    response = tenant.post("/events/bulk", json=[event("Good"), event("Bad", days=[9])])
+
+    assert response.status_code == 422
+    assert tenant.get("/events").json() == []
+
+
+def test_bulk_update_is_all_or_nothing(tenant):
+    a = tenant.create_event(title="A")
+    b = tenant.create_event(title="B")
+
+    ok = tenant.client.patch(f"{tenant.base}/events/bulk", headers=tenant.auth, json=[
+        {"id": a["id"], "title": "A2"}, {"id": b["id"], "color": "#000000"},
+    ])
+    assert ok.status_code == 200
+    assert [(e["title"], e["version"]) for e in ok.json()] == [("A2", 2), ("B", 2)]
+
+    rejected = tenant.client.patch(f"{tenant.base}/events/bulk", headers=tenant.auth, json=[
+        {"id": a["id"], "title": "A3"}, {"id": 999999, "title": "Nope"},
+    ])
+    assert rejected.status_code == 404
+    assert [error["index"] for error in rejected.json()["detail"]["errors"]] == [1]
+    assert tenant.get(f"/events/{a['id']}").json()["title"] == "A2"
+
+
+def test_bulk_delete_rejects_repeats_and_unknown_ids(tenant):
+    a = tenant.create_event(title="A")
+    b = tenant.create_event(title="B")
+
+    assert bulk_delete(tenant, [a["id"], a["id"]]).status_code == 404
+    assert bulk_delete(tenant, [a["id"], 999999]).status_code == 404
+    assert len(tenant.get("/events").json()) == 2
+
+    response = bulk_delete(tenant, [a["id"], b["id"]])
+    assert response.json() == {"deleted": 2}
+    assert tenant.get("/events").json() == []
+
+
+def test_bulk_writes_require_the_pin(tenant):
+    response = tenant.client.post(f"{tenant.base}/events/bulk", json=[event("A")])
+
+    assert response.status_code == 401
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from app import database
+from app.cache import events_cache, settings_cache
+
+
+def cached_titles(tenant) -> list:
+    with tenant.db():
+        return [event.title for event in events_cache.get_events()]
+
+
+def test_writes_are_applied_without_a_reload(tenant):
+    tenant.create_event(title="Piano", start_time="16:00")
+    assert cached_titles(tenant) == ["Piano"]
+    with tenant.db():
+        misses = events_cache.misses
+
+    swim = tenant.create_event(title="Swim", start_time="08:00")
+    tenant.put(f"/events/{swim['id']}", json={"title": "Swimming"})
+
+    assert cached_titles(tenant) == ["Swimming", "Piano"]
+    with tenant.db():
+        assert events_cache.misses == misses
+
+
+def test_write_by_another_worker_is_picked_up(tenant):
+    tenant.create_event(title="Piano")
+    assert cached_titles(tenant) == ["Piano"]
+
+    # Straight to the database, as another process would: no change listener runs
+    with tenant.db():
+        with database.get_db() as conn:
+            conn.execute("UPDATE events SET title = 'Guitar'")
+            conn.commit()
+
+    assert cached_titles(tenant) == ["Guitar"]
+    assert [event["title"] for event in tenant.get("/events").json()] == ["Guitar"]
+
+
+def test_cached_list_is_not_mutated(tenant):
+    tenant.create_event(title="Piano")
+    with tenant.db():
+        before = events_cache.get_events()
+    tenant.create_event(title="Swim")
+
+    assert [event.title for event in before] == ["Piano"]
+
+
+def test_settings_cache_follows_updates(tenant):
+    tenant.put("/settings", json={"timezone": "Europe/London"})
+
+    with tenant.db():
+        assert settings_cache.get_settings()["timezone"] == "Europe/London"
+        # Private auth state never leaks into the public settings
+        assert "pin_hash" not in settings_cache.get_settings()
+        assert settings_cache.get_pin_hash()
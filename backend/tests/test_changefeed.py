@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+
+from app import database
+from app.changefeed import ChangeFeeds
+
+
+def run_with_feeds(scenario, max_clients: int = 100):
+    async def main():
+        feeds = ChangeFeeds()
+        feeds.limit.max_clients = max_clients
+        await feeds.start()
+        try:
+            await scenario(feeds)
+        finally:
+            await feeds.stop()
+
+    asyncio.run(main())
+
+
+def test_stream_limit_is_shared_by_every_tenant(tenant, new_tenant):
+    other = new_tenant()
+
+    async def scenario(feeds):
+        with tenant.db():
+            feed = await feeds.current()
+            stream = feed.subscribe()
+            assert await stream.__anext__() == b"retry: 3000\n\n"
+        with other.db():
+            other_feed = await feeds.current()
+        assert other_feed is not feed
+        assert other_feed.is_full()
+        await stream.aclose()
+        assert not other_feed.is_full()
+
+    run_with_feeds(scenario, max_clients=1)
+
+
+def test_reconnect_replays_missed_changes(tenant):
+    async def scenario(feeds):
+        with tenant.db():
+            feed = await feeds.current()
+            seen = database.get_data_version("events")
+            event = database.create_event({"title": "Swim", "start_time": "09:00", "days": [0]})
+            await asyncio.sleep(0)  # let the change be dispatched
+
+            stream = feed.subscribe(last_id=seen)
+            assert await stream.__anext__() == b"retry: 3000\n\n"
+            message = (await stream.__anext__()).decode()
+            await stream.aclose()
+
+        assert message.startswith(f"id: {seen + 1}\nevent: create\n")
+        assert f'"id":{event.id}' in message
+
+    run_with_feeds(scenario)
+
+
+def test_reconnect_past_history_resets(tenant):
+    async def scenario(feeds):
+        with tenant.db():
+            feed = await feeds.current()
+            stream = feed.subscribe(last_id=10**6)
+            await stream.__anext__()
+            message = (await stream.__anext__()).decode()
+            await stream.aclose()
+
+        assert "event: reset\n" in message
+
+    run_with_feeds(scenario)
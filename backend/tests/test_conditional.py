@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from app.http_cache import etag_matches, make_etag
+
+
+class FakeRequest:
+    def __init__(self, if_none_match):
+        self.headers = {"if-none-match": if_none_match} if if_none_match else {}
+
+
+def test_unchanged_list_is_a_304(tenant):
+    tenant.create_event()
+    first = tenant.get("/events")
+    etag = first.headers["etag"]
+
+    again = tenant.get("/events", headers={"If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+
+def test_write_changes_the_etag(tenant):
+    event = tenant.create_event()
+    etag = tenant.get("/events").headers["etag"]
+    tenant.put(f"/events/{event['id']}", json={"title": "Renamed"})
+
+    response = tenant.get("/events", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["title"] == "Renamed"
+
+
+def test_grid_and_settings_revalidate(tenant):
+    tenant.create_event()
+    for path in ("/grid", "/settings"):
+        etag = tenant.get(path).headers["etag"]
+        assert tenant.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_if_none_match_uses_weak_comparison_over_a_list():
+    etag = make_etag("events", 7)
+
+    assert etag == '"events-7"'
+    assert etag_matches(FakeRequest('"events-6", W/"events-7"'), etag)
+    assert etag_matches(FakeRequest("*"), etag)
+    assert not etag_matches(FakeRequest('"events-6"'), etag)
+    assert not etag_matches(FakeRequest(None), etag)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import threading
+
+from app.conflicts import _DayIndex
+
+
+def test_conflicts_lists_overlapping_pairs(tenant):
+    swim = tenant.create_event(title="Swim", start_time="09:00", end_time="10:00", days=[0, 1])
+    piano = tenant.create_event(title="Piano", start_time="09:30", end_time="11:00", days=[1])
+    tenant.create_event(title="Lunch", start_time="12:00", end_time="13:00", days=[1])
+
+    assert tenant.get("/events/conflicts").json() == [{
+        "day": 1, "event_id": swim["id"], "other_id": piano["id"],
+        "start_time": "09:30", "end_time": "10:00",
+    }]
+    assert tenant.get("/events/conflicts", params={"day": 0}).json() == []
+
+
+def test_check_conflicts_rejects_overlaps(tenant):
+    swim = tenant.create_event(title="Swim", start_time="09:00", end_time="10:00", days=[0])
+    piano = tenant.create_event(title="Piano", start_time="10:00", end_time="11:00", days=[0])
+
+    response = tenant.post("/events", params={"check_conflicts": True}, json={
+        "title": "Chess", "start_time": "09:45", "end_time": "10:15", "days": [0],
+    })
+    assert response.status_code == 409
+    assert [c["other_id"] for c in response.json()["detail"]["conflicts"]] == [swim["id"], piano["id"]]
+
+    # Moving an event onto itself is no conflict, onto another one is
+    moved = tenant.put(f"/events/{swim['id']}", params={"check_conflicts": True},
+                       json={"start_time": "08:30"})
+    assert moved.status_code == 200
+    clash = tenant.put(f"/events/{swim['id']}", params={"check_conflicts": True},
+                       json={"end_time": "10:30"})
+    assert clash.status_code == 409
+
+
+def test_concurrent_checked_creates_admit_one(tenant):
+    event = {"title": "Swim", "start_time": "09:00", "end_time": "10:00", "days": [3]}
+    statuses = []
+
+    def create():
+        response = tenant.post("/events", params={"check_conflicts": True}, json=event)
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201] + [409] * 7
+    assert len(tenant.get("/events", params={"day": 3}).json()) == 1
+
+
+def test_day_long_event_does_not_make_lookups_scan():
+    index = _DayIndex()
+    index.add(0, 0, 24 * 60)
+    for start in range(1, 1400):
+        index.add(start, start, start + 1)
+
+    visited = 0
+    max_end = index.max_end
+
+    class Counting(list):
+        def __getitem__(self, node):
+            nonlocal visited
+            visited += 1
+            return max_end[node]
+
+    index.max_end = Counting()
+    found = list(index.overlapping(700, 701))
+
+    assert sorted(event_id for event_id, _, _ in found) == [0, 700]
+    # Two root-to-leaf paths, not one step per stored interval
+    assert visited < 4 * 11
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+
+def etag(event: dict) -> str:
+    return f'"event{event["id"]}-{event["version"]}"'
+
+
+def test_update_with_current_etag_applies(tenant):
+    event = tenant.create_event(title="Piano")
+
+    response = tenant.put(f"/events/{event['id']}", json={"title": "Guitar"},
+                          headers={"If-Match": etag(event)})
+
+    assert response.status_code == 200
+    assert response.json()["title"] == "Guitar"
+    assert response.headers["etag"] == f'"event{event["id"]}-{event["version"] + 1}"'
+
+
+def test_stale_update_fails_with_current_etag(tenant):
+    event = tenant.create_event(title="Piano")
+    current = tenant.put(f"/events/{event['id']}", json={"title": "Guitar"}).json()
+
+    response = tenant.put(f"/events/{event['id']}", json={"title": "Drums"},
+                          headers={"If-Match": etag(event)})
+
+    assert response.status_code == 412
+    assert response.headers["etag"] == etag(current)
+    # The other device's change stands
+    assert tenant.get(f"/events/{event['id']}").json()["title"] == "Guitar"
+
+
+def test_stale_delete_fails_with_current_etag(tenant):
+    event = tenant.create_event()
+    current = tenant.put(f"/events/{event['id']}", json={"title": "Renamed"}).json()
+
+    response = tenant.delete(f"/events/{event['id']}", headers={"If-Match": etag(event)})
+
+    assert response.status_code == 412
+    assert response.headers["etag"] == etag(current)
+    assert tenant.get(f"/events/{event['id']}").status_code == 200
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from app import executor
+from app.executor import Lane, LaneBusyError
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_calls_run_off_the_event_loop_with_its_context():
+    lane = Lane("test", max_workers=2)
+
+    async def main():
+        request_id.set("abc")
+        return await lane.run(lambda: (threading.current_thread().name, request_id.get()))
+
+    try:
+        name, seen = asyncio.run(main())
+    finally:
+        lane.shutdown()
+
+    assert name.startswith("test-worker")
+    assert seen == "abc"
+    assert lane.stats()["completed"] == 1
+
+
+def test_full_lane_rejects_new_work():
+    lane = Lane("test", max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def main():
+        blocked = [asyncio.ensure_future(lane.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(LaneBusyError):
+            await lane.run(lambda: None)
+        release.set()
+        await asyncio.gather(*blocked)
+
+    try:
+        asyncio.run(main())
+    finally:
+        release.set()
+        lane.shutdown()
+
+    stats = lane.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+
+
+def test_busy_lane_is_a_503(tenant, monkeypatch):
+    async def busy(*args, **kwargs):
+        raise LaneBusyError("db")
+
+    monkeypatch.setattr(executor.db_lane, "run", busy)
+
+    response = tenant.get("/events")
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from app.grid import grid_cache
+
+
+def placements(tenant, day: int, slot_minutes: int = 30) -> dict:
+    layout = tenant.get("/grid", params={"slot_minutes": slot_minutes}).json()
+    titles = {event["id"]: event["title"] for event in layout["events"]}
+    return {
+        titles[p["id"]]: (p["start_slot"], p["span"], p["lane"], p["lanes"])
+        for p in layout["days"][day]["placements"]
+    }
+
+
+def test_overlapping_events_share_a_cluster_width(tenant):
+    tenant.create_event(title="Swim", start_time="09:00", end_time="10:00", days=[1])
+    tenant.create_event(title="Piano", start_time="09:30", end_time="11:00", days=[1])
+    tenant.create_event(title="Chess", start_time="10:00", end_time="10:30", days=[1])
+    tenant.create_event(title="Lunch", start_time="12:00", end_time="12:45", days=[1])
+
+    assert placements(tenant, 1) == {
+        "Swim": (18, 2, 0, 2),
+        "Piano": (19, 3, 1, 2),
+        # Swim has ended, so Chess takes its lane
+        "Chess": (20, 1, 0, 2),
+        # Rounded up to whole slots, and on its own
+        "Lunch": (24, 2, 0, 1),
+    }
+    assert placements(tenant, 0) == {}
+
+
+def test_slot_size_and_open_ended_events(tenant):
+    tenant.create_event(title="Bedtime", start_time="23:50", end_time=None, days=[6])
+
+    layout = tenant.get("/grid", params={"slot_minutes": 60}).json()
+
+    assert layout["slots"] == 24
+    # No end time still takes a slot, and stays on the grid
+    assert placements(tenant, 6, 60) == {"Bedtime": (23, 1, 0, 1)}
+    assert placements(tenant, 6, 5) == {"Bedtime": (286, 1, 0, 1)}
+
+
+def test_unsupported_slot_size_is_rejected(tenant):
+    response = tenant.get("/grid", params={"slot_minutes": 7})
+
+    assert response.status_code == 400
+    assert "slot_minutes must be one of" in response.json()["detail"]
+
+
+def test_layout_is_memoized_per_version_and_slot_size(tenant):
+    tenant.create_event(title="Swim")
+
+    with tenant.db():
+        version, body = grid_cache.get_body(30)
+        assert grid_cache.get_body(30)[1] is body
+        assert grid_cache.get_body(15)[1] is not body
+
+    tenant.create_event(title="Piano")
+
+    with tenant.db():
+        newer, rebuilt = grid_cache.get_body(30)
+    assert newer > version
+    assert b'"title":"Piano"' in rebuilt
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from app import metrics
+
+
+def metric_types(text: str) -> dict:
+    return dict(line.split()[2:4] for line in text.splitlines() if line.startswith("# TYPE"))
+
+
+def test_running_totals_are_counters(client):
+    types = metric_types(metrics.render())
+
+    for name in ("db_pool_acquires_total", "db_pool_waits_total", "db_pool_wait_seconds_total",
+                 "executor_completed_total", "db_writer_written_total",
+                 "token_cache_hits_total", "token_cache_misses_total"):
+        assert types[name] == "counter", name
+    for name in ("db_pool_size", "db_pool_idle", "db_pool_in_use", "executor_queued",
+                 "db_writer_queued", "token_cache_size", "http_requests_in_flight"):
+        assert types[name] == "gauge", name
+    assert all(kind == "counter" for name, kind in types.items() if name.endswith("_total"))
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(("x",), value)
+
+    lines = histogram.render()
+
+    assert 'test_seconds_bucket{op="x",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{op="x",le="1"} 2' in lines
+    assert 'test_seconds_bucket{op="x",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{op="x"} 3' in lines
+
+
+def test_token_guards_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "sesame")
+
+    assert metrics.authorized("Bearer sesame")
+    assert not metrics.authorized("Bearer wrong")
+    assert not metrics.authorized("Bearer sésame")
+    assert not metrics.authorized(None)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from app import database
+
+
+def open_db(tmp_path) -> sqlite3.Connection:
+    return sqlite3.connect(tmp_path / "timetable.db")
+
+
+def columns(conn: sqlite3.Connection, table: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def test_new_database_is_migrated_to_the_latest_version(tmp_path):
+    conn = open_db(tmp_path)
+    database._init_schema(conn)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION
+    assert "version" in columns(conn, "events")
+    assert conn.execute("SELECT COUNT(*) FROM settings").fetchone()[0] == 1
+
+
+def test_up_to_date_database_costs_one_pragma_read(tmp_path):
+    conn = open_db(tmp_path)
+    database._init_schema(conn)
+    statements = []
+    conn.set_trace_callback(statements.append)
+
+    database._init_schema(conn)
+
+    assert statements == ["PRAGMA user_version"]
+
+
+def test_database_from_before_versioning_is_upgraded(tmp_path):
+    conn = open_db(tmp_path)
+    conn.executescript("""
+        CREATE TABLE events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, description TEXT,
+            start_time TEXT NOT NULL, end_time TEXT, days TEXT NOT NULL,
+            color TEXT DEFAULT '#3B82F6', icon TEXT DEFAULT '📅',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE settings (
+            id INTEGER PRIMARY KEY CHECK (id = 1), pin_hash TEXT,
+            timezone TEXT DEFAULT 'Pacific/Auckland', notifications_enabled INTEGER DEFAULT 0,
+            theme TEXT DEFAULT 'default',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO settings (id, pin_hash) VALUES (1, 'old-hash');
+        INSERT INTO events (title, start_time, days) VALUES ('Piano lessons', '16:00', '[2]');
+    """)
+
+    database._init_schema(conn)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION
+    assert {"title", "token_epoch"} <= set(columns(conn, "settings"))
+    assert conn.execute("SELECT pin_hash FROM settings").fetchone()[0] == "old-hash"
+    # Existing events get a version, a change-log row and a search entry
+    assert conn.execute("SELECT version FROM events").fetchone()[0] == 1
+    assert conn.execute("SELECT event_id FROM event_changes").fetchall() == [(1,)]
+    assert conn.execute("SELECT rowid FROM events_fts WHERE events_fts MATCH 'pia*'").fetchall() == [(1,)]
+
+
+def test_failed_migration_leaves_the_database_untouched(tmp_path, monkeypatch):
+    conn = open_db(tmp_path)
+    database._init_schema(conn)
+
+    def broken(cursor):
+        cursor.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.OperationalError("boom")
+
+    monkeypatch.setattr(database, "MIGRATIONS", database.MIGRATIONS + (broken,))
+    monkeypatch.setattr(database, "SCHEMA_VERSION", database.SCHEMA_VERSION + 1)
+    with pytest.raises(sqlite3.OperationalError):
+        database._init_schema(conn)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION - 1
+    assert "half_done" not in [row[0] for row in conn.execute("SELECT name FROM sqlite_master")]
+
+
+def test_importing_the_app_defers_auth_libraries():
+    loaded = subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; print(sorted({'bcrypt', 'jwt'} & set(sys.modules)))"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+    assert loaded == "[]"
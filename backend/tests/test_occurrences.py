@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+
+def starts(tenant, start: str, end: str) -> dict:
+    occurrences = tenant.get("/occurrences", params={"from": start, "to": end}).json()
+    return {(o["date"], o["title"]): o["start"] for o in occurrences}
+
+
+def test_occurrences_keep_local_time_across_dst_end(tenant):
+    tenant.put("/settings", json={"timezone": "Pacific/Auckland"})
+    tenant.create_event(title="Swim", start_time="09:00", end_time="10:00", days=[6])
+    tenant.create_event(title="Early", start_time="02:30", end_time="03:00", days=[6])
+
+    # New Zealand daylight time ends at 03:00 on Sunday 5 April 2026
+    result = starts(tenant, "2026-03-29", "2026-04-12")
+
+    assert result[("2026-03-29", "Swim")] == "2026-03-29T09:00:00+13:00"
+    assert result[("2026-04-05", "Swim")] == "2026-04-05T09:00:00+12:00"
+    assert result[("2026-04-12", "Swim")] == "2026-04-12T09:00:00+12:00"
+    # 02:30 happens twice on the changeover; the first one counts
+    assert result[("2026-04-05", "Early")] == "2026-04-05T02:30:00+13:00"
+
+
+def test_occurrences_keep_local_time_across_dst_start(tenant):
+    tenant.put("/settings", json={"timezone": "Pacific/Auckland"})
+    tenant.create_event(title="Swim", start_time="09:00", end_time="10:00", days=[6])
+
+    # Daylight time starts at 02:00 on Sunday 27 September 2026
+    result = starts(tenant, "2026-09-20", "2026-10-04")
+
+    assert result[("2026-09-20", "Swim")] == "2026-09-20T09:00:00+12:00"
+    assert result[("2026-09-27", "Swim")] == "2026-09-27T09:00:00+13:00"
+    assert result[("2026-10-04", "Swim")] == "2026-10-04T09:00:00+13:00"
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from app import database
+from app.records import projection
+from app.routers import events
+
+
+def walk(tenant, **params) -> list:
+    """Every page of GET /events, following next_cursor until it is null."""
+    pages = []
+    cursor = None
+    while True:
+        response = tenant.get("/events", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages.append(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_follow_start_time_then_id(tenant, monkeypatch):
+    monkeypatch.setattr(events, "EVENTS_PAGE_SIZE", 2)
+    created = [
+        tenant.create_event(title=f"E{i}", start_time=start)
+        for i, start in enumerate(["10:00", "08:00", "10:00", "09:00", "08:00", "11:00", "09:00"])
+    ]
+    expected = [e["id"] for e in sorted(created, key=lambda e: (e["start_time"], e["id"]))]
+
+    pages = walk(tenant, limit=3, fields="id")
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [item["id"] for page in pages for item in page] == expected
+    assert all(item.keys() == {"id"} for page in pages for item in page)
+
+
+def test_last_full_page_has_no_cursor(tenant):
+    for _ in range(2):
+        tenant.create_event()
+
+    page = tenant.get("/events", params={"limit": 2}).json()
+
+    assert len(page["items"]) == 2
+    assert page["next_cursor"] is None
+
+
+def test_fields_without_limit_return_a_filtered_array(tenant):
+    tenant.create_event(title="Swim", days=[0], description="Pool")
+    tenant.create_event(title="Piano", days=[1])
+
+    response = tenant.get("/events", params={"fields": "icon,title,days", "day": 0})
+
+    # Model key order, whatever order was asked for
+    assert response.json() == [{"title": "Swim", "days": [0], "icon": "📅"}]
+
+
+def test_projection_selects_only_requested_columns(tenant):
+    tenant.create_event(title="Swim", description="Pool")
+    fields = projection(("title",))
+
+    assert fields.columns == "title, start_time, id"
+    with tenant.db():
+        [row] = database.get_event_rows_page(fields.columns, None, 10)
+    assert row.keys() == ["title", "start_time", "id"]
+
+
+def test_bad_fields_and_cursors_are_rejected(tenant):
+    unknown = tenant.get("/events", params={"fields": "title,pin_hash"})
+    assert unknown.status_code == 400
+    assert unknown.json()["detail"] == "Unknown fields: pin_hash"
+    assert tenant.get("/events", params={"fields": " , "}).status_code == 400
+    assert tenant.get("/events", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert tenant.get("/events", params={"limit": events.EVENTS_MAX_LIMIT + 1}).status_code == 422
+
+
+def test_pages_revalidate_per_query_and_version(tenant):
+    tenant.create_event()
+    params = {"limit": 10, "fields": "id,title"}
+    etag = tenant.get("/events", params=params).headers["ETag"]
+
+    assert tenant.get("/events", params=params, headers={"If-None-Match": etag}).status_code == 304
+    other = tenant.get("/events", params={**params, "fields": "id"})
+    assert other.headers["ETag"] != etag
+
+    tenant.create_event()
+    changed = tenant.get("/events", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.json()["items"]) == 2
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+import pytest
+
+from app.pool import ConnectionPool, PoolTimeoutError
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=2, timeout=0.2)
+    yield pool
+    pool.close()
+
+
+def test_nested_acquires_share_a_connection(pool):
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+        assert pool.in_use == 1
+    assert pool.in_use == 0
+
+
+def test_thread_gets_its_own_connection_back(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as again:
+        assert again is first
+    assert pool.stats()["size"] == 1
+
+
+def test_connections_use_wal(pool):
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_exhausted_pool_times_out(pool):
+    both_held = threading.Barrier(3)
+    release = threading.Event()
+
+    def hold():
+        with pool.connection():
+            both_held.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    try:
+        both_held.wait()
+        with pytest.raises(PoolTimeoutError):
+            with pool.connection():
+                pass
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert pool.stats()["size"] == 2
+
+
+def test_open_transaction_is_rolled_back_on_return(pool):
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+        assert conn.in_transaction
+
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT count(*) FROM t").fetchone()[0] == 0
+
+
+def test_pool_without_create_refuses_missing_files(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "missing.db"), create=False)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection():
+            pass
+    assert not (tmp_path / "missing.db").exists()
+    assert pool.stats()["size"] == 0
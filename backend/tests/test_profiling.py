@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import database
+from app.profiling import SlowRequestMiddleware, profiler
+
+
+@pytest.fixture
+def admin_auth(client) -> dict:
+    """Headers authenticated against the default (non-tenant) database."""
+    if not client.get("/api/auth/status").json()["pin_is_set"]:
+        assert client.post("/api/auth/setup", json={"pin": "1234"}).status_code == 200
+    token = client.post("/api/auth/verify", json={"pin": "1234"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def busy_in_test_code(stop: threading.Event):
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_profile_requires_auth(client):
+    assert client.get("/api/admin/profile", params={"seconds": 0.05}).status_code == 401
+
+
+def test_profile_returns_collapsed_stacks(client, admin_auth):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_in_test_code, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        response = client.get("/api/admin/profile", params={"seconds": 0.2, "interval_ms": 1},
+                              headers=admin_auth)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert response.status_code == 200
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    assert "profile.collapsed" in response.headers["Content-Disposition"]
+    lines = response.text.splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("busy-worker;") and "busy_in_test_code (test_profiling.py" in line
+               for line in lines)
+
+
+def test_one_profile_at_a_time(client, admin_auth):
+    with profiler._lock:
+        response = client.get("/api/admin/profile", params={"seconds": 0.05}, headers=admin_auth)
+
+    assert response.status_code == 409
+
+
+def slow_app(threshold_ms: float) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int, delay: float = 0.0):
+        with database.get_db() as conn:
+            conn.execute("SELECT ?", (item_id,)).fetchone()
+        time.sleep(delay)
+        return {"id": item_id}
+
+    app.add_middleware(SlowRequestMiddleware, threshold_ms=threshold_ms)
+    return TestClient(app)
+
+
+def test_slow_request_logs_route_queries_and_stack(caplog):
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        assert slow_app(50).get("/items/7", params={"delay": 0.3}).status_code == 200
+
+    [record] = caplog.records
+    message = record.getMessage()
+    assert message.startswith("Slow request: GET /items/{item_id} -> 200 in ")
+    assert "query   SELECT ?" in message
+    # The worker that ran the query was caught sleeping inside the endpoint
+    assert "in read_item" in message and "time.sleep(delay)" in message
+
+
+def test_fast_requests_are_not_logged(caplog):
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        assert slow_app(5000).get("/items/7").status_code == 200
+
+    assert caplog.records == []
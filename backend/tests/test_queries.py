@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from app import database
+
+
+def titles(response) -> list:
+    assert response.status_code == 200, response.text
+    return [event["title"] for event in response.json()]
+
+
+def test_day_and_window_filters(tenant):
+    tenant.create_event(title="Swim", start_time="09:00", end_time="10:00", days=[0, 2])
+    tenant.create_event(title="Piano", start_time="10:00", end_time="11:00", days=[0])
+    tenant.create_event(title="Alarm", start_time="07:00", end_time=None, days=[0])
+
+    assert titles(tenant.get("/events", params={"day": 2})) == ["Swim"]
+    # Windows are half-open: Piano starts as the window ends
+    assert titles(tenant.get("/events", params={"day": 0, "from": "09:30", "to": "10:00"})) == ["Swim"]
+    assert titles(tenant.get("/events", params={"from": "09:59", "to": "10:01"})) == ["Swim", "Piano"]
+    # An event without an end time occupies its start minute
+    assert titles(tenant.get("/events", params={"day": 0, "from": "07:00", "to": "07:01"})) == ["Alarm"]
+    assert titles(tenant.get("/events", params={"day": 0, "from": "07:01", "to": "08:00"})) == []
+
+
+def test_day_index_follows_updates_and_deletes(tenant):
+    event = tenant.create_event(title="Swim", days=[1])
+    tenant.put(f"/events/{event['id']}", json={"days": [3]})
+
+    assert titles(tenant.get("/events", params={"day": 1})) == []
+    assert titles(tenant.get("/events", params={"day": 3})) == ["Swim"]
+
+    tenant.delete(f"/events/{event['id']}")
+    with tenant.db():
+        with database.get_db() as conn:
+            assert conn.execute("SELECT count(*) FROM event_days").fetchone()[0] == 0
+
+
+def test_events_at_and_next(tenant):
+    tenant.create_event(title="Swim", start_time="09:00", end_time="10:00", days=[0])
+    tenant.create_event(title="Piano", start_time="16:00", end_time="17:00", days=[2])
+
+    with tenant.db():
+        assert [e.title for e in database.get_events_at(0, 9 * 60 + 30)] == ["Swim"]
+        assert database.get_events_at(0, 10 * 60) == []
+        assert [e.title for e in database.get_next_events(0, 9 * 60)] == ["Piano"]
+        # Wraps around the week to the same weekday
+        assert [e.title for e in database.get_next_events(2, 16 * 60)] == ["Swim"]
+
+
+def test_filters_use_the_day_index(tenant):
+    with tenant.db():
+        with database.get_db() as conn:
+            plan = " ".join(row[3] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT event_id FROM event_days "
+                "WHERE day = 0 AND start_minute < 600 AND end_minute > 540"
+            ))
+    assert "idx_event_days_day_start" in plan
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from app.ratelimit import PinAttemptLimiter
+
+
+def test_wrong_pins_lock_out_the_tenant_only(tenant, new_tenant):
+    other = new_tenant()
+    for _ in range(5):
+        assert tenant.client.post(f"{tenant.base}/auth/verify", json={"pin": "0000"}).status_code == 401
+
+    assert tenant.client.post(f"{tenant.base}/auth/verify", json={"pin": "1234"}).status_code == 429
+    assert other.client.post(f"{other.base}/auth/verify", json={"pin": "1234"}).status_code == 200
+
+
+def test_lockout_slides_with_the_window():
+    limiter = PinAttemptLimiter(max_attempts=3, window_seconds=60)
+    for when in (0, 10, 20):
+        limiter.record("1.2.3.4", success=False, now=when)
+
+    assert limiter.is_limited("1.2.3.4", now=30)
+    # The oldest failure left the window
+    assert not limiter.is_limited("1.2.3.4", now=61)
+    assert not limiter.is_limited("5.6.7.8", now=30)
+
+
+def test_eviction_stops_at_the_first_live_ip():
+    limiter = PinAttemptLimiter(max_attempts=3, window_seconds=60)
+    for i in range(100):
+        limiter.record(f"10.0.0.{i}", success=False, now=i)
+    # A fresh failure moves the IP behind the others
+    limiter.record("10.0.0.5", success=False, now=200)
+
+    # Latest failures at or before 90 are out of the window
+    assert limiter.evict_expired(now=150) == 90
+    assert list(limiter._failures) == [*(f"10.0.0.{i}" for i in range(91, 100)), "10.0.0.5"]
+    assert limiter.evict_expired(now=150) == 0
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from app import database
+from app.models import Event
+from app.records import EventRecord
+
+
+def test_days_keep_their_stored_order(tenant):
+    event = tenant.create_event(days=[4, 0, 2])
+
+    assert event["days"] == [4, 0, 2]
+    assert tenant.get(f"/events/{event['id']}").json()["days"] == [4, 0, 2]
+    assert tenant.get("/events", params={"fields": "id,days"}).json() == [{"days": [4, 0, 2], "id": event["id"]}]
+    assert tenant.get("/events", params={"day": 2}).json()[0]["id"] == event["id"]
+
+
+def test_to_json_matches_the_event_model(tenant):
+    tenant.create_event(title='Say "hi" \\ 👋', description=None, end_time=None, days=[6, 1])
+    tenant.create_event(title="Late", start_time="23:30", end_time="24:00", description="ünïcode")
+
+    with tenant.db():
+        for record in database.get_all_events():
+            assert record.to_json() == Event.model_validate(dict(record)).model_dump_json()
+
+
+def test_record_reads_like_the_event_dict():
+    row = (7, "Swim", None, "09:05", None, "[2, 0, 2]", "#3B82F6", "🏊",
+           "2026-01-02 03:04:05", "2026-01-02 03:04:05", 3)
+    record = EventRecord.from_row(row)
+
+    assert record["start_time"] == "09:05"
+    assert record.get("end_time") is None
+    assert record["days"] == [2, 0, 2]
+    assert record.weekdays == (0, 2)
+    assert record.on_day(2) and not record.on_day(1)
+    assert dict(record)["version"] == 3
+    assert "missing" not in record
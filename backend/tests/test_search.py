@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from app import database
+
+
+def titles(tenant, q: str) -> list:
+    response = tenant.get("/events/search", params={"q": q})
+    assert response.status_code == 200, response.text
+    return [hit["event"]["title"] for hit in response.json()]
+
+
+def test_every_word_matches_as_a_prefix(tenant):
+    tenant.create_event(title="Piano lessons")
+    tenant.create_event(title="Piano tuning")
+
+    assert titles(tenant, "pia les") == ["Piano lessons"]
+    assert titles(tenant, "pia les ") == ["Piano lessons"]
+    assert sorted(titles(tenant, "pia")) == ["Piano lessons", "Piano tuning"]
+
+
+def test_search_query_quotes_fts_syntax():
+    assert database.search_query('swim OR "x" NEAR(') == '"swim"* "OR"* "x"* "NEAR"*'
+    assert database.search_query("  -- ") is None
+
+
+def test_title_matches_rank_above_description(tenant):
+    tenant.create_event(title="Homework", description="after piano")
+    tenant.create_event(title="Piano", description="scales")
+
+    assert titles(tenant, "piano") == ["Piano", "Homework"]
+
+
+def test_snippet_is_escaped_and_marked(tenant):
+    tenant.create_event(title="<b>Piano</b> & <script>alert(1)</script>")
+
+    [hit] = tenant.get("/events/search", params={"q": "piano"}).json()
+
+    assert hit["snippet"] == (
+        "&lt;b&gt;<mark>Piano</mark>&lt;/b&gt; &amp; &lt;script&gt;alert(1)&lt;/script&gt;"
+    )
+
+
+def test_only_newest_candidates_are_ranked(tenant, monkeypatch):
+    oldest = tenant.create_event(title="Chess", description="chess chess chess")
+    for _ in range(3):
+        tenant.create_event(title="Club", description="chess")
+    monkeypatch.setattr(database, "SEARCH_CANDIDATES", 3)
+
+    hits = tenant.get("/events/search", params={"q": "chess"}).json()
+
+    # The best match is older than the three newest, so it is not ranked
+    assert len(hits) == 3
+    assert oldest["id"] not in [hit["event"]["id"] for hit in hits]
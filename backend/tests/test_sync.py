@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from app import database
+
+
+def test_token_below_tombstone_floor_resets(tenant):
+    kept = tenant.create_event(title="Kept")
+    gone = tenant.create_event(title="Gone")
+    token = tenant.get("/sync").json()["token"]
+    tenant.delete(f"/events/{gone['id']}")
+
+    # Age the tombstone past the retention period and compact it away
+    with tenant.db():
+        with database.get_db() as conn:
+            conn.execute("UPDATE event_changes SET changed_at = datetime('now', '-40 days') WHERE deleted = 1")
+            conn.commit()
+        assert database.compact_event_changes(30) == 1
+
+    page = tenant.get("/sync", params={"since": token}).json()
+
+    assert page["reset"] is True
+    assert [event["id"] for event in page["changed"]] == [kept["id"]]
+    assert page["deleted"] == []
+
+
+def test_token_from_another_database_resets(tenant, new_tenant):
+    other = new_tenant()
+    other.create_event()
+    token = other.get("/sync").json()["token"]
+
+    page = tenant.get("/sync", params={"since": token}).json()
+
+    assert page["reset"] is True
+
+
+def test_offline_edit_merges_and_reports_conflicts(tenant):
+    event = tenant.create_event(title="Swim", color="#3B82F6")
+    tenant.put(f"/events/{event['id']}", json={"title": "Swim lessons"})
+
+    # Offline, the client changed the title and the colour of version 1
+    operation = {
+        "op": "update", "id": event["id"], "base_version": event["version"],
+        "changes": {"title": "Swimming", "color": "#000000"},
+        "base": {"title": "Swim", "color": "#3B82F6"},
+    }
+    result = tenant.post("/sync", json={"operations": [operation]}).json()["results"][0]
+
+    assert result["status"] == "merged"
+    assert result["conflicts"] == ["title"]
+    # Only the client changed the colour; both changed the title, and the server's stands
+    assert result["event"]["title"] == "Swim lessons"
+    assert result["event"]["color"] == "#000000"
+
+
+def test_offline_edit_of_only_conflicting_fields_is_a_conflict(tenant):
+    event = tenant.create_event(title="Swim")
+    tenant.put(f"/events/{event['id']}", json={"title": "Swim lessons"})
+
+    operation = {
+        "op": "update", "id": event["id"], "base_version": event["version"],
+        "changes": {"title": "Swimming"}, "base": {"title": "Swim"},
+    }
+    result = tenant.post("/sync", json={"operations": [operation]}).json()["results"][0]
+
+    assert result["status"] == "conflict"
+    assert result["conflicts"] == ["title"]
+    assert tenant.get(f"/events/{event['id']}").json()["title"] == "Swim lessons"
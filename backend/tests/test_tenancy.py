@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import io
+import os
+
+from app import cli, database
+
+
+def test_unknown_tenant_is_404_and_creates_nothing(client):
+    assert client.get("/api/t/nobodyhome/events").status_code == 404
+    assert client.post("/api/t/nobodyhome/auth/setup", json={"pin": "1234"}).status_code == 404
+    assert not os.path.exists(database.tenant_db_path("nobodyhome"))
+    assert "nobodyhome" not in database.list_tenants()
+
+
+def test_invalid_tenant_name_is_404(client):
+    assert client.get("/api/t/Not..Valid/events").status_code == 404
+
+
+def test_provisioned_tenant_keeps_its_pin(tenant):
+    assert tenant.get("/events").json() == []
+    # The PIN was set when the tenant was provisioned, so nobody can claim it
+    assert tenant.client.post(f"{tenant.base}/auth/setup", json={"pin": "9999"}).status_code == 400
+    assert database.create_tenant(tenant.name) is False
+
+
+def test_tenants_are_isolated(tenant, new_tenant):
+    other = new_tenant()
+    tenant.create_event(title="Ours")
+
+    assert other.get("/events").json() == []
+    # A token is only good for the tenant it was issued by
+    response = other.client.post(f"{other.base}/events", headers=tenant.auth,
+                                 json={"title": "X", "start_time": "09:00", "days": [0]})
+    assert response.status_code == 401
+
+
+def test_reopens_after_eviction(tenant, new_tenant, monkeypatch):
+    tenant.create_event(title="Kept")
+    monkeypatch.setattr(database, "MAX_OPEN_TENANTS", 1)
+    new_tenant().get("/events")
+
+    assert tenant.name not in database.open_tenants()
+    assert [e["title"] for e in tenant.get("/events").json()] == ["Kept"]
+
+
+def test_migration_runs_outside_the_pool_lock(tenant, monkeypatch):
+    held = []
+    init_schema = database._init_schema
+
+    def spy(conn):
+        held.append(database._pool_lock.locked())
+        init_schema(conn)
+
+    monkeypatch.setattr(database, "_init_schema", spy)
+    database.close_db()
+    tenant.get("/events")
+
+    assert held == [False]
+
+
+def test_cli_provisions_tenants(monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.StringIO("2468\n"))
+    assert cli.main(["tenant", "create", "clihome"]) == 0
+    assert cli.main(["tenant", "create", "clihome", "--no-pin"]) == 1
+    assert cli.main(["tenant", "list"]) == 0
+    assert "clihome" in capsys.readouterr().out.split()
+    with database.use_tenant("clihome"):
+        assert database.get_pin_hash()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import time
+
+from app import database
+from app.cache import TokenCache, token_cache
+
+
+def test_repeat_requests_hit_the_token_cache(tenant):
+    tenant.create_event()
+    hits = token_cache.hits
+
+    tenant.create_event()
+
+    assert token_cache.hits == hits + 1
+
+
+def test_token_only_works_for_its_tenant(tenant, new_tenant):
+    other = new_tenant()
+
+    response = tenant.client.post(f"{other.base}/events", headers=tenant.auth, json={
+        "title": "Intruder", "start_time": "09:00", "days": [0],
+    })
+
+    assert response.status_code == 401
+    assert other.get("/events").json() == []
+
+
+def test_pin_change_revokes_outstanding_tokens(tenant):
+    tenant.create_event()
+    changed = tenant.client.post(f"{tenant.base}/auth/change", json={"old_pin": "1234", "new_pin": "5678"})
+    assert changed.status_code == 200
+
+    assert tenant.post("/events", json={"title": "Late", "start_time": "09:00", "days": [0]}).status_code == 401
+
+
+def test_pin_change_by_another_process_is_noticed(tenant, monkeypatch):
+    tenant.create_event()
+    with tenant.db():
+        with database.get_db() as conn:
+            conn.execute("UPDATE settings SET token_epoch = token_epoch + 1")
+            conn.commit()
+    # Without the grace period the epoch is checked on every request
+    monkeypatch.setattr(token_cache, "epoch_ttl", 0)
+
+    assert tenant.post("/events", json={"title": "Late", "start_time": "09:00", "days": [0]}).status_code == 401
+
+
+def test_cache_is_bounded_and_honours_exp():
+    cache = TokenCache(max_size=2)
+    later = time.time() + 60
+    cache.put("a", {"exp": later})
+    cache.put("b", {"exp": later})
+    cache.get("a")
+    cache.put("c", {"exp": later})
+
+    # b was least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    cache.put("old", {"exp": time.time() - 1})
+    assert cache.get("old") is None
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+
+from app import database, transfer
+
+
+def test_ndjson_export_round_trips(tenant, new_tenant):
+    tenant.create_event(title="Swim", description="Pool, lane 3", days=[0, 2], color="#FF0000")
+    tenant.create_event(title="Piano", start_time="16:00", end_time="16:30", days=[4])
+
+    exported = tenant.get("/events/export").text
+    copy = new_tenant()
+    response = copy.post("/events/import", content=exported.encode())
+
+    assert response.status_code == 200, response.text
+    assert response.json()["imported"] == 2
+    fields = ("title", "description", "start_time", "end_time", "days", "color", "icon")
+    original = [{k: e[k] for k in fields} for e in map(json.loads, exported.splitlines())]
+    imported = [{k: e[k] for k in fields} for e in copy.get("/events").json()]
+    assert sorted(imported, key=str) == sorted(original, key=str)
+
+
+def test_ics_export_is_one_calendar(tenant):
+    tenant.create_event(title="Swim; lessons", days=[0, 2])
+
+    response = tenant.get("/events/export", params={"format": "ics"})
+
+    assert response.headers["content-type"].startswith("text/calendar")
+    lines = response.text.split("\r\n")
+    assert lines[0] == "BEGIN:VCALENDAR"
+    assert lines[-2:] == ["END:VCALENDAR", ""]
+    assert "RRULE:FREQ=WEEKLY;BYDAY=MO,WE" in lines
+    assert r"SUMMARY:Swim\; lessons" in lines
+
+
+def test_export_streams_past_one_chunk(tenant):
+    count = transfer.CHUNK_SIZE + 1
+    with tenant.db():
+        database.create_events([
+            {"title": f"Event {i}", "start_time": "09:00", "days": [0]} for i in range(count)
+        ])
+
+    lines = tenant.get("/events/export").text.splitlines()
+
+    assert [json.loads(line)["title"] for line in lines] == [f"Event {i}" for i in range(count)]
+
+
+def test_import_reports_bad_lines(tenant):
+    body = "\n".join([
+        json.dumps({"title": "Good", "start_time": "09:00", "days": [0]}),
+        "not json",
+        json.dumps({"title": "Bad time", "start_time": "9am", "days": [0]}),
+    ])
+
+    result = tenant.post("/events/import", content=body.encode()).json()
+
+    assert result["imported"] == 1
+    assert result["failed"] == 2
+    assert [error["index"] for error in result["errors"]] == [1, 2]
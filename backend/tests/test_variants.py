@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import cbor2
+import msgpack
+
+from app import http_cache
+from app.http_cache import VariantCache
+
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+def fill(tenant, count: int = 20):
+    """Enough events for the list to pass COMPRESS_MIN_BYTES."""
+    for i in range(count):
+        tenant.create_event(title=f"Event {i}", description="Bring a towel and goggles")
+
+
+def test_binary_encodings_carry_the_same_data(tenant):
+    tenant.create_event(title="Swim", icon="🏊")
+    events = tenant.get("/events", headers=IDENTITY)
+    settings = tenant.get("/settings", headers=IDENTITY)
+
+    packed = tenant.get("/events", headers={**IDENTITY, "Accept": "application/msgpack"})
+    assert packed.headers["Content-Type"] == "application/msgpack"
+    assert msgpack.unpackb(packed.content) == events.json()
+    assert packed.headers["ETag"] == events.headers["ETag"][:-1] + '-msgpack"'
+    assert packed.headers["Vary"] == "Accept, Accept-Encoding"
+
+    cbor = tenant.get("/settings", headers={**IDENTITY, "Accept": "application/cbor"})
+    assert cbor.headers["Content-Type"] == "application/cbor"
+    assert cbor2.loads(cbor.content) == settings.json()
+
+
+def test_json_wins_unless_preferred(tenant):
+    def media(accept: str) -> str:
+        return tenant.get("/events", headers={**IDENTITY, "Accept": accept}).headers["Content-Type"]
+
+    assert media("application/msgpack;q=0.5, application/json") == "application/json"
+    assert media("application/msgpack, application/json") == "application/json"
+    assert media("application/x-msgpack, */*;q=0.1") == "application/msgpack"
+    assert media("text/html") == "application/json"
+
+
+def test_unavailable_format_is_never_offered(tenant, monkeypatch):
+    monkeypatch.setitem(http_cache._encoders, http_cache.MSGPACK, None)
+
+    response = tenant.get("/events", headers={**IDENTITY, "Accept": "application/msgpack"})
+
+    assert response.headers["Content-Type"] == "application/json"
+
+
+def test_large_bodies_are_compressed_small_ones_are_not(tenant):
+    tenant.create_event()
+    small = tenant.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+    fill(tenant)
+    plain = tenant.get("/events", headers=IDENTITY)
+    gzipped = tenant.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert gzipped.json() == plain.json()
+    # Brotli wins a tie, but not a lower weight
+    assert tenant.get("/events", headers={"Accept-Encoding": "gzip, br"}).headers["Content-Encoding"] == "br"
+    both = tenant.get("/events", headers={"Accept-Encoding": "gzip, br;q=0.5"})
+    assert both.headers["Content-Encoding"] == "gzip"
+
+
+def test_variants_are_built_once_per_version(tenant, monkeypatch):
+    fill(tenant)
+    calls = []
+    compress = http_cache._encoder("gzip")
+    monkeypatch.setitem(http_cache._encoders, "gzip", lambda body: calls.append(1) or compress(body))
+    headers = {"Accept-Encoding": "gzip", "Accept": "application/msgpack"}
+
+    first = tenant.get("/events", headers=headers)
+    assert tenant.get("/events", headers=headers).content == first.content
+    assert len(calls) == 1
+
+    assert tenant.get("/events", headers={**headers, "If-None-Match": first.headers["ETag"]}).status_code == 304
+    # Another variant of the same version doesn't match
+    assert tenant.get("/events", headers={"Accept-Encoding": "gzip",
+                                          "If-None-Match": first.headers["ETag"]}).status_code == 200
+
+    tenant.create_event()
+    assert tenant.get("/events", headers=headers).headers["ETag"] != first.headers["ETag"]
+    assert len(calls) == 3
+
+
+def test_variant_cache_drops_least_recently_used():
+    cache = VariantCache(max_bytes=100)
+    cache._store(('"a-1"', http_cache.JSON, "gzip"), b"x" * 40)
+    cache._store(('"b-1"', http_cache.JSON, "gzip"), b"x" * 40)
+    assert cache.lookup('"a-1"', http_cache.JSON, "gzip") is not None
+
+    cache._store(('"c-1"', http_cache.JSON, "gzip"), b"x" * 40)
+
+    assert cache.lookup('"b-1"', http_cache.JSON, "gzip") is None
+    assert cache.lookup('"a-1"', http_cache.JSON, "gzip") is not None
+    assert cache._size == 80
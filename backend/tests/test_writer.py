@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from app import database
+from app.writer import GroupCommitWriter
+
+EVENT = {"title": "Swim", "start_time": "09:00", "days": [0]}
+
+
+def fail():
+    raise ValueError("bad write")
+
+
+def lose_transaction():
+    # As SQLite does on SQLITE_FULL or an I/O error mid-transaction
+    with database.get_db() as conn:
+        conn.rollback()
+    raise sqlite3.OperationalError("database or disk is full")
+
+
+def titles(tenant) -> list:
+    return [event["title"] for event in tenant.get("/events").json()]
+
+
+def submit_batch(tenant, *writes):
+    """Queue writes so one batch picks them all up; return their futures."""
+    writer = GroupCommitWriter(window_ms=200)
+    with tenant.db():
+        futures = [writer.submit(fn, *args) for fn, *args in writes]
+    for future in futures:
+        future.exception(timeout=10)
+    writer.shutdown()
+    return futures, writer.stats()
+
+
+def test_failing_write_is_rolled_back_alone(tenant):
+    futures, stats = submit_batch(
+        tenant,
+        (database.create_event, {**EVENT, "title": "Before"}),
+        (fail,),
+        (database.create_event, {**EVENT, "title": "After"}),
+    )
+
+    assert stats["batches"] == 1
+    assert isinstance(futures[1].exception(), ValueError)
+    assert futures[0].result().title == "Before"
+    assert sorted(titles(tenant)) == ["After", "Before"]
+
+
+def test_lost_transaction_fails_the_whole_batch(tenant):
+    futures, stats = submit_batch(
+        tenant,
+        (database.create_event, {**EVENT, "title": "Before"}),
+        (lose_transaction,),
+        (database.create_event, {**EVENT, "title": "After"}),
+    )
+
+    for future in futures:
+        with pytest.raises(database.BatchAborted):
+            future.result()
+    assert stats["written"] == 0 and stats["failed"] == 3
+    # Nothing ran outside the transaction after it was lost
+    assert titles(tenant) == []
+    with tenant.db():
+        with database.get_db() as conn:
+            assert not conn.in_transaction
+
+
+def test_shutdown_applies_queued_writes(tenant):
+    writer = GroupCommitWriter(window_ms=50)
+    with tenant.db():
+        futures = [writer.submit(database.create_event, {**EVENT, "title": str(i)}) for i in range(5)]
+    writer.shutdown()
+
+    assert all(future.done() for future in futures)
+    assert sorted(titles(tenant)) == ["0", "1", "2", "3", "4"]
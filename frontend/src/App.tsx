@@ -28,6 +28,20 @@ function App() {
     checkPinStatus();
   }, []);
 
+  // Apply pushed changes instead of re-fetching the whole list
+  useEffect(() => {
+    return api.events.subscribe((change) => {
+      if (change.action === 'reset') {
+        loadEvents();
+        return;
+      }
+      setEvents((current) => {
+        const others = current.filter((e) => e.id !== change.id);
+        return change.event ? [...others, change.event] : others;
+      });
+    });
+  }, []);
+
   const loadSettings = async () => {
     try {
       const settings = await api.settings.get();
@@ -231,6 +245,10 @@ function App() {
             setShowEventForm(false);
             setEditingEvent(null);
           }}
+          onConflict={() => {
+            // The form keeps the user's edits; only the grid catches up
+            loadEvents();
+          }}
           />
         )}
 
@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import { X, Clock, Calendar, Palette, Sparkles } from 'lucide-react';
-import { api } from '../services/api';
+import { api, ApiError, eventETag } from '../services/api';
 import type { Event, EventCreate } from '../services/api';
 import confetti from 'canvas-confetti';
 
@@ -10,6 +10,8 @@ interface EventFormProps {
   onClose: () => void;
   onSave: () => void;
   onDelete?: () => void;
+  // The event changed elsewhere since the form opened: its current version, or null if deleted
+  onConflict?: (latest: Event | null) => void;
 }
 
 const DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'];
@@ -27,7 +29,23 @@ const COLORS = [
 
 const ICONS = ['📚', '⚽', '🎨', '🎵', '🎮', '🏊', '🚴', '🍽️', '🛌', '🎒', '🏫', '🎬', '🎪', '⭐', '💡'];
 
-const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete }) => {
+const FIELD_LABELS: [keyof EventCreate, string][] = [
+  ['title', 'title'],
+  ['icon', 'icon'],
+  ['days', 'days'],
+  ['start_time', 'start'],
+  ['end_time', 'end'],
+  ['color', 'color'],
+  ['description', 'notes'],
+];
+
+// Labels of the fields another device changed between two versions of an event
+const changedFields = (before: Event, after: Event) =>
+  FIELD_LABELS
+    .filter(([key]) => JSON.stringify(before[key] ?? null) !== JSON.stringify(after[key] ?? null))
+    .map(([, label]) => label);
+
+const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete, onConflict }) => {
   const [title, setTitle] = useState('');
   const [description, setDescription] = useState('');
   const [startTime, setStartTime] = useState('09:00');
@@ -37,18 +55,29 @@ const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete
   const [icon, setIcon] = useState(ICONS[0]);
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [error, setError] = useState('');
+  // The version the edits apply to; after a conflict, the latest one
+  const [base, setBase] = useState<Event | null>(event);
+  // Set when another device saved (latest) or deleted (null) the event first
+  const [conflict, setConflict] = useState<{ latest: Event | null; fields: string[] } | null>(null);
   
   const isEditing = !!event;
+  const wasDeleted = !!conflict && !conflict.latest;
+  
+  const fillForm = (source: Event) => {
+    setTitle(source.title);
+    setDescription(source.description || '');
+    setStartTime(source.start_time);
+    setEndTime(source.end_time || '');
+    setSelectedDays(source.days);
+    setColor(source.color);
+    setIcon(source.icon);
+  };
   
   useEffect(() => {
+    setBase(event);
+    setConflict(null);
     if (event) {
-      setTitle(event.title);
-      setDescription(event.description || '');
-      setStartTime(event.start_time);
-      setEndTime(event.end_time || '');
-      setSelectedDays(event.days);
-      setColor(event.color);
-      setIcon(event.icon);
+      fillForm(event);
     } else {
       // Default to current day
       const today = new Date().getDay();
@@ -57,6 +86,22 @@ const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete
     }
   }, [event]);
   
+  // A 412 means another device saved first. Keep what the user typed, say
+  // what changed, and base the next save on the latest version, so it only
+  // replaces theirs when the user saves again.
+  const handleConflict = async (err: unknown) => {
+    if (!(err instanceof ApiError && err.status === 412) || !base) {
+      return false;
+    }
+    const latest = await api.events.get(base.id).catch(() => null);
+    setConflict({ latest, fields: latest ? changedFields(base, latest) : [] });
+    if (latest) {
+      setBase(latest);
+    }
+    onConflict?.(latest);
+    return true;
+  };
+  
   const toggleDay = (dayIndex: number) => {
     setSelectedDays(prev =>
       prev.includes(dayIndex)
@@ -68,6 +113,7 @@ const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     setError('');
+    setConflict(null);
     
     if (!title.trim()) {
       setError('Please enter a title');
@@ -92,8 +138,8 @@ const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete
         icon,
       };
       
-      if (isEditing && event) {
-        await api.events.update(event.id, eventData);
+      if (isEditing && base && !wasDeleted) {
+        await api.events.update(base.id, eventData, eventETag(base));
       } else {
         await api.events.create(eventData);
         // Trigger confetti for new events
@@ -107,7 +153,9 @@ const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete
       
       onSave();
     } catch (err) {
-      setError(err instanceof Error ? err.message : 'Something went wrong');
+      if (!(await handleConflict(err))) {
+        setError(err instanceof Error ? err.message : 'Something went wrong');
+      }
     } finally {
       setIsSubmitting(false);
     }
@@ -146,6 +194,32 @@ const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete
           </div>
         )}
         
+        {conflict && (
+          <div className="bg-amber-50 text-amber-800 px-4 py-3 rounded-xl mb-4 text-sm">
+            {conflict.latest ? (
+              <>
+                <p>
+                  This event was changed on another device
+                  {conflict.fields.length > 0 && ` (${conflict.fields.join(', ')})`}.
+                  Your changes are still here: save again to replace theirs.
+                </p>
+                <button
+                  type="button"
+                  onClick={() => {
+                    fillForm(conflict.latest!);
+                    setConflict(null);
+                  }}
+                  className="mt-2 font-bold underline"
+                >
+                  Use their version instead
+                </button>
+              </>
+            ) : (
+              <p>This event was deleted on another device. Your changes are still here: add it again to keep it.</p>
+            )}
+          </div>
+        )}
+        
         <form onSubmit={handleSubmit} className="space-y-5">
           {/* Title */}
           <div>
@@ -275,19 +349,21 @@ const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete
           
           {/* Actions */}
           <div className="space-y-3 pt-4">
-            {isEditing && (
+            {isEditing && !wasDeleted && (
               <button
                 type="button"
                 onClick={async () => {
                   if (confirm('Are you sure you want to delete this event?')) {
                     setIsSubmitting(true);
                     try {
-                      if (event) {
-                        await api.events.delete(event.id);
+                      if (base) {
+                        await api.events.delete(base.id, eventETag(base));
                         onDelete?.();
                       }
                     } catch (err) {
-                      setError(err instanceof Error ? err.message : 'Failed to delete');
+                      if (!(await handleConflict(err))) {
+                        setError(err instanceof Error ? err.message : 'Failed to delete');
+                      }
                       setIsSubmitting(false);
                     }
                   }
@@ -316,6 +392,8 @@ const EventForm: React.FC<EventFormProps> = ({ event, onClose, onSave, onDelete
                     <span className="spinner w-5 h-5 border-2" />
                     Saving...
                   </span>
+                ) : wasDeleted ? (
+                  'Add Again'
                 ) : isEditing ? (
                   'Save Changes'
                 ) : (
@@ -6,6 +6,16 @@ const API_BASE = (import.meta as any).env?.VITE_API_URL || '';
 // Get auth token from localStorage
 const getToken = () => localStorage.getItem('timetable_token');
 
+// Error from a non-2xx response; status 412 means the event changed since it was read
+export class ApiError extends Error {
+  status: number;
+
+  constructor(message: string, status: number) {
+    super(message);
+    this.status = status;
+  }
+}
+
 // API request helper
 async function apiRequest<T>(
   endpoint: string,
@@ -40,7 +50,7 @@ async function apiRequest<T>(
       } catch {
         errorMessage = errorText || `HTTP error! status: ${response.status}`;
       }
-      throw new Error(errorMessage);
+      throw new ApiError(errorMessage, response.status);
     }
     
     if (response.status === 204) {
@@ -68,8 +78,12 @@ export interface Event {
   icon: string;
   created_at: string;
   updated_at: string;
+  version: number;
 }
 
+// If-Match value for an event as last seen; a write then fails (412) if someone changed it since
+export const eventETag = (event: Pick<Event, 'id' | 'version'>) => `"event${event.id}-${event.version}"`;
+
 export interface EventCreate {
   title: string;
   description?: string;
@@ -82,6 +96,22 @@ export interface EventCreate {
 
 export interface EventUpdate extends Partial<EventCreate> {}
 
+export interface EventPage<T = Partial<Event>> {
+  items: T[];
+  next_cursor: string | null;
+}
+
+export interface EventPageParams {
+  limit?: number;
+  cursor?: string;
+  fields?: (keyof Event)[];
+}
+
+export interface SearchHit {
+  event: Event;
+  snippet: string; // HTML: text escaped, matches wrapped in <mark></mark>
+}
+
 export interface Settings {
   timezone: string;
   notifications_enabled: boolean;
@@ -90,6 +120,77 @@ export interface Settings {
   pin_is_set: boolean;
 }
 
+export interface EventChange {
+  action: 'create' | 'update' | 'delete' | 'reset';
+  id?: number;
+  version: number;
+  event?: Event;
+}
+
+export interface GridPlacement {
+  id: number;
+  start_slot: number;
+  span: number;
+  lane: number;
+  lanes: number;
+}
+
+export interface GridLayout {
+  version: number;
+  slot_minutes: number;
+  slots: number;
+  events: Event[];
+  days: { day: number; placements: GridPlacement[] }[];
+}
+
+export interface EventExceptionCreate {
+  event_id?: number | null; // omit to skip every event on the date
+  date: string; // YYYY-MM-DD
+  kind?: 'skip' | 'modify';
+  start_time?: string;
+  end_time?: string;
+  title?: string;
+  note?: string;
+}
+
+export interface EventException extends EventExceptionCreate {
+  id: number;
+  created_at: string;
+}
+
+export interface Occurrence {
+  event_id: number;
+  date: string;
+  start: string; // ISO 8601 with UTC offset
+  end: string | null;
+  title: string;
+  color: string;
+  icon: string;
+  modified: boolean;
+}
+
+export interface SyncChanges {
+  token: string; // opaque; pass back as since
+  reset: boolean; // drop local events first: changed is a full copy
+  more: boolean; // call again with token for the rest
+  changed: Event[];
+  deleted: number[];
+}
+
+export type SyncOperation =
+  | { op: 'create'; client_id?: string; event: EventCreate }
+  | { op: 'update'; id: number; base_version: number; changes: EventUpdate; base?: EventUpdate }
+  | { op: 'delete'; id: number; base_version?: number };
+
+export interface SyncResult {
+  index: number;
+  status: 'applied' | 'merged' | 'conflict';
+  id: number | null;
+  client_id: string | null;
+  event: Event | null; // as it now stands; null once deleted
+  conflicts: string[]; // fields where the server's value was kept
+}
+
 export interface AuthStatus {
   pin_is_set: boolean;
 }
@@ -98,16 +199,69 @@ export interface AuthStatus {
 export const api = {
   events: {
     list: () => apiRequest<Event[]>('/api/events'),
+    // Keyset pages in start-time order; pass next_cursor back as cursor until it is null
+    page: ({ limit, cursor, fields }: EventPageParams = {}) => {
+      const params = new URLSearchParams();
+      if (limit) params.set('limit', String(limit));
+      if (cursor) params.set('cursor', cursor);
+      if (fields) params.set('fields', fields.join(','));
+      if (!limit && !cursor) params.set('limit', '100');
+      return apiRequest<EventPage>(`/api/events?${params}`);
+    },
+    // Type-ahead: the last word matches as a prefix until a space follows it
+    search: (q: string, limit = 20) =>
+      apiRequest<SearchHit[]>(`/api/events/search?q=${encodeURIComponent(q)}&limit=${limit}`),
     get: (id: number) => apiRequest<Event>(`/api/events/${id}`),
     create: (data: EventCreate) => apiRequest<Event>('/api/events', {
       method: 'POST',
       body: JSON.stringify(data),
     }),
-    update: (id: number, data: EventUpdate) => apiRequest<Event>(`/api/events/${id}`, {
+    update: (id: number, data: EventUpdate, ifMatch?: string) => apiRequest<Event>(`/api/events/${id}`, {
       method: 'PUT',
       body: JSON.stringify(data),
+      headers: ifMatch ? { 'If-Match': ifMatch } : {},
+    }),
+    delete: (id: number, ifMatch?: string) => apiRequest<void>(`/api/events/${id}`, {
+      method: 'DELETE',
+      headers: ifMatch ? { 'If-Match': ifMatch } : {},
+    }),
+    // Subscribe to pushed changes; EventSource resumes with Last-Event-ID on reconnect.
+    // Returns an unsubscribe function.
+    subscribe: (onChange: (change: EventChange) => void) => {
+      const source = new EventSource(`${API_BASE}/api/events/stream`);
+      const handler = (message: MessageEvent) => onChange(JSON.parse(message.data));
+      ['create', 'update', 'delete', 'reset'].forEach((type) =>
+        source.addEventListener(type, handler as EventListener)
+      );
+      return () => source.close();
+    },
+  },
+  
+  grid: {
+    get: (slotMinutes = 30) => apiRequest<GridLayout>(`/api/grid?slot_minutes=${slotMinutes}`),
+  },
+  
+  sync: {
+    changes: (since?: string) =>
+      apiRequest<SyncChanges>(since ? `/api/sync?since=${encodeURIComponent(since)}` : '/api/sync'),
+    upload: (operations: SyncOperation[]) => apiRequest<{ results: SyncResult[] }>('/api/sync', {
+      method: 'POST',
+      body: JSON.stringify({ operations }),
+    }),
+  },
+  
+  occurrences: {
+    list: (from: string, to: string) =>
+      apiRequest<Occurrence[]>(`/api/occurrences?from=${from}&to=${to}`),
+  },
+  
+  exceptions: {
+    list: () => apiRequest<EventException[]>('/api/exceptions'),
+    create: (data: EventExceptionCreate) => apiRequest<EventException>('/api/exceptions', {
+      method: 'POST',
+      body: JSON.stringify(data),
     }),
-    delete: (id: number) => apiRequest<void>(`/api/events/${id}`, {
+    delete: (id: number) => apiRequest<void>(`/api/exceptions/${id}`, {
       method: 'DELETE',
     }),
   },